@@ -0,0 +1,350 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+
+from ipfs_client.benchmarks.mock_server import MockServices
+from ipfs_client.main import AsyncIPFSClient
+from ipfs_client.settings.data_models import ConnectionLimits
+from ipfs_client.settings.data_models import ExternalAPIAuth
+from ipfs_client.settings.data_models import IPFSConfig
+from ipfs_client.settings.data_models import IPFSWriterRateLimit
+from ipfs_client.settings.data_models import RemotePinningConfig
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+# Measures every AsyncIPFSClient operation against MockServices, an in-process
+# stand-in for the node, Lassie and Lighthouse, so no daemon or network is
+# needed. Run it as:
+# poetry run python -m ipfs_client.benchmarks.client_bench \
+#   --requests 500 --concurrency 16 --size 4096 --latency 0.002 --error-rate 0.01
+# Throughput, p50/p95/p99 latency and the peak RSS of the process are printed
+# per operation. `--save-baseline FILE` stores the results, `--baseline FILE`
+# compares a run against them and exits with status 1 when an operation got
+# slower, or used more memory, than `--tolerance` allows. Baselines are only
+# comparable when taken on the same machine with the same arguments.
+
+
+MOCK_URL = 'http://ipfs.mock:5001'
+BATCH = 16
+
+
+def _settings(args):
+    limits = ConnectionLimits(
+        max_connections=args.concurrency,
+        max_keepalive_connections=args.concurrency,
+        keepalive_expiry=60,
+    )
+    settings = IPFSConfig(
+        url=MOCK_URL,
+        reader_url=MOCK_URL,
+        write_rate_limit=IPFSWriterRateLimit(req_per_sec=100000, burst=100000),
+        timeout=60,
+        local_cache_path=tempfile.mkdtemp(prefix='ipfs_bench_'),
+        connection_limits=limits,
+        remote_pinning=RemotePinningConfig(enabled=False),
+    )
+    # every call must reach the server to be measured
+    settings.cache.enabled = False
+    settings.lifecycle.enabled = False
+    settings.lassie.url = MOCK_URL
+    settings.lighthouse.upload.url = MOCK_URL
+    settings.lighthouse.upload.auth = ExternalAPIAuth(apiKey='bench')
+    settings.lighthouse.api.url = MOCK_URL
+    return settings
+
+
+def _percentile(ordered, q):
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class ClientBench:
+    def __init__(self, args):
+        self._args = args
+        self.mock = MockServices(
+            latency=args.latency,
+            jitter=args.jitter,
+            error_rate=args.error_rate,
+            error_status=args.error_status,
+            payload_size=args.size,
+            seed=args.seed,
+        )
+        transport = httpx.ASGITransport(app=self.mock.app)
+        settings = _settings(args)
+        self._tmp_dir = settings.local_cache_path
+        self.writer = AsyncIPFSClient(
+            addr=MOCK_URL, settings=settings, write_mode=True, transport=transport,
+        )
+        self.reader = AsyncIPFSClient(
+            addr=MOCK_URL, settings=settings, transport=transport,
+        )
+        self.cids = []
+        self.dag_cids = []
+
+    def payload(self, idx):
+        # unique content per call, so that adds are never coalesced
+        prefix = f'{idx}:'.encode()
+        return prefix + b'x' * max(self._args.size - len(prefix), 0)
+
+    async def setup(self):
+        await self.writer.init_session()
+        await self.reader.init_session()
+        # content read back by the read benchmarks, injected errors are
+        # switched off while it is written
+        error_rate, self.mock.error_rate = self.mock.error_rate, 0
+        self.cids = await self.writer.add_many(
+            [self.payload(-idx - 1) for idx in range(self._args.prepared)],
+        )
+        for idx in range(self._args.prepared):
+            r = await self.writer.dag.put(self.node(idx))
+            self.dag_cids.append(r['Cid']['/'])
+        self.mock.error_rate = error_rate
+
+    def node(self, idx):
+        return {
+            'epoch': idx,
+            'project': f'project-{idx % 17}',
+            'payload': self.payload(idx)[:256],
+            'parents': [{'/': cid} for cid in self.cids[:2]],
+        }
+
+    async def aclose(self):
+        await self.reader.aclose()
+        await self.writer.aclose()
+
+    def _cid(self, idx):
+        return self.cids[idx % len(self.cids)]
+
+    # each operation returns the number of payload bytes it moved
+
+    async def add_bytes(self, idx):
+        await self.writer.add_bytes(self.payload(idx))
+        return self._args.size
+
+    async def add_many(self, idx):
+        await self.writer.add_many(
+            [self.payload(idx * BATCH + offset) for offset in range(BATCH)],
+        )
+        return self._args.size * BATCH
+
+    async def cat(self, idx):
+        return len(await self.reader.cat(self._cid(idx), bytes_mode=True))
+
+    async def cat_stream(self, idx):
+        size = 0
+        async for chunk in self.reader.cat_stream(self._cid(idx)):
+            size += len(chunk)
+        return size
+
+    async def dag_put(self, idx):
+        await self.writer.dag.put(self.node(idx))
+        return 0
+
+    async def dag_get(self, idx):
+        block = await self.reader.dag.get(self.dag_cids[idx % len(self.dag_cids)])
+        return len(block.raw)
+
+    async def block_put(self, idx):
+        await self.writer.block.put(self.payload(idx))
+        return self._args.size
+
+    async def block_get(self, idx):
+        return len(await self.reader.block.get(self._cid(idx)))
+
+    async def pin_many(self, idx):
+        start = idx * BATCH % len(self.cids)
+        await self.writer.pin_many(self.cids[start:start + BATCH])
+        return 0
+
+    async def pin_ls(self, idx):
+        async for _ in self.writer.pin_ls():
+            pass
+        return 0
+
+    async def export_car(self, idx):
+        size = 0
+        async for chunk in self.reader.export_car(self._cid(idx)):
+            size += len(chunk)
+        return size
+
+    async def archive(self, idx):
+        await self.writer.archive({'': self.payload(idx)})
+        return self._args.size
+
+    async def get_proof(self, idx):
+        await self.reader.get_proof(self._cid(idx))
+        return 0
+
+    async def retrieve(self, idx):
+        stats = await self.reader.retrieve(
+            self._cid(idx), os.path.join(self._tmp_dir, f'retrieve_{idx}.car'),
+        )
+        return stats.bytes
+
+
+OPERATIONS = (
+    'add_bytes', 'add_many', 'cat', 'cat_stream', 'dag_put', 'dag_get',
+    'block_put', 'block_get', 'pin_many', 'pin_ls', 'export_car', 'archive',
+    'get_proof', 'retrieve',
+)
+
+
+async def run_operation(bench, name, requests, concurrency):
+    operation = getattr(bench, name)
+    latencies = []
+    moved = 0
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal moved, errors
+        for idx in remaining:
+            started = time.perf_counter()
+            try:
+                size = await operation(idx)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            moved += size
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    ordered = sorted(latencies) or [0.0]
+    return {
+        'throughput': requests / elapsed,
+        'mb_per_sec': moved / elapsed / 1e6,
+        'p50_ms': _percentile(ordered, 0.50) * 1e3,
+        'p95_ms': _percentile(ordered, 0.95) * 1e3,
+        'p99_ms': _percentile(ordered, 0.99) * 1e3,
+        'errors': errors,
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+
+
+def _print_result(name, result):
+    rss = result['peak_rss_mb']
+    rss = f'{rss:>7.1f}MB' if rss is not None else 'n/a'
+    print(
+        f'{name:<11} {result["throughput"]:>9.1f} ops/s '
+        f'{result["mb_per_sec"]:>8.2f} MB/s '
+        f'p50 {result["p50_ms"]:>7.2f}ms '
+        f'p95 {result["p95_ms"]:>7.2f}ms '
+        f'p99 {result["p99_ms"]:>7.2f}ms '
+        f'errors {result["errors"]:>4} '
+        f'peak RSS {rss}',
+    )
+
+
+def compare(results, baseline, tolerance):
+    """Regressions of `results` against `baseline`, as printable lines."""
+    regressions = []
+    checks = (
+        # metric, True when higher is better
+        ('throughput', True),
+        ('p95_ms', False),
+        ('p99_ms', False),
+        ('peak_rss_mb', False),
+    )
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric, higher_is_better in checks:
+            value, reference = result.get(metric), base.get(metric)
+            if not value or not reference:
+                continue
+            if higher_is_better:
+                regressed = value < reference * (1 - tolerance)
+            else:
+                regressed = value > reference * (1 + tolerance)
+            if regressed:
+                regressions.append(
+                    f'{name} {metric}: {value:.2f} vs baseline {reference:.2f}',
+                )
+    return regressions
+
+
+def _run_config(args):
+    # the arguments that change the numbers, a baseline is only comparable
+    # to a run with the same ones
+    return {
+        key: getattr(args, key)
+        for key in (
+            'requests', 'concurrency', 'size', 'latency', 'jitter',
+            'error_rate', 'error_status', 'prepared', 'seed',
+        )
+    }
+
+
+async def main(args):
+    names = args.ops.split(',') if args.ops else OPERATIONS
+    unknown = set(names) - set(OPERATIONS)
+    if unknown:
+        raise SystemExit(f'Unknown operations: {", ".join(sorted(unknown))}')
+    bench = ClientBench(args)
+    await bench.setup()
+    results = {}
+    try:
+        for name in names:
+            results[name] = await run_operation(
+                bench, name, args.requests, args.concurrency,
+            )
+            _print_result(name, results[name])
+    finally:
+        await bench.aclose()
+    if args.error_rate:
+        print(f'injected errors: {sum(bench.mock.errors.values())}')
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({'config': _run_config(args), 'results': results}, f, indent=2)
+        print(f'baseline saved to {args.save_baseline}')
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('config') != _run_config(args):
+            print('warning: the baseline was taken with different arguments')
+        regressions = compare(results, baseline['results'], args.tolerance)
+        for line in regressions:
+            print(f'REGRESSION {line}')
+        if regressions:
+            return 1
+        print(f'no regressions against {args.baseline}')
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--ops', help=f'comma separated subset of {",".join(OPERATIONS)}')
+    parser.add_argument('--requests', type=int, default=500, help='calls per operation')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--size', type=int, default=4096, help='payload size in bytes')
+    parser.add_argument('--prepared', type=int, default=64, help='CIDs added before the read benchmarks')
+    parser.add_argument('--latency', type=float, default=0.0, help='server latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='random extra latency in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests failed by the server')
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', help='compare against the baseline stored in this file')
+    parser.add_argument('--save-baseline', help='store the results as a baseline in this file')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative regression')
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,73 @@
+import argparse
+import importlib.util
+import os
+import time
+
+from ipfs_client import dag_cbor
+from ipfs_client.codec import get_codec
+
+
+# Compares the encoded size and the encode/decode time of DAG nodes across
+# dag-cbor and the available dag-json backends, no node is needed. Run it as:
+# poetry run python -m ipfs_client.benchmarks.dag_codec_bench --nodes 2000
+
+
+LINK = {'/': 'bafyreidykglsfhoixmivffc5uwhcgshx4j465xwqntbmu43nb2dzqwfvae'}
+
+
+def sample_node(idx):
+    # a snapshot-like node: scalars, a nested map, a list of links and a
+    # binary field (base64 encoded for the JSON codecs)
+    return {
+        'epoch': idx,
+        'timestamp': 1700000000 + idx,
+        'price': 1234.5678 + idx,
+        'project': f'project-{idx % 17}',
+        'meta': {'source': 'bench', 'version': 3, 'tags': ['a', 'b', 'c']},
+        'parents': [LINK] * 4,
+        'payload': os.urandom(64),
+    }
+
+
+def json_form(node):
+    return dict(node, payload={'/': {'bytes': node['payload'].hex()}})
+
+
+def measure(name, encode, decode, nodes, rounds):
+    encoded = [encode(node) for node in nodes]
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for node in nodes:
+            encode(node)
+    encode_time = (time.perf_counter() - started) / (rounds * len(nodes))
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for data in encoded:
+            decode(data)
+    decode_time = (time.perf_counter() - started) / (rounds * len(nodes))
+    size = sum(len(data) for data in encoded) / len(encoded)
+    print(
+        f'{name:<18} {size:>8.1f} B/node '
+        f'encode {encode_time * 1e6:>8.2f}us decode {decode_time * 1e6:>8.2f}us',
+    )
+
+
+def main(args):
+    nodes = [sample_node(idx) for idx in range(args.nodes)]
+    json_nodes = [json_form(node) for node in nodes]
+    measure('dag-cbor', dag_cbor.encode, dag_cbor.decode, nodes, args.rounds)
+    for backend in ('json', 'orjson', 'msgspec'):
+        if backend != 'json' and importlib.util.find_spec(backend) is None:
+            continue
+        codec = get_codec(backend)
+        measure(
+            f'dag-json ({backend})', codec.dumps, codec.loads,
+            json_nodes, args.rounds,
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nodes', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,110 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+
+# Measures the cold import time of the client, what short-lived CLI jobs and
+# serverless workers pay on every start. Every run imports the modules in a
+# fresh interpreter with `-X importtime`. Run it as:
+# poetry run python -m ipfs_client.benchmarks.import_bench --repeat 10
+# The median cumulative import time of every module is printed, followed by
+# the slowest imports of the first module and the optional dependencies that
+# were loaded although no client was used. `--save-baseline FILE` and
+# `--baseline FILE` work like in client_bench.
+
+
+MODULES = ('ipfs_client.main', 'ipfs_client.benchmarks.client_bench')
+# only imported once a feature that needs them is used
+DEFERRED = ('apscheduler', 'multiaddr', 'validators')
+
+
+def _import_times(module):
+    # cumulative microseconds per imported module, as reported by importtime
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times.setdefault(name.strip(), int(cumulative))
+    return times
+
+
+def _loaded(module):
+    script = (
+        f'import sys; import {module}; '
+        f'print(",".join(m for m in {DEFERRED!r} if m in sys.modules))'
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', script], capture_output=True, text=True, check=True,
+    )
+    return [name for name in result.stdout.strip().split(',') if name]
+
+
+def measure(module, repeat):
+    runs = [_import_times(module) for _ in range(repeat)]
+    medians = {
+        name: statistics.median(run.get(name, 0) for run in runs) / 1e3
+        for name in runs[0]
+    }
+    return medians[module], medians
+
+
+def compare(results, baseline, tolerance):
+    """Modules whose import got slower than `tolerance` allows, as printable
+    lines."""
+    return [
+        f'{module}: {value:.1f}ms vs baseline {baseline[module]:.1f}ms'
+        for module, value in results.items()
+        if baseline.get(module) and value > baseline[module] * (1 + tolerance)
+    ]
+
+
+def main(args):
+    modules = args.modules.split(',') if args.modules else MODULES
+    results = {}
+    for idx, module in enumerate(modules):
+        total, medians = measure(module, args.repeat)
+        results[module] = total
+        print(f'{module:<40} {total:>8.1f}ms')
+        if idx == 0:
+            slowest = sorted(
+                (item for item in medians.items() if item[0] != module),
+                key=lambda item: item[1], reverse=True,
+            )
+            for name, value in slowest[:args.top]:
+                print(f'    {name:<36} {value:>8.1f}ms')
+        loaded = _loaded(module)
+        if loaded:
+            print(f'    loaded on import: {", ".join(loaded)}')
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({'repeat': args.repeat, 'results': results}, f, indent=2)
+        print(f'baseline saved to {args.save_baseline}')
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline['results'], args.tolerance)
+        for line in regressions:
+            print(f'REGRESSION {line}')
+        if regressions:
+            return 1
+        print(f'no regressions against {args.baseline}')
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--modules', help=f'comma separated modules, default {",".join(MODULES)}')
+    parser.add_argument('--repeat', type=int, default=5, help='fresh interpreters per module')
+    parser.add_argument('--top', type=int, default=15, help='slowest imports listed')
+    parser.add_argument('--baseline', help='compare against the baseline stored in this file')
+    parser.add_argument('--save-baseline', help='store the results as a baseline in this file')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative regression')
+    sys.exit(main(parser.parse_args()))
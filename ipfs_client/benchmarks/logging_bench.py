@@ -0,0 +1,156 @@
+import argparse
+import asyncio
+import sys
+import time
+
+from loguru import logger
+
+from ipfs_client import default_logger
+from ipfs_client.default_logger import configure_logging
+from ipfs_client.default_logger import debug_enabled
+
+
+# Measures how long logging on hot paths stalls the event loop. Worker tasks
+# log a debug and an info record per simulated request while a probe task
+# sleeps 1ms at a time and records how late it wakes up. Run it as:
+# poetry run python -m ipfs_client.benchmarks.logging_bench --records 20000 --log-file /tmp/bench.log
+# Compared setups:
+#   legacy       the sinks the package used to add on import: stdout at DEBUG
+#                and stderr twice, synchronous, with diagnose=True
+#   sync-info    one synchronous stderr sink at INFO
+#   enqueue-info configure_logging(): queued stderr sink at INFO, debug
+#                records skipped through debug_enabled()
+#   enqueue-debug the same at DEBUG, every record is queued
+#   loguru-enqueue a stderr sink at INFO with loguru's own enqueue, which
+#                pickles records through a multiprocessing queue
+# Without --log-file the records go to the console like they would by default.
+# --write-delay makes every write block for that many seconds, like a slow
+# terminal or a pipe whose reader falls behind.
+
+
+PROBE_INTERVAL = 0.001
+
+
+class SlowStream:
+    def __init__(self, stream, delay):
+        self._stream = stream
+        self._delay = delay
+
+    def write(self, message):
+        time.sleep(self._delay)
+        self._stream.write(message)
+
+    def flush(self):
+        self._stream.flush()
+
+
+def legacy_sinks(out, err):
+    logger.remove()
+    configure_logging(level='DEBUG', sink=None)
+    logger.add(out, level='DEBUG', format=default_logger.FORMAT)
+    logger.add(err, level='WARNING', format=default_logger.FORMAT)
+    logger.add(
+        err, level='ERROR', format=default_logger.FORMAT,
+        backtrace=True, diagnose=True,
+    )
+
+
+def sync_info(out, err):
+    logger.remove()
+    configure_logging(level='INFO', sink=err, enqueue=False)
+
+
+def enqueue_info(out, err):
+    logger.remove()
+    configure_logging(level='INFO', sink=err)
+
+
+def enqueue_debug(out, err):
+    logger.remove()
+    configure_logging(level='DEBUG', sink=err)
+
+
+def loguru_enqueue(out, err):
+    logger.remove()
+    configure_logging(level='INFO', sink=None)
+    logger.add(err, level='INFO', format=default_logger.FORMAT, enqueue=True)
+
+
+SETUPS = {
+    'legacy': legacy_sinks,
+    'sync-info': sync_info,
+    'enqueue-info': enqueue_info,
+    'enqueue-debug': enqueue_debug,
+    'loguru-enqueue': loguru_enqueue,
+}
+
+
+def _percentile(ordered, q):
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+async def run(records, workers):
+    # records are bound like the client's module loggers, and logged from
+    # a module of the package so that enable/disable applies to them
+    bound = logger.bind(module='LoggingBench')
+    lags = []
+    done = False
+
+    async def probe():
+        while not done:
+            started = time.perf_counter()
+            await asyncio.sleep(PROBE_INTERVAL)
+            lags.append(time.perf_counter() - started - PROBE_INTERVAL)
+
+    async def worker(count):
+        for idx in range(count):
+            if debug_enabled():
+                bound.debug('Skipping upload of known CID {}', idx)
+            bound.info('Successfully unpinned {}', idx)
+            # yield like a request waiting on the network would
+            await asyncio.sleep(0)
+
+    probe_task = asyncio.create_task(probe())
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(records // workers) for _ in range(workers)))
+    elapsed = time.perf_counter() - started
+    done = True
+    await probe_task
+    await logger.complete()
+    return elapsed, sorted(lags) or [0.0]
+
+
+def main(args):
+    log_file = open(args.log_file, 'a') if args.log_file else None
+    if log_file:
+        out = err = log_file
+    else:
+        out, err = sys.stdout, sys.stderr
+    if args.write_delay:
+        out, err = SlowStream(out, args.write_delay), SlowStream(err, args.write_delay)
+    results = []
+    for name in args.setups.split(','):
+        SETUPS[name](out, err)
+        elapsed, lags = asyncio.run(run(args.records, args.workers))
+        results.append((name, elapsed, lags))
+    logger.remove()
+    if log_file:
+        log_file.close()
+    # printed once every sink is gone, so the report is not interleaved
+    for name, elapsed, lags in results:
+        print(
+            f'{name:<14} {args.records / elapsed:>10.0f} req/s '
+            f'loop lag p50 {_percentile(lags, 0.50) * 1e3:>7.3f}ms '
+            f'p99 {_percentile(lags, 0.99) * 1e3:>7.3f}ms '
+            f'max {lags[-1] * 1e3:>8.3f}ms',
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--records', type=int, default=20000, help='simulated requests')
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--setups', default=','.join(SETUPS))
+    parser.add_argument('--log-file', help='write the records to this file instead of the console')
+    parser.add_argument('--write-delay', type=float, default=0.0, help='seconds every write blocks')
+    main(parser.parse_args())
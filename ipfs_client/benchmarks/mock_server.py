@@ -0,0 +1,330 @@
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import random
+from collections import Counter
+from typing import Dict
+from typing import Optional
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+from ipfs_client import dag_cbor
+from ipfs_client.car import CARDecoder
+from ipfs_client.car import CARWriter
+from ipfs_client.utils import cid as cid_util
+
+
+# An in-process stand-in for a kubo node, a Lassie daemon and the Lighthouse
+# APIs, served as an ASGI app. The client is pointed at it with
+# `AsyncIPFSClient(..., transport=httpx.ASGITransport(app=mock.app))`; the
+# host part of the configured URLs does not matter. Content is kept in memory
+# and addressed by real CIDs, so reads return what was written.
+
+
+def _parse_multipart(body: bytes, content_type: str):
+    # (filename, data) of every part of a multipart/form-data body
+    boundary = content_type.split('boundary=', 1)[1].strip('"').encode()
+    parts = []
+    for part in body.split(b'--' + boundary)[1:]:
+        if part.startswith(b'--'):
+            break
+        headers, _, data = part[2:].partition(b'\r\n\r\n')
+        filename = ''
+        for header in headers.split(b'\r\n'):
+            if b'filename="' in header:
+                filename = header.split(b'filename="', 1)[1].split(b'"', 1)[0].decode()
+        parts.append((filename, data[:-2]))
+    return parts
+
+
+def _dag_json_default(value):
+    if isinstance(value, bytes):
+        return {'/': {'bytes': base64.b64encode(value).decode().rstrip('=')}}
+    raise TypeError(f'Cannot encode {type(value)} as dag-json')
+
+
+def _cid_codec(cid: str) -> int:
+    data = cid_util.cid_to_bytes(cid)
+    if len(data) == 34 and data[0] == cid_util.SHA2_256:
+        # CIDv0
+        return cid_util.DAG_PB
+    _, end = cid_util.decode_varint(data)  # version
+    codec, _ = cid_util.decode_varint(data, end)
+    return codec
+
+
+def _ndjson(items):
+    return b''.join(json.dumps(item).encode() + b'\n' for item in items)
+
+
+class MockServices:
+    """Emulates the node, Lassie and Lighthouse endpoints used by the client.
+
+    Every request waits `latency` seconds plus up to `jitter` seconds, then
+    fails with `error_status` with probability `error_rate`. `/cat` of an
+    unknown CID returns `payload_size` bytes when set, so that read
+    benchmarks do not need to add their content first.
+    """
+
+    def __init__(
+            self,
+            latency: float = 0.0,
+            jitter: float = 0.0,
+            error_rate: float = 0.0,
+            error_status: int = 503,
+            payload_size: Optional[int] = None,
+            seed: int = 0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.payload_size = payload_size
+        self._random = random.Random(seed)
+        self.blocks: Dict[str, bytes] = {}
+        self.pins = set()
+        self.remote_pins: Dict[str, str] = {}
+        self.requests = Counter()
+        self.errors = Counter()
+        self.app = Starlette(routes=[
+            Route('/api/v0/version', self._handler(self.version), methods=['POST']),
+            Route('/api/v0/add', self._handler(self.add), methods=['POST']),
+            Route('/api/v0/cat', self._handler(self.cat), methods=['POST']),
+            Route('/api/v0/dag/put', self._handler(self.dag_put), methods=['POST']),
+            Route('/api/v0/dag/get', self._handler(self.dag_get), methods=['POST']),
+            Route('/api/v0/dag/export', self._handler(self.dag_export), methods=['POST']),
+            Route('/api/v0/dag/import', self._handler(self.dag_import), methods=['POST']),
+            Route('/api/v0/block/put', self._handler(self.block_put), methods=['POST']),
+            Route('/api/v0/block/get', self._handler(self.block_get), methods=['POST']),
+            Route('/api/v0/pin/add', self._handler(self.pin_add), methods=['POST']),
+            Route('/api/v0/pin/rm', self._handler(self.pin_rm), methods=['POST']),
+            Route('/api/v0/pin/ls', self._handler(self.pin_ls), methods=['POST']),
+            Route(
+                '/api/v0/pin/remote/service/add',
+                self._handler(self.remote_service_add), methods=['POST'],
+            ),
+            Route('/api/v0/pin/remote/add', self._handler(self.remote_pin_add), methods=['POST']),
+            Route('/api/v0/pin/remote/ls', self._handler(self.remote_pin_ls), methods=['POST']),
+            # Lassie
+            Route('/ipfs/{cid}', self._handler(self.lassie_fetch), methods=['GET']),
+            # Lighthouse, uploads share /api/v0/add with the node
+            Route(
+                '/api/lighthouse/get_proof',
+                self._handler(self.lighthouse_proof), methods=['GET'],
+            ),
+        ])
+
+    def _handler(self, endpoint):
+        async def handle(request: Request):
+            path = request.url.path
+            self.requests[path] += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            if delay:
+                await asyncio.sleep(delay)
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.errors[path] += 1
+                return self._error('injected failure', self.error_status)
+            return await endpoint(request)
+        return handle
+
+    def _error(self, message, status=500):
+        return Response(
+            json.dumps({'Message': message, 'Code': 0, 'Type': 'error'}),
+            status_code=status,
+            media_type='application/json',
+        )
+
+    def _store(self, codec, data):
+        cid = cid_util.make_cid(codec, hashlib.sha256(data).digest())
+        self.blocks[cid] = data
+        return cid
+
+    def _content(self, cid):
+        data = self.blocks.get(cid)
+        if data is None and self.payload_size is not None:
+            data = hashlib.sha256(cid.encode()).digest() * (self.payload_size // 32 + 1)
+            data = data[:self.payload_size]
+        return data
+
+    async def version(self, request: Request):
+        return Response(
+            json.dumps({'Version': '0.0.0-mock', 'Commit': '', 'Repo': '15'}),
+            media_type='application/json',
+        )
+
+    async def add(self, request: Request):
+        parts = _parse_multipart(await request.body(), request.headers['content-type'])
+        lines = []
+        for filename, data in parts:
+            cid = self._store(cid_util.RAW, data)
+            if request.query_params.get('pin', 'true') == 'true':
+                self.pins.add(cid)
+            lines.append({'Name': filename or cid, 'Hash': cid, 'Size': str(len(data))})
+        return Response(_ndjson(lines), media_type='application/x-ndjson')
+
+    async def cat(self, request: Request):
+        cid = request.query_params['arg']
+        data = self._content(cid)
+        if data is None:
+            return self._error(f'block was not found locally (offline): {cid}')
+        offset = int(request.query_params.get('offset', 0))
+        if offset > len(data):
+            return self._error('offset was past the end of file')
+        length = request.query_params.get('length')
+        end = offset + int(length) if length is not None else None
+        data = data[offset:end]
+        return Response(
+            data,
+            media_type='text/plain',
+            headers={'X-Content-Length': str(len(data))},
+        )
+
+    async def dag_put(self, request: Request):
+        _, data = _parse_multipart(await request.body(), request.headers['content-type'])[0]
+        input_codec = request.query_params.get('input-codec', 'dag-json')
+        if input_codec == 'dag-json':
+            data = dag_cbor.encode(json.loads(data))
+        cid = self._store(cid_util.DAG_CBOR, data)
+        if request.query_params.get('pin') == 'true':
+            self.pins.add(cid)
+        return Response(json.dumps({'Cid': {'/': cid}}), media_type='application/json')
+
+    async def dag_get(self, request: Request):
+        cid = request.query_params['arg']
+        data = self.blocks.get(cid)
+        if data is None:
+            return self._error(f'block was not found locally (offline): {cid}')
+        if _cid_codec(cid) == cid_util.RAW:
+            # like kubo, raw blocks are returned in the dag-json bytes form
+            node = _dag_json_default(data)
+        else:
+            node = dag_cbor.decode(data)
+        return Response(
+            json.dumps(node, default=_dag_json_default),
+            media_type='application/json',
+        )
+
+    def _car(self, cid):
+        data = self._content(cid)
+        if data is None:
+            return None
+        out = io.BytesIO()
+        writer = CARWriter(out, [cid])
+        writer.write_block(cid, data)
+        return out.getvalue()
+
+    async def dag_export(self, request: Request):
+        cid = request.query_params['arg']
+        car = self._car(cid)
+        if car is None:
+            return self._error(f'block was not found locally (offline): {cid}')
+        return Response(car, media_type='application/vnd.ipld.car')
+
+    async def dag_import(self, request: Request):
+        decoder = CARDecoder()
+        for _, data in _parse_multipart(await request.body(), request.headers['content-type']):
+            for block in decoder.feed(data):
+                self.blocks[block.cid] = block.data
+        decoder.close()
+        pin = request.query_params.get('pin-roots', 'true') == 'true'
+        lines = []
+        for root in decoder.roots:
+            if pin:
+                self.pins.add(root)
+            lines.append({'Root': {'Cid': {'/': root}, 'PinErrorMsg': ''}})
+        return Response(_ndjson(lines), media_type='application/x-ndjson')
+
+    async def block_put(self, request: Request):
+        _, data = _parse_multipart(await request.body(), request.headers['content-type'])[0]
+        codec = cid_util.CODECS.get(request.query_params.get('cid-codec', 'raw'), cid_util.RAW)
+        cid = self._store(codec, data)
+        if request.query_params.get('pin') == 'true':
+            self.pins.add(cid)
+        return Response(
+            json.dumps({'Key': cid, 'Size': len(data)}), media_type='application/json',
+        )
+
+    async def block_get(self, request: Request):
+        cid = request.query_params['arg']
+        data = self._content(cid)
+        if data is None:
+            return self._error(f'block was not found locally (offline): {cid}')
+        return Response(data, media_type='application/octet-stream')
+
+    async def pin_add(self, request: Request):
+        cids = request.query_params.getlist('arg')
+        self.pins.update(cids)
+        return Response(json.dumps({'Pins': cids}), media_type='application/json')
+
+    async def pin_rm(self, request: Request):
+        cids = request.query_params.getlist('arg')
+        for cid in cids:
+            if cid not in self.pins:
+                # like kubo, one bad CID fails the whole request
+                return self._error(f'{cid}: not pinned or pinned indirectly')
+        self.pins.difference_update(cids)
+        return Response(json.dumps({'Pins': cids}), media_type='application/json')
+
+    async def pin_ls(self, request: Request):
+        pin_type = request.query_params.get('type', 'recursive')
+        return Response(
+            _ndjson({'Cid': cid, 'Type': pin_type} for cid in sorted(self.pins)),
+            media_type='application/x-ndjson',
+        )
+
+    async def remote_service_add(self, request: Request):
+        return Response(b'', media_type='application/json')
+
+    async def remote_pin_add(self, request: Request):
+        cid = request.query_params['arg']
+        self.remote_pins[cid] = 'pinned'
+        return Response(
+            json.dumps({'Cid': cid, 'Status': 'queued', 'Name': ''}),
+            media_type='application/json',
+        )
+
+    async def remote_pin_ls(self, request: Request):
+        statuses = set(request.query_params.getlist('status'))
+        lines = [
+            {'Cid': cid, 'Status': self.remote_pins[cid], 'Name': ''}
+            for cid in request.query_params.getlist('cid') or list(self.remote_pins)
+            if cid in self.remote_pins
+            and (not statuses or self.remote_pins[cid] in statuses)
+        ]
+        return Response(_ndjson(lines), media_type='application/x-ndjson')
+
+    async def lassie_fetch(self, request: Request):
+        cid = request.path_params['cid']
+        car = self._car(cid)
+        if car is None:
+            return Response(b'no candidates found', status_code=502)
+        range_header = request.headers.get('range', '')
+        if range_header.startswith('bytes=') and range_header.endswith('-'):
+            start = int(range_header[len('bytes='):-1])
+            if start >= len(car):
+                return Response(
+                    b'', status_code=416,
+                    headers={'Content-Range': f'bytes */{len(car)}'},
+                )
+            return Response(
+                car[start:], status_code=206,
+                media_type='application/vnd.ipld.car',
+                headers={'Content-Range': f'bytes {start}-{len(car) - 1}/{len(car)}'},
+            )
+        return Response(car, media_type='application/vnd.ipld.car')
+
+    async def lighthouse_proof(self, request: Request):
+        cid = request.query_params['cid']
+        return Response(
+            json.dumps({
+                'pieceCID': cid,
+                'dealInfo': [],
+                'network': request.query_params.get('network'),
+            }),
+            media_type='application/json',
+        )
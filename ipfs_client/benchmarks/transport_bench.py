@@ -0,0 +1,110 @@
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from ipfs_client.main import AsyncIPFSClient
+from ipfs_client.settings.data_models import ConnectionLimits
+from ipfs_client.settings.data_models import IPFSConfig
+from ipfs_client.settings.data_models import IPFSWriterRateLimit
+from ipfs_client.settings.data_models import RemotePinningConfig
+from ipfs_client.settings.data_models import TransportConfig
+
+
+# Compares read latency and throughput of the transports available for a
+# daemon: TCP with HTTP/1.1, HTTP/2 (needs an HTTPS gateway and the h2
+# package) and a Unix domain socket. Run it as:
+# poetry run python -m ipfs_client.benchmarks.transport_bench \
+#   --tcp http://127.0.0.1:5001 --http2 https://gateway.example:5001 \
+#   --uds /unix/home/user/.ipfs/api.sock --requests 2000 --concurrency 32
+# Endpoints that are not given are skipped. The payload is added once through
+# every endpoint and then read back with /cat, bypassing the client cache and
+# request coalescing so that only the transport is measured.
+
+
+def _settings(url, http2, concurrency):
+    limits = ConnectionLimits(
+        max_connections=concurrency,
+        max_keepalive_connections=concurrency,
+        keepalive_expiry=60,
+    )
+    transport = TransportConfig(connection_limits=limits, http2=http2)
+    settings = IPFSConfig(
+        url=url,
+        reader_url=url,
+        write_rate_limit=IPFSWriterRateLimit(req_per_sec=100, burst=100),
+        timeout=60,
+        local_cache_path='/tmp/ipfs_cache',
+        connection_limits=limits,
+        remote_pinning=RemotePinningConfig(enabled=False),
+        writer_transport=transport,
+        reader_transport=transport,
+    )
+    settings.cache.enabled = False
+    settings.lifecycle.enabled = False
+    return settings
+
+
+def _percentile(ordered, q):
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+async def bench_transport(name, url, http2, payload, requests, concurrency):
+    settings = _settings(url, http2, concurrency)
+    writer = AsyncIPFSClient(addr=url, settings=settings, write_mode=True)
+    reader = AsyncIPFSClient(addr=url, settings=settings)
+    await writer.init_session()
+    await reader.init_session()
+    try:
+        cid = await writer.add_bytes(payload)
+        latencies = []
+        remaining = iter(range(requests))
+
+        async def worker():
+            for _ in remaining:
+                started = time.perf_counter()
+                r = await reader._client.post('/cat', params={'arg': cid})
+                r.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    finally:
+        await reader.aclose()
+        await writer.aclose()
+    ordered = sorted(latencies)
+    print(
+        f'{name:<6} {requests / elapsed:>10.1f} req/s '
+        f'{requests * len(payload) / elapsed / 1e6:>9.2f} MB/s '
+        f'mean {statistics.mean(ordered) * 1e3:>7.2f}ms '
+        f'p50 {_percentile(ordered, 0.50) * 1e3:>7.2f}ms '
+        f'p95 {_percentile(ordered, 0.95) * 1e3:>7.2f}ms '
+        f'p99 {_percentile(ordered, 0.99) * 1e3:>7.2f}ms',
+    )
+
+
+async def main(args):
+    payload = os.urandom(args.size)
+    targets = [
+        ('tcp', args.tcp, False),
+        ('http2', args.http2, True),
+        ('uds', args.uds, False),
+    ]
+    for name, url, http2 in targets:
+        if url:
+            await bench_transport(
+                name, url, http2, payload, args.requests, args.concurrency,
+            )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tcp', help='HTTP/1.1 URL or multiaddr of the daemon')
+    parser.add_argument('--http2', help='HTTPS URL or multiaddr of an HTTP/2 capable gateway')
+    parser.add_argument('--uds', help='/unix/... multiaddr of the daemon API socket')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--size', type=int, default=4096, help='payload size in bytes')
+    asyncio.run(main(parser.parse_args()))
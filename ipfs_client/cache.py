@@ -0,0 +1,205 @@
+import asyncio
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+from typing import Union
+
+from ipfs_client.default_logger import logger
+from ipfs_client.settings.data_models import CacheConfig
+
+
+class MemoryLRUCache:
+    """In-memory LRU of immutable payloads bounded by their total size."""
+
+    def __init__(self, max_bytes: int):
+        self._max_bytes = max_bytes
+        self._entries: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._size = 0
+        self.evictions = 0
+
+    @property
+    def size(self):
+        return self._size
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: bytes):
+        if len(value) > self._max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._size -= len(previous)
+        self._entries[key] = value
+        self._size += len(value)
+        while self._size > self._max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+            self.evictions += 1
+
+
+class DiskCache:
+    """Sharded on-disk store of immutable payloads bounded by their total size.
+
+    Entries are written atomically through a temporary file and read back as
+    read-only memory maps. The eviction index is rebuilt from the directory
+    on first use, oldest access first.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self._root = root
+        self._max_bytes = max_bytes
+        self._index: 'Optional[OrderedDict[str, int]]' = None
+        self._size = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    @property
+    def size(self):
+        return self._size
+
+    def _path(self, key: str):
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self._root, digest[:2], digest)
+
+    def _load_index(self):
+        entries = []
+        if os.path.isdir(self._root):
+            for shard in os.scandir(self._root):
+                if not shard.is_dir():
+                    continue
+                for entry in os.scandir(shard.path):
+                    if entry.name.startswith('.'):
+                        continue
+                    stat = entry.stat()
+                    entries.append((stat.st_atime, entry.path, stat.st_size))
+        entries.sort()
+        self._index = OrderedDict((path, size) for _, path, size in entries)
+        self._size = sum(self._index.values())
+        self._evict()
+
+    def get(self, key: str) -> Optional[memoryview]:
+        path = self._path(key)
+        with self._lock:
+            if self._index is None:
+                self._load_index()
+            if path not in self._index:
+                return None
+            self._index.move_to_end(path)
+        try:
+            with open(path, 'rb') as f:
+                # the mapping stays valid after the file is closed
+                return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        except (FileNotFoundError, ValueError):
+            with self._lock:
+                self._size -= self._index.pop(path, 0)
+            return None
+
+    def put(self, key: str, value: Union[bytes, memoryview]):
+        if not value or len(value) > self._max_bytes:
+            return
+        path = self._path(key)
+        shard = os.path.dirname(path)
+        os.makedirs(shard, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=shard, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        with self._lock:
+            if self._index is None:
+                self._load_index()
+            self._size -= self._index.pop(path, 0)
+            self._index[path] = len(value)
+            self._size += len(value)
+            self._evict()
+
+    def _evict(self):
+        while self._size > self._max_bytes and self._index:
+            path, size = self._index.popitem(last=False)
+            self._size -= size
+            self.evictions += 1
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+
+class CIDCache:
+    """Two-tier read cache keyed by CID.
+
+    CIDs address immutable content, so entries never need invalidation. The
+    memory tier holds recently used payloads, the disk tier lives under
+    `IPFSConfig.local_cache_path`.
+    """
+
+    def __init__(self, settings: CacheConfig, path: str):
+        self._settings = settings
+        self._memory = MemoryLRUCache(settings.memory_bytes)
+        self._disk = DiskCache(os.path.join(path, 'blocks'), settings.disk_bytes)
+        self._logger = logger.bind(module='IPFSCIDCache')
+        self._pending_writes = set()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[Union[bytes, memoryview]]:
+        value = self._memory.get(key)
+        if value is not None:
+            self.memory_hits += 1
+            return value
+        value = await asyncio.get_running_loop().run_in_executor(
+            None, self._disk.get, key,
+        )
+        if value is None:
+            self.misses += 1
+            return None
+        self.disk_hits += 1
+        if len(value) <= self._settings.promote_max_bytes:
+            promoted = bytes(value)
+            self._memory.put(key, promoted)
+            return promoted
+        return value
+
+    def put(self, key: str, value: bytes):
+        self._memory.put(key, value)
+        # the disk tier is written in the background so that reads are not
+        # delayed by the file system
+        task = asyncio.get_running_loop().run_in_executor(
+            None, self._disk.put, key, value,
+        )
+        self._pending_writes.add(task)
+        task.add_done_callback(self._write_done)
+
+    def _write_done(self, task):
+        self._pending_writes.discard(task)
+        if not task.cancelled() and task.exception():
+            self._logger.error(
+                'Failed to write cache entry to disk: {}', task.exception(),
+            )
+
+    async def flush(self):
+        if self._pending_writes:
+            await asyncio.gather(*self._pending_writes, return_exceptions=True)
+
+    def stats(self):
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'hits': self.memory_hits + self.disk_hits,
+            'misses': self.misses,
+            'memory_evictions': self._memory.evictions,
+            'disk_evictions': self._disk.evictions,
+            'memory_bytes': self._memory.size,
+            'disk_bytes': self._disk.size,
+        }
@@ -0,0 +1,208 @@
+import hashlib
+from typing import List
+from typing import NamedTuple
+
+from ipfs_client import dag_cbor
+from ipfs_client.utils import cid as cid_util
+
+
+# CAR v1 (https://ipld.io/specs/transport/car/carv1/) is a varint prefixed
+# dag-cbor header followed by varint prefixed (CID, block) sections. CAR v2
+# wraps a v1 payload behind a fixed pragma and header and may append an index,
+# which is skipped here.
+
+_CARV2_HEADER_SIZE = 40
+
+
+class CARBlock(NamedTuple):
+    cid: str
+    data: bytes
+
+
+class CARFormatError(ValueError):
+    pass
+
+
+class CARDecoder:
+    """Incremental CAR v1/v2 decoder.
+
+    Bytes are pushed with `feed()`, which returns the blocks completed by
+    them; only an incomplete trailing section is kept buffered. `roots` and
+    `version` are set once the header has been decoded.
+    """
+
+    def __init__(self, verify: bool = False):
+        self._verify = verify
+        self._buffer = bytearray()
+        # absolute stream offset of the first buffered byte
+        self._offset = 0
+        self._state = 'header'
+        self._v1_end = None
+        self.version = None
+        self.roots: List[str] = []
+
+    def feed(self, data) -> List[CARBlock]:
+        self._buffer += data
+        blocks = []
+        while True:
+            if self._state == 'header':
+                if not self._read_header():
+                    break
+            elif self._state == 'v2_header':
+                if not self._read_v2_header():
+                    break
+            elif self._state == 'v2_skip':
+                if not self._skip_to_payload():
+                    break
+            elif self._state == 'sections':
+                block = self._read_section()
+                if block is None:
+                    break
+                blocks.append(block)
+            else:
+                # CAR v2 index or padding after the payload
+                self._consume(len(self._buffer))
+                break
+        return blocks
+
+    def close(self):
+        if self._state in ('header', 'v2_header', 'v2_skip') or (
+            self._state == 'sections' and self._buffer
+        ):
+            raise CARFormatError('Truncated CAR data')
+
+    def _consume(self, size):
+        del self._buffer[:size]
+        self._offset += size
+
+    def _read_prefixed(self):
+        # a varint length followed by that many bytes, None until complete
+        try:
+            length, start = cid_util.decode_varint(self._buffer)
+        except ValueError:
+            if len(self._buffer) >= 10:
+                raise CARFormatError('Invalid CAR section length')
+            return None
+        if len(self._buffer) < start + length:
+            return None
+        payload = bytes(self._buffer[start:start + length])
+        self._consume(start + length)
+        return payload
+
+    def _read_header(self):
+        header_bytes = self._read_prefixed()
+        if header_bytes is None:
+            return False
+        try:
+            header = dag_cbor.decode(header_bytes)
+        except (ValueError, IndexError) as e:
+            raise CARFormatError(f'Invalid CAR header: {e}')
+        version = header.get('version') if isinstance(header, dict) else None
+        if version == 2 and self.version is None:
+            self.version = 2
+            self._state = 'v2_header'
+        elif version == 1:
+            self.version = self.version or 1
+            self.roots = [root['/'] for root in header.get('roots', [])]
+            self._state = 'sections'
+        else:
+            raise CARFormatError(f'Unsupported CAR version: {version}')
+        return True
+
+    def _read_v2_header(self):
+        if len(self._buffer) < _CARV2_HEADER_SIZE:
+            return False
+        header = bytes(self._buffer[:_CARV2_HEADER_SIZE])
+        self._consume(_CARV2_HEADER_SIZE)
+        data_offset = int.from_bytes(header[16:24], 'little')
+        data_size = int.from_bytes(header[24:32], 'little')
+        self._data_offset = data_offset
+        self._v1_end = data_offset + data_size
+        self._state = 'v2_skip'
+        return True
+
+    def _skip_to_payload(self):
+        skip = self._data_offset - self._offset
+        if skip > len(self._buffer):
+            self._consume(len(self._buffer))
+            return False
+        self._consume(skip)
+        self._state = 'header'
+        return True
+
+    def _read_section(self):
+        if self._v1_end is not None and self._offset >= self._v1_end:
+            self._state = 'done'
+            return None
+        section = self._read_prefixed()
+        if section is None:
+            return None
+        try:
+            cid_size = cid_util.cid_length(section)
+        except (ValueError, IndexError):
+            raise CARFormatError('Invalid CID in CAR section')
+        cid_bytes, data = section[:cid_size], section[cid_size:]
+        if self._verify:
+            _verify_block(cid_bytes, data)
+        return CARBlock(cid_util.cid_from_bytes(cid_bytes), data)
+
+
+def _verify_block(cid_bytes, data):
+    if len(cid_bytes) == 34:
+        hash_code, digest = cid_bytes[0], cid_bytes[2:]
+    else:
+        _, offset = cid_util.decode_varint(cid_bytes)
+        _, offset = cid_util.decode_varint(cid_bytes, offset)
+        hash_code, offset = cid_util.decode_varint(cid_bytes, offset)
+        _, offset = cid_util.decode_varint(cid_bytes, offset)
+        digest = cid_bytes[offset:]
+    if hash_code == cid_util.SHA2_256 and hashlib.sha256(data).digest() != digest:
+        raise CARFormatError(
+            f'Block digest does not match CID {cid_util.cid_from_bytes(cid_bytes)}',
+        )
+
+
+def iter_blocks(path, chunk_size: int = 256 * 1024, verify: bool = False):
+    """Yield the blocks of the CAR file at `path`, reading it in chunks so
+    that memory use does not depend on the file size."""
+    decoder = CARDecoder(verify)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            yield from decoder.feed(chunk)
+    decoder.close()
+
+
+async def aiter_blocks(chunks, verify: bool = False):
+    """Yield the blocks of a CAR delivered as an async iterable of bytes,
+    e.g. `AsyncIPFSClient.export_car()`."""
+    decoder = CARDecoder(verify)
+    async for chunk in chunks:
+        for block in decoder.feed(chunk):
+            yield block
+    decoder.close()
+
+
+def read_roots(path) -> List[str]:
+    decoder = CARDecoder()
+    with open(path, 'rb') as f:
+        while decoder.version is None or decoder._state != 'sections':
+            chunk = f.read(4096)
+            if not chunk:
+                break
+            decoder.feed(chunk)
+    return decoder.roots
+
+
+class CARWriter:
+    """Writes a CAR v1 stream to a binary file object, block by block."""
+
+    def __init__(self, fileobj, roots: List[str]):
+        self._file = fileobj
+        header = dag_cbor.encode({'roots': [{'/': root} for root in roots], 'version': 1})
+        self._file.write(cid_util.encode_varint(len(header)) + header)
+
+    def write_block(self, cid: str, data: bytes):
+        cid_bytes = cid_util.cid_to_bytes(cid)
+        self._file.write(cid_util.encode_varint(len(cid_bytes) + len(data)))
+        self._file.write(cid_bytes)
+        self._file.write(data)
@@ -0,0 +1,121 @@
+import importlib.util
+import json
+import sys
+
+from ipfs_client.default_logger import logger
+
+
+def _default(obj):
+    # pydantic models are encoded as their field dict
+    if hasattr(obj, 'dict'):
+        return obj.dict()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def _is_msgspec_struct(model):
+    # a Struct type can only exist once msgspec has been imported
+    msgspec = sys.modules.get('msgspec')
+    return msgspec is not None and isinstance(model, type) and issubclass(model, msgspec.Struct)
+
+
+# the output of `json.dumps` with its defaults, which add_json has always
+# uploaded; built once instead of on every call
+_canonical_encoder = json.JSONEncoder(allow_nan=False, default=_default)
+
+
+def canonical_dumps(obj) -> bytes:
+    """Encode `obj` the way `add_json` stores it, byte for byte what
+    `json.dumps(obj).encode()` returns, so that CIDs neither depend on the
+    installed backend nor change between client versions. NaN and Infinity
+    are not JSON and raise ValueError."""
+    return _canonical_encoder.encode(obj).encode('utf-8')
+
+
+class JSONCodec:
+    """Encodes objects to and decodes them from JSON bytes.
+
+    The fast backends encode compactly, format floats differently (`1e+16`
+    with the stdlib, `1e16` with orjson) and orjson encodes NaN as null, so
+    content whose CID matters is encoded with `canonical_dumps` instead. Decode errors are
+    raised as `json.JSONDecodeError` by every backend.
+    """
+    name = 'json'
+
+    def dumps(self, obj) -> bytes:
+        return canonical_dumps(obj)
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def decode(self, data, model=None):
+        """Decode `data` (bytes or str), into an instance of `model` when a
+        pydantic model or msgspec Struct type is given."""
+        if model is None:
+            return self.loads(data)
+        if _is_msgspec_struct(model):
+            import msgspec
+            try:
+                return msgspec.json.decode(data, type=model)
+            except msgspec.DecodeError as e:
+                raise json.JSONDecodeError(str(e), '', 0) from e
+        return model.parse_obj(self.loads(data))
+
+
+class OrjsonCodec(JSONCodec):
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+
+    def dumps(self, obj) -> bytes:
+        return self._orjson.dumps(
+            obj, default=_default, option=self._orjson.OPT_NON_STR_KEYS,
+        )
+
+    def loads(self, data):
+        # orjson.JSONDecodeError subclasses json.JSONDecodeError
+        return self._orjson.loads(data)
+
+
+class MsgspecCodec(JSONCodec):
+    name = 'msgspec'
+
+    def __init__(self):
+        import msgspec
+        self._msgspec = msgspec
+        self._encoder = msgspec.json.Encoder(enc_hook=_default)
+        self._decoder = msgspec.json.Decoder()
+
+    def dumps(self, obj) -> bytes:
+        return self._encoder.encode(obj)
+
+    def loads(self, data):
+        try:
+            return self._decoder.decode(data)
+        except self._msgspec.DecodeError as e:
+            raise json.JSONDecodeError(str(e), '', 0) from e
+
+
+_BACKENDS = {
+    'orjson': OrjsonCodec,
+    'msgspec': MsgspecCodec,
+    'json': JSONCodec,
+}
+
+
+def get_codec(name: str = 'auto') -> JSONCodec:
+    """Return the codec for `name`; 'auto' picks orjson, then msgspec, then
+    the stdlib. A backend that is not installed falls back to the stdlib."""
+    if name == 'auto':
+        for backend in ('orjson', 'msgspec'):
+            if importlib.util.find_spec(backend) is not None:
+                return _BACKENDS[backend]()
+        return JSONCodec()
+    if name != 'json' and importlib.util.find_spec(name) is None:
+        logger.bind(module='JSONCodec').warning(
+            'JSON codec {} requested but the package is not installed, falling back to json',
+            name,
+        )
+        return JSONCodec()
+    return _BACKENDS[name]()
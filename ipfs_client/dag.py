@@ -1,12 +1,22 @@
+import asyncio
 import json
-from io import BytesIO
+from contextlib import nullcontext
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Union
 
 from httpx import AsyncClient
 
+from ipfs_client import dag_cbor
+from ipfs_client.codec import JSONCodec
+
 
 class IPFSAsyncClientError(Exception):
-    def __init__(self, message: str):
+    def __init__(self, message: str, status_code: Optional[int] = None):
         self._message = message
+        # HTTP status of the node response that caused the error, if any
+        self.status_code = status_code
 
     def __str__(self) -> str:
         return self._message
@@ -15,42 +25,259 @@ class IPFSAsyncClientError(Exception):
         return self._message
 
 
+class IPFSContentTooLargeError(IPFSAsyncClientError):
+    pass
+
+
+class IPFSRateLimitError(IPFSAsyncClientError):
+    pass
+
+
+class IPFSCircuitOpenError(IPFSAsyncClientError):
+    pass
+
+
+class IPFSDeadlineExceededError(IPFSAsyncClientError):
+    pass
+
+
+_UNPARSED = object()
+
+
 class DAGBlock:
-    def __init__(self, json_body: str):
-        self._dag_block_json = json_body
+    """A dag-json block as returned by the node.
+
+    The body is kept as bytes and parsed on the first `as_json()` call, the
+    parsed document is cached and returned by later calls, callers must not
+    modify it.
+    """
+
+    def __init__(self, body: Union[bytes, str], codec=None, cid: Optional[str] = None):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self._body = body
+        self._codec = codec or JSONCodec()
+        self._parsed = _UNPARSED
+        self.cid = cid
+
+    @property
+    def raw(self) -> bytes:
+        return self._body
 
     def as_json(self):
-        return json.loads(self._dag_block_json)
+        if self._parsed is _UNPARSED:
+            self._parsed = self._codec.loads(self._body)
+        return self._parsed
+
+    def links(self) -> List[str]:
+        """CIDs linked from the block, in document order."""
+        links = []
+        stack = [self.as_json()]
+        while stack:
+            value = stack.pop()
+            if isinstance(value, dict):
+                link = value.get('/')
+                if len(value) == 1 and isinstance(link, str):
+                    links.append(link)
+                else:
+                    stack.extend(reversed(list(value.values())))
+            elif isinstance(value, list):
+                stack.extend(reversed(value))
+        return links
 
     def __str__(self):
-        return self._dag_block_json
+        return str(self._body, 'utf-8')
 
 
-class DAGSection:
-    def __init__(self, async_client: AsyncClient):
+class DAGNode(NamedTuple):
+    cid: str
+    depth: int
+    block: DAGBlock
+
+
+class _Section:
+    """Shared plumbing of the DAG and block API sections."""
+
+    def __init__(
+            self,
+            async_client: AsyncClient,
+            cache=None,
+            rate_limiter=None,
+            inflight=None,
+            reader=None,
+            resilience=None,
+            codec=None,
+            work=None,
+            instrumentation=None,
+    ):
         self._client: AsyncClient = async_client
+        self._cache = cache
+        self._rate_limiter = rate_limiter
+        self._inflight = inflight
+        # `reader(operation, fn)` runs fn(client) with the retry, breaker and
+        # reader pool handling of the owning AsyncIPFSClient
+        self._reader = reader
+        self._resilience = resilience
+        self._codec = codec or JSONCodec()
+        self._work = work
+        self._instrumentation = instrumentation
+
+    async def _write(self, operation, body, **request_kwargs):
+        async def attempt():
+            if hasattr(body, 'seek'):
+                # a retried attempt has to send the body from the start
+                body.seek(0)
+            if self._rate_limiter:
+                await self._rate_limiter.acquire()
+            r = await self._client.post(files={'': body}, **request_kwargs)
+            if self._rate_limiter:
+                self._rate_limiter.feedback(r.status_code)
+            return r
+
+        async def call():
+            if self._resilience:
+                return await self._resilience.call(
+                    operation, str(self._client.base_url), attempt, idempotent=False,
+                )
+            return await attempt()
 
-    async def put(self, bytes_body: BytesIO, pin=True):
-        files = {'': bytes_body}
-        r = await self._client.post(
-            url=f'/dag/put?pin={str(pin).lower()}',
-            files=files,
+        tracing = (
+            self._instrumentation.operation(operation, endpoint=str(self._client.base_url))
+            if self._instrumentation else nullcontext()
         )
+        with tracing:
+            r = await self._work.run(operation, call) if self._work else await call()
         if r.status_code != 200:
             raise IPFSAsyncClientError(
-                f'IPFS client error: dag-put operation, response:{r}',
+                f'IPFS client error: {operation} operation, response:{r}',
+                status_code=r.status_code,
             )
+        return r
+
+    async def _read_content(self, operation, url, arg, key_prefix) -> bytes:
+        # content addressed responses are immutable, they are cached and
+        # coalesced across concurrent callers
+        cache_key = f'{key_prefix}/{arg}'
+        if self._cache:
+            cached = await self._cache.get(cache_key)
+            if cached is not None:
+                return bytes(cached)
+        if self._inflight:
+            return await self._inflight.do(
+                (key_prefix, arg),
+                lambda: self._fetch(operation, url, arg, cache_key),
+            )
+        return await self._fetch(operation, url, arg, cache_key)
+
+    async def _fetch(self, operation, url, arg, cache_key):
+        if self._reader:
+            content = await self._reader(
+                operation, lambda client: self._get_from(client, operation, url, arg),
+                cid=arg,
+            )
+        else:
+            content = await self._get_from(self._client, operation, url, arg)
+
+        if self._cache:
+            self._cache.put(cache_key, content)
+        return content
+
+    async def _get_from(self, client: AsyncClient, operation, url, arg):
+        response = await client.post(url=url, params={'arg': arg})
+        if response.status_code != 200:
+            raise IPFSAsyncClientError(
+                f'IPFS client error: {operation} operation, response:{response}',
+                status_code=response.status_code,
+            )
+        return response.content
+
+
+class DAGSection(_Section):
+    async def put(self, body, pin=True, store_codec=None, input_codec=None):
+        """Store a DAG node.
+
+        `body` is either the encoded node (bytes or a file object), sent as
+        is with `input_codec` (the node defaults to dag-json), or a Python
+        object that is encoded locally with `input_codec`, dag-cbor unless
+        'dag-json' is asked for. `store_codec` is the codec of the stored
+        block, the node defaults to dag-cbor.
+        """
+        if not isinstance(body, (bytes, bytearray, memoryview)) and not hasattr(body, 'read'):
+            if input_codec is None:
+                input_codec = 'dag-cbor'
+            if input_codec == 'dag-cbor':
+                body = dag_cbor.encode(body)
+            elif input_codec == 'dag-json':
+                body = self._codec.dumps(body)
+            else:
+                raise ValueError(f'Cannot encode a DAG node as {input_codec}')
+        params = {'pin': str(pin).lower()}
+        if store_codec:
+            params['store-codec'] = store_codec
+        if input_codec:
+            params['input-codec'] = input_codec
+        r = await self._write('dag_put', body, url='/dag/put', params=params)
         try:
-            return json.loads(r.text)
+            return self._codec.loads(r.content)
         except json.JSONDecodeError:
             return r.text
 
     async def get(self, dag_cid):
+        # `dag_cid` may carry a path (cid/path/to/node), the node resolves it
+        # and returns only the addressed value
+        content = await self._read_content('dag_get', '/dag/get', dag_cid, 'dag')
+        return DAGBlock(content, self._codec, dag_cid)
 
-        response = await self._client.post(url=f'/dag/get?arg={dag_cid}')
-        if response.status_code != 200:
+    async def walk(self, root, max_depth=None, concurrency=8):
+        """Breadth-first traversal of the DAG below `root`, yielding a
+        `DAGNode` per block.
+
+        `root` may be a CID or a `cid/path` that the node resolves, so only
+        the addressed subtree is fetched. Each block is fetched once even when
+        linked several times, blocks of a level are fetched concurrently, at
+        most `concurrency` at a time. `max_depth` limits how many links are
+        followed from the root, None follows all of them.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(dag_cid):
+            async with semaphore:
+                return await self.get(dag_cid)
+
+        visited = {root}
+        level = [root]
+        depth = 0
+        while level:
+            blocks = await asyncio.gather(*(fetch(dag_cid) for dag_cid in level))
+            next_level = []
+            for dag_cid, block in zip(level, blocks):
+                yield DAGNode(dag_cid, depth, block)
+                if max_depth is not None and depth >= max_depth:
+                    continue
+                for link in block.links():
+                    if link not in visited:
+                        visited.add(link)
+                        next_level.append(link)
+            level = next_level
+            depth += 1
+
+
+class BlockSection(_Section):
+    async def put(self, data, cid_codec='raw', mhtype='sha2-256', pin=False):
+        """Store `data` as a single block and return its CID."""
+        r = await self._write(
+            'block_put',
+            data,
+            url='/block/put',
+            params={'cid-codec': cid_codec, 'mhtype': mhtype, 'pin': str(pin).lower()},
+        )
+        try:
+            return self._codec.loads(r.content)['Key']
+        except (json.JSONDecodeError, KeyError):
             raise IPFSAsyncClientError(
-                f'IPFS client error: dag-get operation, response:{response}',
+                f'IPFS client error: block_put operation, unexpected response:{r.text}',
             )
 
-        return DAGBlock(response.text)
+    async def get(self, cid) -> bytes:
+        """Return the raw bytes of the block `cid`."""
+        return await self._read_content('block_get', '/block/get', cid, 'block')
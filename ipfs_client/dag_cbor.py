@@ -0,0 +1,141 @@
+import math
+import struct
+
+from ipfs_client.utils import cid as cid_util
+
+
+# Strict dag-cbor (https://ipld.io/specs/codecs/dag-cbor/spec/): shortest
+# integer encoding, 64-bit floats, map keys sorted by length then bytewise,
+# links as tag 42. Links are written the dag-json way, as a dict holding a
+# single '/' key with the CID string, and decoded back to that form.
+
+_CID_TAG = 42
+
+
+def _head(major: int, value: int, out: bytearray):
+    if value < 24:
+        out.append(major << 5 | value)
+    elif value < 0x100:
+        out.append(major << 5 | 24)
+        out.append(value)
+    elif value < 0x10000:
+        out.append(major << 5 | 25)
+        out += value.to_bytes(2, 'big')
+    elif value < 0x100000000:
+        out.append(major << 5 | 26)
+        out += value.to_bytes(4, 'big')
+    elif value < 0x10000000000000000:
+        out.append(major << 5 | 27)
+        out += value.to_bytes(8, 'big')
+    else:
+        raise ValueError('Integer out of dag-cbor range')
+
+
+def _encode(obj, out: bytearray):
+    if obj is None:
+        out.append(0xF6)
+    elif obj is True:
+        out.append(0xF5)
+    elif obj is False:
+        out.append(0xF4)
+    elif isinstance(obj, int):
+        if obj >= 0:
+            _head(0, obj, out)
+        else:
+            _head(1, -1 - obj, out)
+    elif isinstance(obj, float):
+        if math.isnan(obj) or math.isinf(obj):
+            raise ValueError('dag-cbor does not allow NaN or infinite floats')
+        out.append(0xFB)
+        out += struct.pack('>d', obj)
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        _head(2, len(obj), out)
+        out += obj
+    elif isinstance(obj, str):
+        data = obj.encode('utf-8')
+        _head(3, len(data), out)
+        out += data
+    elif isinstance(obj, (list, tuple)):
+        _head(4, len(obj), out)
+        for item in obj:
+            _encode(item, out)
+    elif isinstance(obj, dict):
+        link = obj.get('/')
+        if len(obj) == 1 and isinstance(link, str):
+            _head(6, _CID_TAG, out)
+            data = b'\x00' + cid_util.cid_to_bytes(link)
+            _head(2, len(data), out)
+            out += data
+            return
+        items = []
+        for key, value in obj.items():
+            if not isinstance(key, str):
+                raise TypeError('dag-cbor map keys must be strings')
+            items.append((key.encode('utf-8'), value))
+        items.sort(key=lambda item: (len(item[0]), item[0]))
+        _head(5, len(items), out)
+        for key, value in items:
+            _head(3, len(key), out)
+            out += key
+            _encode(value, out)
+    elif hasattr(obj, 'dict'):
+        _encode(obj.dict(), out)
+    else:
+        raise TypeError(f'Object of type {type(obj).__name__} is not dag-cbor serializable')
+
+
+def encode(obj) -> bytes:
+    out = bytearray()
+    _encode(obj, out)
+    return bytes(out)
+
+
+def _read_head(data, offset):
+    initial = data[offset]
+    major, info = initial >> 5, initial & 0x1F
+    offset += 1
+    if info < 24:
+        return major, info, offset
+    if info in (24, 25, 26, 27):
+        size = 1 << (info - 24)
+        return major, int.from_bytes(data[offset:offset + size], 'big'), offset + size
+    raise ValueError('Indefinite lengths are not allowed in dag-cbor')
+
+
+def _decode(data, offset):
+    if data[offset] == 0xFB:
+        return struct.unpack_from('>d', data, offset + 1)[0], offset + 9
+    if data[offset] in (0xF4, 0xF5, 0xF6):
+        return {0xF4: False, 0xF5: True, 0xF6: None}[data[offset]], offset + 1
+    major, value, offset = _read_head(data, offset)
+    if major == 0:
+        return value, offset
+    if major == 1:
+        return -1 - value, offset
+    if major == 2:
+        return bytes(data[offset:offset + value]), offset + value
+    if major == 3:
+        return str(data[offset:offset + value], 'utf-8'), offset + value
+    if major == 4:
+        items = []
+        for _ in range(value):
+            item, offset = _decode(data, offset)
+            items.append(item)
+        return items, offset
+    if major == 5:
+        obj = {}
+        for _ in range(value):
+            key, offset = _decode(data, offset)
+            obj[key], offset = _decode(data, offset)
+        return obj, offset
+    if major == 6 and value == _CID_TAG:
+        link, offset = _decode(data, offset)
+        return {'/': cid_util.cid_from_bytes(link[1:])}, offset
+    raise ValueError(f'Unsupported dag-cbor item at offset {offset}')
+
+
+def decode(data):
+    obj, offset = _decode(data, 0)
+    if offset != len(data):
+        raise ValueError('Trailing bytes after dag-cbor item')
+    return obj
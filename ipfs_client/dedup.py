@@ -0,0 +1,124 @@
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+from typing import Optional
+
+from ipfs_client.default_logger import logger
+from ipfs_client.settings.data_models import DedupConfig
+from ipfs_client.utils import cid as cid_util
+
+
+DEFAULT_CHUNK_SIZE = 262144
+
+
+def local_cid(data: bytes, params) -> Optional[str]:
+    """CID the node assigns to `data` when added with `params`, None when it
+    cannot be derived locally.
+
+    With CIDv1 the node uses raw leaves unless told otherwise, and content
+    that fits in a single chunk is stored as one raw block, whose CID is the
+    sha2-256 digest of the data.
+    """
+    if params.get('cid-version') != 1 or params.get('raw-leaves') == 'false':
+        return None
+    chunker = params.get('chunker') or f'size-{DEFAULT_CHUNK_SIZE}'
+    if not chunker.startswith('size-'):
+        return None
+    try:
+        chunk_size = int(chunker[len('size-'):])
+    except ValueError:
+        return None
+    if len(data) > chunk_size:
+        return None
+    return cid_util.make_cid(cid_util.RAW, hashlib.sha256(data).digest())
+
+
+class DedupIndex:
+    """CIDs known to be stored on the node, used to skip uploading content
+    that was added before.
+
+    At most `max_entries` CIDs are kept in memory in LRU order; an evicted
+    CID only means the content is uploaded again. The index is persisted as
+    an append-only log under `path`, which is compacted when loaded.
+    """
+
+    def __init__(self, settings: DedupConfig, path: str):
+        self._settings = settings
+        self._path = os.path.join(path, settings.state_file)
+        self._entries: OrderedDict = OrderedDict()
+        self._log = None
+        self._logger = logger.bind(module='IPFSDedupIndex')
+        self.lookups = 0
+        self.hits = 0
+        self.bytes_saved = 0
+
+    def load(self):
+        if self._log is not None:
+            return
+        try:
+            with open(self._path, 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if line.startswith('-'):
+                        self._entries.pop(line[1:], None)
+                    elif line:
+                        self._entries[line] = None
+                        self._entries.move_to_end(line)
+        except FileNotFoundError:
+            pass
+        while len(self._entries) > self._settings.max_entries:
+            self._entries.popitem(last=False)
+        self._compact()
+        self._log = open(self._path, 'a')
+
+    def _compact(self):
+        os.makedirs(os.path.dirname(self._path) or '.', exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self._path) or '.')
+        with os.fdopen(fd, 'w') as f:
+            f.writelines(f'{cid}\n' for cid in self._entries)
+        os.replace(tmp_path, self._path)
+
+    def lookup(self, cid: Optional[str], size: int = 0) -> bool:
+        self.lookups += 1
+        if cid is None or cid not in self._entries:
+            return False
+        self._entries.move_to_end(cid)
+        self.hits += 1
+        self.bytes_saved += size
+        return True
+
+    def add(self, cid: str):
+        if cid in self._entries:
+            self._entries.move_to_end(cid)
+            return
+        self._entries[cid] = None
+        if len(self._entries) > self._settings.max_entries:
+            self._entries.popitem(last=False)
+        if self._log:
+            self._log.write(f'{cid}\n')
+
+    def discard(self, cid: str):
+        # unpinned content may be garbage collected by the node
+        self._entries.pop(cid, None)
+        # recorded even when evicted from memory, the log may still hold it
+        if self._log:
+            self._log.write(f'-{cid}\n')
+
+    def flush(self):
+        if self._log:
+            self._log.flush()
+
+    def close(self):
+        if self._log:
+            self._log.close()
+            self._log = None
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'lookups': self.lookups,
+            'hits': self.hits,
+            'hit_rate': self.hits / self.lookups if self.lookups else 0.0,
+            'bytes_saved': self.bytes_saved,
+        }
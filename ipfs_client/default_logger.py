@@ -1,16 +1,150 @@
+import os
+import queue
 import sys
+import threading
 
 from loguru import logger
 
 FORMAT = '{time:MMMM D, YYYY > HH:mm:ss!UTC} | {level} | {message}| {extra}'
 
+# The package adds no sinks on import and stays silent until the application
+# calls configure_logging(), as loguru recommends for libraries.
+logger.disable('ipfs_client')
 
-logger.add(sys.stdout, level='DEBUG', format=FORMAT)
-logger.add(sys.stderr, level='WARNING', format=FORMAT)
-logger.add(
-    sys.stderr,
-    level='ERROR',
-    format=FORMAT,
-    backtrace=True,
-    diagnose=True,
-)
+_DEBUG = logger.level('DEBUG').no
+_enabled = False
+# lowest level configure_logging() passes on, debug records below it are
+# not even formatted
+_level = None
+_handler_ids = []
+# stderr sink standing in for loguru's default one, without the client's records
+_default_id = None
+
+
+def _outside_client(record):
+    return not (record['name'] or '').startswith('ipfs_client')
+
+
+def _filter_default_sink():
+    # loguru cannot change the filter of a sink, so its default stderr sink
+    # (id 0) is replaced by an identical one that skips the client's records,
+    # which are written by the client's own sink instead
+    global _default_id
+    if _default_id is not None:
+        return
+    try:
+        logger.remove(0)
+    except ValueError:
+        # removed by the application
+        return
+    _default_id = logger.add(sys.stderr, filter=_outside_client)
+
+
+class _BackgroundWriter:
+    """Stream sink whose records are written by a background thread; the
+    logging call only puts the formatted record on an in-memory queue.
+
+    loguru's own `enqueue` pickles every record through a multiprocessing
+    queue, which costs the caller more than most writes it would save.
+    """
+
+    def __init__(self, stream, close=False):
+        self._stream = stream
+        self._close = close
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(
+            target=self._run, name='ipfs-client-log-writer', daemon=True,
+        )
+        self._thread.start()
+
+    def write(self, message):
+        self._queue.put(message)
+
+    def _run(self):
+        while True:
+            message = self._queue.get()
+            if message is None:
+                break
+            try:
+                self._stream.write(message)
+                # flushed once per burst rather than per record
+                if self._queue.empty():
+                    self._stream.flush()
+            except Exception:
+                pass
+
+    def stop(self):
+        # called by loguru when the sink is removed, at exit included
+        self._queue.put(None)
+        self._thread.join()
+        if self._close:
+            self._stream.close()
+
+
+def configure_logging(
+        level='INFO',
+        sink=sys.stderr,
+        enqueue=True,
+        format=FORMAT,
+        backtrace=False,
+        diagnose=False,
+        remove_default=False,
+):
+    """Enable the logs of the client and send them, and only them, to
+    `sink`, a stream, a file path or any other loguru sink.
+
+    With `enqueue` streams and files are written by a background thread, so
+    logging calls on the event loop do not block on I/O. `diagnose` adds the
+    values of variables to tracebacks, which is slow and may leak data.
+    loguru's default stderr sink, which the whole process shares, stops
+    receiving the client's records once a sink is given here, so they are
+    neither written twice nor synchronously; `remove_default` removes it
+    altogether. Pass `sink=None` to keep the application's own sinks and
+    only enable the client's logs, `level` then names the lowest level those
+    sinks accept. Calling it again replaces the sink added before.
+    """
+    global _enabled, _level, _default_id
+    # handlers may have been removed by the application in the meantime
+    removed = list(_handler_ids)
+    if remove_default:
+        removed += [0] if _default_id is None else [0, _default_id]
+    for handler_id in removed:
+        try:
+            logger.remove(handler_id)
+        except ValueError:
+            pass
+    _handler_ids.clear()
+    if remove_default:
+        _default_id = None
+    elif sink is not None:
+        _filter_default_sink()
+    if sink is not None:
+        native_enqueue = False
+        if enqueue and isinstance(sink, (str, os.PathLike)):
+            sink = _BackgroundWriter(open(sink, 'a'), close=True)
+        elif enqueue and callable(getattr(sink, 'write', None)):
+            sink = _BackgroundWriter(sink)
+        else:
+            # handlers and functions, loguru queues them itself
+            native_enqueue = enqueue
+        _handler_ids.append(
+            logger.add(
+                sink,
+                level=level,
+                format=format,
+                # the application's records stay with its own sinks
+                filter='ipfs_client',
+                enqueue=native_enqueue,
+                backtrace=backtrace,
+                diagnose=diagnose,
+            ),
+        )
+    logger.enable('ipfs_client')
+    _level = level if isinstance(level, int) else logger.level(level).no
+    _enabled = True
+
+
+def debug_enabled():
+    """Whether a debug record of the client would reach a sink; guards debug
+    calls on hot paths so that they cost a function call when DEBUG is off."""
+    return _enabled and _level <= _DEBUG
@@ -0,0 +1,420 @@
+import bisect
+import importlib.util
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+
+from ipfs_client.default_logger import logger
+from ipfs_client.settings.data_models import InstrumentationConfig
+
+
+# Histogram bucket upper bounds in seconds, doubling from 0.1ms to ~52s
+BUCKETS = tuple(0.0001 * 2 ** idx for idx in range(20))
+
+_CONNECT_STEPS = ('connect_tcp', 'connect_unix_socket', 'start_tls')
+
+
+class OperationEvent(NamedTuple):
+    """Emitted once per client operation when it completes.
+
+    Timings are in seconds, None when the phase did not happen (e.g.
+    `connect` on a reused keepalive connection). `wait` is the time spent
+    before the first request was sent (work scheduler queue and write rate
+    limiter), `pool` the wait for a connection, `connect` the TCP, Unix
+    socket and TLS setup, name resolution included, and `ttfb` the time from
+    sending the request headers to receiving the response headers. Timings
+    other than `wait` and `total` are those of the last request sent.
+    """
+    operation: str
+    cid: Optional[str]
+    endpoint: Optional[str]
+    # 'ok' or 'error'
+    status: str
+    status_code: Optional[int]
+    error: Optional[str]
+    bytes_in: int
+    bytes_out: int
+    # requests sent beyond the first one: retries, failovers and hedges
+    retries: int
+    wait: Optional[float]
+    pool: Optional[float]
+    connect: Optional[float]
+    ttfb: Optional[float]
+    total: float
+
+
+class _OperationTrace:
+    def __init__(self, operation, cid, endpoint, phase_timings):
+        self.operation = operation
+        self.cid = cid
+        self.endpoint = endpoint
+        self._phase_timings = phase_timings
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.responses = []
+        self.bytes_out = 0
+        self.wait = None
+        self._request_started = None
+        self._steps: Dict[str, float] = {}
+        self.pool = None
+        self.connect = None
+        self.ttfb = None
+
+    def start_request(self, request):
+        now = time.perf_counter()
+        if self.wait is None:
+            self.wait = now - self.started
+        self.requests += 1
+        self.bytes_out += int(request.headers.get('content-length') or 0)
+        self._request_started = now
+        self._steps.clear()
+        self.pool = self.connect = self.ttfb = None
+        if self._phase_timings:
+            request.extensions['trace'] = self._on_trace
+
+    async def _on_trace(self, name, info):
+        # httpcore reports '<module>.<step>.started|complete|failed'
+        now = time.perf_counter()
+        step, _, edge = name.partition('.')[2].rpartition('.')
+        if edge == 'started':
+            if self.pool is None and (
+                step in _CONNECT_STEPS or step == 'send_request_headers'
+            ):
+                self.pool = now - self._request_started
+            self._steps[step] = now
+        elif edge == 'complete':
+            if step in _CONNECT_STEPS:
+                self.connect = (self.connect or 0) + now - self._steps.get(step, now)
+            elif step == 'receive_response_headers' and 'send_request_headers' in self._steps:
+                self.ttfb = now - self._steps['send_request_headers']
+
+    def finish(self, error) -> OperationEvent:
+        status_code = self.responses[-1].status_code if self.responses else None
+        failed = error is not None or (status_code is not None and status_code >= 400)
+        return OperationEvent(
+            operation=self.operation,
+            cid=self.cid,
+            endpoint=self.endpoint,
+            status='error' if failed else 'ok',
+            status_code=status_code,
+            error=type(error).__name__ if error is not None else None,
+            # counted as the bodies are read, streamed responses included
+            bytes_in=sum(response.num_bytes_downloaded for response in self.responses),
+            bytes_out=self.bytes_out,
+            retries=max(self.requests - 1, 0),
+            wait=self.wait,
+            pool=self.pool,
+            connect=self.connect,
+            ttfb=self.ttfb,
+            total=time.perf_counter() - self.started,
+        )
+
+
+_current: ContextVar[Optional[_OperationTrace]] = ContextVar(
+    'ipfs_operation_trace', default=None,
+)
+
+
+async def _on_request(request):
+    trace = _current.get()
+    if trace is not None:
+        trace.start_request(request)
+
+
+async def _on_response(response):
+    trace = _current.get()
+    if trace is not None:
+        trace.responses.append(response)
+
+
+def event_hooks():
+    """httpx `event_hooks` that attribute the requests of a client to the
+    operation they are sent for."""
+    return {'request': [_on_request], 'response': [_on_response]}
+
+
+class Histogram:
+    """Fixed bucket histogram; observing a value is a bisect and an
+    increment, percentiles are estimated as the upper bound of the bucket
+    holding them."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for idx, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(self.buckets[idx], self.max) if idx < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'mean': self.sum / self.count if self.count else None,
+            'p50': self.percentile(0.50),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'max': self.max if self.count else None,
+        }
+
+
+class _OperationMetrics:
+    PHASES = ('total', 'wait', 'pool', 'connect', 'ttfb')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.histograms = {phase: Histogram() for phase in self.PHASES}
+
+    def record(self, event: OperationEvent):
+        self.calls += 1
+        if event.status != 'ok':
+            self.errors += 1
+        self.retries += event.retries
+        self.bytes_in += event.bytes_in
+        self.bytes_out += event.bytes_out
+        for phase, histogram in self.histograms.items():
+            value = getattr(event, phase)
+            if value is not None:
+                histogram.observe(value)
+
+    def snapshot(self):
+        return dict(
+            calls=self.calls,
+            errors=self.errors,
+            retries=self.retries,
+            bytes_in=self.bytes_in,
+            bytes_out=self.bytes_out,
+            **{phase: histogram.snapshot() for phase, histogram in self.histograms.items()},
+        )
+
+
+class Instrumentation:
+    """Traces client operations and publishes an `OperationEvent` for each.
+
+    Every operation is recorded in per-operation histograms, then passed to
+    the hooks added with `add_hook`. Hooks are called synchronously on the
+    event loop, so they must not block; an exception raised by a hook is
+    logged and does not affect the operation.
+    """
+
+    def __init__(self, settings: InstrumentationConfig):
+        self._settings = settings
+        self._hooks: List[Callable[[OperationEvent], None]] = []
+        self._metrics: Dict[str, _OperationMetrics] = {}
+        self._logger = logger.bind(module='IPFSInstrumentation')
+
+    def add_hook(self, hook: Callable[[OperationEvent], None]):
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: Callable[[OperationEvent], None]):
+        self._hooks.remove(hook)
+
+    def start(self, operation: str, cid: Optional[str] = None, endpoint: Optional[str] = None):
+        # an operation run as part of another one is reported with it
+        if not self._settings.enabled or _current.get() is not None:
+            return None
+        return _OperationTrace(operation, cid, endpoint, self._settings.phase_timings)
+
+    @contextmanager
+    def activate(self, trace: Optional[_OperationTrace]):
+        """Attribute the requests sent inside the block to `trace`."""
+        if trace is None:
+            yield
+            return
+        token = _current.set(trace)
+        try:
+            yield
+        finally:
+            _current.reset(token)
+
+    def finish(self, trace: Optional[_OperationTrace], error: Optional[BaseException] = None):
+        if trace is not None:
+            self.emit(trace.finish(error))
+
+    @contextmanager
+    def operation(self, operation: str, cid: Optional[str] = None, endpoint: Optional[str] = None):
+        trace = self.start(operation, cid, endpoint)
+        error = None
+        try:
+            with self.activate(trace):
+                yield
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self.finish(trace, error)
+
+    def emit(self, event: OperationEvent):
+        metrics = self._metrics.get(event.operation)
+        if metrics is None:
+            metrics = self._metrics[event.operation] = _OperationMetrics()
+        metrics.record(event)
+        for hook in self._hooks:
+            try:
+                hook(event)
+            except Exception as e:
+                self._logger.warning('Instrumentation hook {} failed: {}', hook, e)
+
+    def stats(self):
+        return {
+            operation: metrics.snapshot()
+            for operation, metrics in self._metrics.items()
+        }
+
+
+def pool_snapshot(client) -> Optional[dict]:
+    """Connection pool utilization of an httpx AsyncClient, None when its
+    transport has no connection pool (e.g. a mock transport)."""
+    pool = getattr(getattr(client, '_transport', None), '_pool', None)
+    if pool is None:
+        return None
+    connections = pool.connections
+    idle = sum(1 for connection in connections if connection.is_idle())
+    active = len(connections) - idle
+    # requests that have not been assigned a connection yet
+    queued = sum(
+        1 for status in getattr(pool, '_requests', ())
+        if status.connection is None
+    )
+    max_connections = getattr(pool, '_max_connections', None)
+    return {
+        'max_connections': max_connections,
+        'connections': len(connections),
+        'active': active,
+        'idle': idle,
+        'queued': queued,
+        'utilization': active / max_connections if max_connections else None,
+    }
+
+
+def _warn_missing(exporter, package):
+    logger.bind(module='IPFSInstrumentation').warning(
+        '{} requested but the {} package is not installed, no metrics are exported',
+        exporter, package,
+    )
+
+
+class PrometheusExporter:
+    """Hook exporting operation events as Prometheus metrics, e.g.
+    `client.add_event_hook(PrometheusExporter())`. Requires the
+    `prometheus_client` package."""
+
+    def __init__(self, registry=None, namespace: str = 'ipfs_client'):
+        self._enabled = importlib.util.find_spec('prometheus_client') is not None
+        if not self._enabled:
+            _warn_missing('PrometheusExporter', 'prometheus_client')
+            return
+        from prometheus_client import Counter
+        from prometheus_client import Histogram as PromHistogram
+
+        kwargs = {'namespace': namespace}
+        if registry is not None:
+            kwargs['registry'] = registry
+        self._duration = PromHistogram(
+            'operation_duration_seconds', 'Total duration of client operations',
+            ['operation', 'status'], buckets=BUCKETS, **kwargs,
+        )
+        self._ttfb = PromHistogram(
+            'operation_ttfb_seconds', 'Time to the first response byte of client operations',
+            ['operation'], buckets=BUCKETS, **kwargs,
+        )
+        self._bytes = Counter(
+            'operation_bytes', 'Bytes transferred by client operations',
+            ['operation', 'direction'], **kwargs,
+        )
+        self._retries = Counter(
+            'operation_retries', 'Requests sent again by client operations',
+            ['operation'], **kwargs,
+        )
+
+    def __call__(self, event: OperationEvent):
+        if not self._enabled:
+            return
+        self._duration.labels(event.operation, event.status).observe(event.total)
+        if event.ttfb is not None:
+            self._ttfb.labels(event.operation).observe(event.ttfb)
+        if event.bytes_in:
+            self._bytes.labels(event.operation, 'in').inc(event.bytes_in)
+        if event.bytes_out:
+            self._bytes.labels(event.operation, 'out').inc(event.bytes_out)
+        if event.retries:
+            self._retries.labels(event.operation).inc(event.retries)
+
+
+class OpenTelemetryExporter:
+    """Hook recording operation events as OpenTelemetry metrics and spans,
+    with the globally configured providers unless a `meter` and `tracer`
+    are given. Requires the `opentelemetry-api` package."""
+
+    def __init__(self, meter=None, tracer=None):
+        self._enabled = importlib.util.find_spec('opentelemetry') is not None
+        if not self._enabled:
+            _warn_missing('OpenTelemetryExporter', 'opentelemetry-api')
+            return
+        from opentelemetry import metrics
+        from opentelemetry import trace
+        from opentelemetry.trace import Status
+        from opentelemetry.trace import StatusCode
+
+        self._error_status = lambda description: Status(StatusCode.ERROR, description)
+        meter = meter or metrics.get_meter('ipfs_client')
+        self._tracer = tracer or trace.get_tracer('ipfs_client')
+        self._duration = meter.create_histogram(
+            'ipfs_client.operation.duration', unit='s',
+            description='Total duration of client operations',
+        )
+        self._bytes = meter.create_counter(
+            'ipfs_client.operation.bytes', unit='By',
+            description='Bytes transferred by client operations',
+        )
+
+    def __call__(self, event: OperationEvent):
+        if not self._enabled:
+            return
+        attributes = {'ipfs.operation': event.operation, 'ipfs.status': event.status}
+        self._duration.record(event.total, attributes)
+        if event.bytes_in:
+            self._bytes.add(event.bytes_in, dict(attributes, direction='in'))
+        if event.bytes_out:
+            self._bytes.add(event.bytes_out, dict(attributes, direction='out'))
+        # the event is emitted as the operation completes
+        end = time.time_ns()
+        span_attributes = {
+            f'ipfs.{field}': value
+            for field, value in event._asdict().items()
+            if value is not None and field not in ('operation', 'status')
+        }
+        span_attributes.update(attributes)
+        span = self._tracer.start_span(
+            f'ipfs.{event.operation}',
+            start_time=end - int(event.total * 1e9),
+            attributes=span_attributes,
+        )
+        if event.status != 'ok':
+            span.set_status(self._error_status(event.error or str(event.status_code)))
+        span.end(end_time=end)
@@ -0,0 +1,250 @@
+import asyncio
+import json
+import math
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+
+from ipfs_client.default_logger import logger
+from ipfs_client.settings.data_models import LifecycleConfig
+from ipfs_client.work_scheduler import work_context
+
+
+class LifecycleJob(NamedTuple):
+    cid: str
+    due_at: float
+    archive: bool
+
+
+class LifecycleScheduler:
+    """Queues archive/unpin jobs for added CIDs and runs them in the
+    background.
+
+    Jobs are grouped into buckets of `batch_window` seconds; every bucket is
+    a single APScheduler date job. Pending jobs are persisted to
+    `state_file` under the local cache path so that they survive restarts.
+    APScheduler is imported and its scheduler started when the first bucket
+    is scheduled, clients that never schedule a job do not pay for it.
+    """
+
+    def __init__(
+            self,
+            client,
+            settings: LifecycleConfig,
+            state_dir: str,
+            scheduler=None,
+    ):
+        self._client = client
+        self._settings = settings
+        self._scheduler = scheduler
+        self._state_path = os.path.join(state_dir, settings.state_file)
+        self._logger = logger.bind(module='IPFSLifecycleScheduler')
+        self._buckets: Dict[int, List[LifecycleJob]] = {}
+        self._inflight: Dict[int, List[LifecycleJob]] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._persist_task: Optional[asyncio.Task] = None
+        self._dirty = False
+        self._running = set()
+        self._started = False
+        self._completed = 0
+        self._failed = 0
+        self._last_lag = 0.0
+        self._max_lag = 0.0
+
+    async def start(self):
+        if self._started:
+            return
+        loop = asyncio.get_running_loop()
+        jobs = await loop.run_in_executor(None, self._load_state)
+        self._semaphore = asyncio.Semaphore(self._settings.max_concurrency)
+        self._started = True
+        for job in jobs:
+            self._enqueue(job)
+        if jobs:
+            self._logger.info(
+                'Restored {} pending lifecycle jobs from {}',
+                len(jobs), self._state_path,
+            )
+
+    async def shutdown(self):
+        if not self._started:
+            return
+        self._started = False
+        scheduler_running = self._scheduler is not None and self._scheduler.running
+        if scheduler_running:
+            self._scheduler.remove_all_jobs()
+        # scheduler shutdown cancels submitted job runs, so runs that have
+        # not started yet are let through first (they observe the shutdown
+        # and keep their bucket pending) and in-flight batches are awaited
+        await asyncio.sleep(0)
+        if self._running:
+            await asyncio.wait(self._running)
+        if scheduler_running:
+            self._scheduler.shutdown(wait=False)
+        if self._persist_task:
+            await self._persist_task
+        # pending and in-flight jobs are flushed so that they resume on the
+        # next start
+        await asyncio.get_running_loop().run_in_executor(
+            None, self._write_state, self._snapshot(),
+        )
+        self._buckets.clear()
+
+    def bind(self, client):
+        """Run the jobs on `client` from now on, e.g. once the client the
+        scheduler was created with is closed while others still share it."""
+        self._client = client
+
+    def schedule(self, cid: str, delay: Optional[int] = None, archive: Optional[bool] = None):
+        if delay is None:
+            delay = self._settings.unpin_delay
+        if archive is None:
+            archive = self._settings.archive
+        self._enqueue(LifecycleJob(cid, time.time() + delay, archive))
+        self._schedule_persist()
+
+    def stats(self):
+        now = time.time()
+        pending = [job for jobs in self._buckets.values() for job in jobs]
+        overdue = [now - job.due_at for job in pending if job.due_at <= now]
+        return {
+            'queue_depth': len(pending),
+            'buckets': len(self._buckets),
+            'inflight': sum(len(jobs) for jobs in self._inflight.values()),
+            'completed': self._completed,
+            'failed': self._failed,
+            'current_lag': max(overdue, default=0.0),
+            'last_lag': self._last_lag,
+            'max_lag': self._max_lag,
+        }
+
+    def _enqueue(self, job: LifecycleJob):
+        window = max(self._settings.batch_window, 1)
+        bucket = int(math.ceil(job.due_at / window) * window)
+        if bucket in self._buckets:
+            self._buckets[bucket].append(job)
+            return
+        self._buckets[bucket] = [job]
+        if not self._started:
+            return
+        from apscheduler.triggers.date import DateTrigger
+
+        self._ensure_scheduler().add_job(
+            self._run_bucket,
+            trigger=DateTrigger(run_date=datetime.fromtimestamp(max(bucket, time.time()))),
+            args=[bucket],
+            id=f'lifecycle-{bucket}',
+            misfire_grace_time=None,
+            replace_existing=True,
+        )
+
+    def _ensure_scheduler(self):
+        if self._scheduler is None:
+            from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+            self._scheduler = AsyncIOScheduler()
+        if not self._scheduler.running:
+            self._scheduler.start()
+        return self._scheduler
+
+    async def _run_bucket(self, bucket: int):
+        if not self._started:
+            return
+        jobs = self._buckets.pop(bucket, [])
+        if not jobs:
+            return
+        self._inflight[bucket] = jobs
+        task = asyncio.current_task()
+        self._running.add(task)
+        lag = time.time() - bucket
+        self._last_lag = lag
+        self._max_lag = max(self._max_lag, lag)
+        self._logger.debug(
+            'Running lifecycle batch of {} jobs, lag {:.3f}s', len(jobs), lag,
+        )
+        retries = []
+        try:
+            retries = await asyncio.gather(*(self._run_job(job) for job in jobs))
+        finally:
+            self._inflight.pop(bucket, None)
+            # failed jobs stay pending, they are moved to a later bucket
+            for job in retries:
+                if job is not None:
+                    self._enqueue(job)
+            self._running.discard(task)
+            self._schedule_persist()
+
+    async def _run_job(self, job: LifecycleJob):
+        # returns the job to run again when it failed
+        async with self._semaphore:
+            try:
+                # lifecycle work yields to interactive and normal requests
+                with work_context(priority='background'):
+                    if job.archive:
+                        data = await self._client.cat(job.cid, bytes_mode=True)
+                        await self._client.archive({'': data}, raise_on_error=True)
+                        # a retry only unpins
+                        job = job._replace(archive=False)
+                    await self._client.unpin(job.cid, raise_on_error=True)
+            except Exception as e:
+                self._failed += 1
+                self._logger.opt(exception=True).error(
+                    'Lifecycle job for CID {} failed, retrying in {}s: {}',
+                    job.cid, self._settings.retry_delay, e,
+                )
+                return job._replace(due_at=time.time() + self._settings.retry_delay)
+            self._completed += 1
+            return None
+
+    def _snapshot(self):
+        return [
+            job._asdict()
+            for jobs in (*self._buckets.values(), *self._inflight.values())
+            for job in jobs
+        ]
+
+    def _schedule_persist(self):
+        # coalesces state changes made while a write is pending into a single
+        # write performed off the event loop
+        self._dirty = True
+        if self._persist_task and not self._persist_task.done():
+            return
+        self._persist_task = asyncio.get_running_loop().create_task(
+            self._persist(),
+        )
+
+    async def _persist(self):
+        loop = asyncio.get_running_loop()
+        await asyncio.sleep(0)
+        while self._dirty:
+            self._dirty = False
+            await loop.run_in_executor(None, self._write_state, self._snapshot())
+
+    def _write_state(self, jobs):
+        state_dir = os.path.dirname(self._state_path)
+        os.makedirs(state_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=state_dir, prefix='.lifecycle-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(jobs, f)
+            os.replace(tmp_path, self._state_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _load_state(self):
+        try:
+            with open(self._state_path) as f:
+                return [LifecycleJob(**job) for job in json.load(f)]
+        except FileNotFoundError:
+            return []
+        except (ValueError, TypeError):
+            self._logger.error(
+                'Discarding corrupt lifecycle state file {}', self._state_path,
+            )
+            return []
@@ -1,28 +1,201 @@
-import json
 import asyncio
-import httpx
-from datetime import datetime, timedelta
+import functools
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+from contextlib import AsyncExitStack
+from typing import Dict
+from typing import NamedTuple
 from urllib.parse import urljoin
 
+from httpx import AsyncBaseTransport
 from httpx import AsyncClient
 from httpx import AsyncHTTPTransport
 from httpx import Limits
 from httpx import Timeout
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.date import DateTrigger
 
-import ipfs_client.exceptions
 import ipfs_client.utils.addr as addr_util
+import ipfs_client.utils.multipart as multipart_util
+from ipfs_client.cache import CIDCache
+from ipfs_client.codec import canonical_dumps
+from ipfs_client.codec import get_codec
+from ipfs_client.dag import BlockSection
 from ipfs_client.dag import DAGSection
 from ipfs_client.dag import IPFSAsyncClientError
+from ipfs_client.dag import IPFSContentTooLargeError
+from ipfs_client.dedup import DedupIndex
+from ipfs_client.dedup import local_cid
+from ipfs_client.default_logger import debug_enabled
 from ipfs_client.default_logger import logger
+from ipfs_client.instrumentation import event_hooks
+from ipfs_client.instrumentation import Instrumentation
+from ipfs_client.instrumentation import pool_snapshot
+from ipfs_client.lifecycle import LifecycleScheduler
+from ipfs_client.pins import PinBatchResult
+from ipfs_client.pins import PinInfo
+from ipfs_client.pins import REMOTE_PIN_STATES
+from ipfs_client.pins import RemotePinTracker
+from ipfs_client.rate_limit import AsyncTokenBucket
+from ipfs_client.reader_pool import ReaderNode
+from ipfs_client.reader_pool import ReaderPool
+from ipfs_client.resilience import ResiliencePolicy
+from ipfs_client.retrieval import LassieRetriever
+from ipfs_client.services import LASSIE
+from ipfs_client.services import LIGHTHOUSE_API
+from ipfs_client.services import LIGHTHOUSE_UPLOAD
+from ipfs_client.services import resolve_http2
+from ipfs_client.services import ServiceClientRegistry
+from ipfs_client.singleflight import SingleFlight
 from ipfs_client.settings.data_models import IPFSConfig
+from ipfs_client.work_scheduler import work_context
+from ipfs_client.work_scheduler import WorkScheduler
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_addr(addr, api_base):
+    # returns the base URL, whether the host is numeric and the socket path
+    # for `/unix/...` multiaddrs; services constructing clients per tenant or
+    # request parse the same few addresses over and over
+    url_data = addr_util.url_to_url_data(addr, api_base)
+    if url_data is not None:
+        return url_data + (None,)
+    from ipfs_client.exceptions import AddressError
+
+    try:
+        base_url, host_numeric = addr_util.multiaddr_to_url_data(addr, api_base)
+    except AddressError:
+        if not addr_util.is_valid_url(addr):
+            raise ValueError('Invalid IPFS address')
+        return urljoin(addr, api_base), addr_util.P_TCP, None
+    return base_url, host_numeric, addr_util.unix_socket_path(addr)
+
+
+def _side_settings(settings: IPFSConfig, write_mode):
+    # reads and writes have different concurrency profiles, each side
+    # gets its own pool size, keepalive, protocol, timeouts and auth
+    if write_mode:
+        return settings.writer_transport, settings.url_auth
+    return settings.reader_transport, settings.reader_url_auth
+
+
+def _connection_limits(settings: IPFSConfig, write_mode):
+    transport, _ = _side_settings(settings, write_mode)
+    return transport.connection_limits or settings.connection_limits
+
+
+def _http_transport(settings: IPFSConfig, write_mode, uds=None):
+    transport, _ = _side_settings(settings, write_mode)
+    conn_limits = _connection_limits(settings, write_mode)
+    return AsyncHTTPTransport(
+        limits=Limits(
+            max_connections=conn_limits.max_connections,
+            max_keepalive_connections=conn_limits.max_keepalive_connections,
+            keepalive_expiry=conn_limits.keepalive_expiry,
+        ),
+        http2=resolve_http2(
+            transport.http2, 'ipfs writer' if write_mode else 'ipfs reader',
+        ),
+        # a co-located daemon can be reached over its Unix domain socket,
+        # which skips the TCP stack
+        uds=uds,
+    )
+
+
+def _init_service_registry(settings: IPFSConfig, transport=None):
+    hooks = event_hooks() if settings.instrumentation.enabled else None
+    services = ServiceClientRegistry(transport, hooks)
+    services.register(LIGHTHOUSE_UPLOAD, settings.lighthouse.upload)
+    services.register(LIGHTHOUSE_API, settings.lighthouse.api)
+    services.register(LASSIE, settings.lassie)
+    return services
+
+
+class AddProgress(NamedTuple):
+    bytes: int
+    elapsed: float
+
+    @property
+    def throughput(self):
+        return self.bytes / self.elapsed if self.elapsed else 0.0
+
+
+def _add_params(kwargs):
+    params = {'cid-version': 1}
+    if kwargs.get('chunker'):
+        params['chunker'] = kwargs['chunker']
+    if kwargs.get('raw_leaves') is not None:
+        params['raw-leaves'] = str(kwargs['raw_leaves']).lower()
+    return params
+
+
+def _split_batches(items, max_items, max_bytes):
+    # a batch is closed when adding the next item would exceed either limit,
+    # an item larger than max_bytes is sent in a batch of its own
+    batches = []
+    batch = []
+    batch_bytes = 0
+    for item in items:
+        if batch and (
+            len(batch) >= max_items or batch_bytes + len(item) > max_bytes
+        ):
+            batches.append(batch)
+            batch = []
+            batch_bytes = 0
+        batch.append(item)
+        batch_bytes += len(item)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _cat_params(cid, offset=None, length=None):
+    params = {'arg': cid}
+    if offset:
+        params['offset'] = offset
+    if length is not None:
+        params['length'] = length
+    return params
+
+
+def _response_content_length(response, length=None):
+    # go-ipfs/kubo streams /cat with chunked encoding and reports the size in
+    # X-Content-Length instead
+    for header in ('Content-Length', 'X-Content-Length'):
+        value = response.headers.get(header)
+        if value and value.isdigit():
+            if length is not None:
+                return min(int(value), length)
+            return int(value)
+    return None
+
+
+def _check_offset(cid, size, offset):
+    # the node rejects offsets past the end of the content, cached reads
+    # behave the same
+    if offset and offset > size:
+        raise IPFSAsyncClientError(
+            f'IPFS client error: cat on CID {cid}, offset {offset} is past the end of the content ({size} bytes)',
+        )
+
+
+def _slice_range(content, offset=None, length=None):
+    start = offset or 0
+    if length is None:
+        return content[start:] if start else content
+    return content[start:start + length]
+
+
+def _check_max_bytes(cid, size, max_bytes):
+    if max_bytes is not None and size is not None and size > max_bytes:
+        raise IPFSContentTooLargeError(
+            f'IPFS client error: cat on CID {cid}, content exceeds max_bytes limit of {max_bytes} bytes',
+        )
 
 
 class AsyncIPFSClient:
     _settings: IPFSConfig
     _client: AsyncClient
-    _scheduler: AsyncIOScheduler
 
     def __init__(
             self,
@@ -30,50 +203,107 @@ class AsyncIPFSClient:
             settings: IPFSConfig,
             api_base='api/v0',
             write_mode=False,
+            cache=None,
+            services=None,
+            retriever=None,
+            transport=None,
+            dedup=None,
+            lifecycle=None,
 
     ):
-        try:
-            self._base_url, \
-                self._host_numeric = addr_util.multiaddr_to_url_data(
-                    addr, api_base,
-                )
-        except ipfs_client.exceptions.AddressError:
-            if not addr_util.is_valid_url(addr):
-                raise ValueError('Invalid IPFS address')
-            self._base_url = urljoin(addr, api_base)
-            self._host_numeric = addr_util.P_TCP
+        self._base_url, self._host_numeric, self._uds = _parse_addr(addr, api_base)
+        # additional reader endpoints, reads are routed across all of them
+        self._pool_endpoints = []
+        if not write_mode and settings.reader_urls:
+            self._pool_endpoints = [(self._base_url, self._uds)]
+            for reader_addr in settings.reader_urls:
+                base_url, _, uds = _parse_addr(reader_addr, api_base)
+                if (base_url, uds) not in self._pool_endpoints:
+                    self._pool_endpoints.append((base_url, uds))
+        self._pool = None
+        # replaces the network transport of the node clients, e.g. an
+        # httpx.ASGITransport in front of a mock node
+        self._transport = transport
+        self._inflight = SingleFlight()
+        self._resilience = ResiliencePolicy(settings.resilience)
+        self._work = WorkScheduler(settings.work_scheduler)
+        self._instrumentation = Instrumentation(settings.instrumentation)
+        self._json = get_codec(settings.json_codec)
         self.dag = None
+        self.block = None
         self._logger = logger.bind(module='IPFSAsyncClient')
         self._settings = settings
         self._write_mode = write_mode
-        self._scheduler = AsyncIOScheduler()
-        self._scheduler.start()
+        self._cache = cache
+        if self._cache is None and settings.cache.enabled:
+            self._cache = CIDCache(settings.cache, settings.local_cache_path)
+        # pooled clients of external services are shared with the other
+        # client of a AsyncIPFSClientSingleton and closed by its owner
+        self._owns_services = services is None
+        if services is None:
+            services = _init_service_registry(settings, transport)
+        self._services = services
+        self._retriever = retriever or LassieRetriever(settings.lassie, services)
+        self._write_limiter = AsyncTokenBucket.from_config(
+            settings.write_rate_limit,
+        )
+        self._remote_pins = None
+        if write_mode and settings.remote_pinning.enabled:
+            self._remote_pins = RemotePinTracker(self, settings.pins)
+        self._dedup = dedup
+        if self._dedup is None and write_mode and settings.dedup.enabled:
+            self._dedup = DedupIndex(settings.dedup, settings.local_cache_path)
+        self._lifecycle = lifecycle
+        if self._lifecycle is None and write_mode and settings.lifecycle.enabled:
+            self._lifecycle = LifecycleScheduler(
+                client=self,
+                settings=settings.lifecycle,
+                state_dir=settings.local_cache_path,
+            )
+        # set by AsyncIPFSClientFactory, whose clients on one local_cache_path
+        # share the cache, dedup index and lifecycle scheduler
+        self._release_local_state = None
 
-    async def init_session(self):
-        conn_limits = self._settings.connection_limits
-        self._async_transport = AsyncHTTPTransport(
-            limits=Limits(
-                max_connections=conn_limits.max_connections,
-                max_keepalive_connections=conn_limits.max_connections,
-                keepalive_expiry=conn_limits.keepalive_expiry,
-            ),
+    def _build_client(self, base_url, uds=None):
+        transport, auth = _side_settings(self._settings, self._write_mode)
+        async_transport = self._transport or _http_transport(
+            self._settings, self._write_mode, uds,
         )
+        phase_timeouts = {
+            phase: value
+            for phase, value in transport.timeouts.dict().items()
+            if value is not None
+        }
         client_init_args = dict(
-            base_url=self._base_url,
-            timeout=Timeout(self._settings.timeout),
+            base_url=base_url,
+            timeout=Timeout(self._settings.timeout, **phase_timeouts),
             follow_redirects=False,
-            transport=self._async_transport,
+            transport=async_transport,
         )
-        if self._settings.url_auth:
+        if self._settings.instrumentation.enabled:
+            client_init_args['event_hooks'] = event_hooks()
+        if auth:
             client_init_args.update(
                 {
                     'auth': (
-                        self._settings.url_auth.apiKey,
-                        self._settings.url_auth.apiSecret,
+                        auth.apiKey,
+                        auth.apiSecret,
                     ),
                 },
             )
-        self._client = AsyncClient(**client_init_args)
+        return AsyncClient(**client_init_args), async_transport
+
+    async def init_session(self):
+        self._client, self._async_transport = self._build_client(
+            self._base_url, self._uds,
+        )
+        if self._pool_endpoints:
+            nodes = [ReaderNode(self._base_url, self._client, self._settings.reader_pool)]
+            for base_url, uds in self._pool_endpoints[1:]:
+                client, _ = self._build_client(base_url, uds)
+                nodes.append(ReaderNode(base_url, client, self._settings.reader_pool))
+            self._pool = ReaderPool(nodes, self._settings.reader_pool)
+            self._pool.start()
 
         if self._settings.remote_pinning.enabled and self._write_mode:
             # checking if service_name, service_endpoint, and service_token are
@@ -98,7 +328,7 @@ class AsyncIPFSClient:
                 if r.status_code == 500:
                     # check for {"Message":"service already present","Code":0,"Type":"error"}
                     try:
-                        resp = json.loads(r.text)
+                        resp = self._json.loads(r.content)
                     except json.JSONDecodeError:
                         raise IPFSAsyncClientError(
                             f'IPFS client error: remote pinning service add operation, response:{r}',
@@ -122,9 +352,180 @@ class AsyncIPFSClient:
                     'Remote pinning service added successfully',
                 )
 
-        self.dag = DAGSection(self._client)
+        section_args = dict(
+            async_client=self._client,
+            cache=self._cache, rate_limiter=self._write_limiter,
+            inflight=self._inflight, reader=self._read,
+            resilience=self._resilience,
+            codec=self._json,
+            work=self._work,
+            instrumentation=self._instrumentation,
+        )
+        self.dag = DAGSection(**section_args)
+        self.block = BlockSection(**section_args)
+        if self._dedup:
+            self._dedup.load()
+        if self._remote_pins:
+            self._remote_pins.start()
+        if self._lifecycle:
+            await self._lifecycle.start()
         self._logger.debug('Inited IPFS client on base url {}', self._base_url)
 
+    async def aclose(self):
+        if self._release_local_state:
+            # closed by the factory together with its last client
+            await self._release_local_state(self)
+        else:
+            await self._close_local_state()
+        if self._remote_pins:
+            await self._remote_pins.stop()
+        if self._owns_services:
+            await self._services.aclose()
+        if self._pool:
+            # closes the node clients, the primary one included
+            await self._pool.aclose()
+        elif getattr(self, '_client', None):
+            await self._client.aclose()
+
+    async def _close_local_state(self):
+        if self._lifecycle:
+            await self._lifecycle.shutdown()
+        if self._dedup:
+            self._dedup.close()
+        if self._cache:
+            await self._cache.flush()
+
+    async def warm_up(self, connections):
+        """Open up to `connections` keepalive connections to the node ahead
+        of the first calls, with as many concurrent `/version` requests.
+        Returns the number of requests that succeeded; failures are logged,
+        later calls connect on demand."""
+        limits = _connection_limits(self._settings, self._write_mode)
+        connections = min(connections, limits.max_keepalive_connections)
+        results = await asyncio.gather(
+            *(self._client.post('/version') for _ in range(connections)),
+            return_exceptions=True,
+        )
+        failed = [r for r in results if isinstance(r, Exception)]
+        if failed:
+            self._logger.warning(
+                'Warm-up of {} of {} connections to {} failed: {}',
+                len(failed), connections, self._base_url, failed[0],
+            )
+        return connections - len(failed)
+
+    async def _call(self, operation, endpoint, fn, idempotent=True, cid=None):
+        # a request waits for a slot of its operation class, then runs with
+        # retries and the circuit breaker of `endpoint`
+        with self._instrumentation.operation(operation, cid, endpoint):
+            return await self._work.run(
+                operation,
+                lambda: self._resilience.call(operation, endpoint, fn, idempotent=idempotent),
+            )
+
+    @asynccontextmanager
+    async def _stream(self, operation, endpoint, stream, cid=None):
+        # the trace is only active while the request is sent, the caller
+        # reads the body in its own context; the operation is reported once
+        # the caller is done with the body
+        trace = self._instrumentation.start(operation, cid, endpoint)
+        error = None
+        try:
+            async with AsyncExitStack() as stack:
+                await stack.enter_async_context(self._work.slot(operation))
+                with self._instrumentation.activate(trace):
+                    response = await stack.enter_async_context(
+                        self._resilience.guard_stream(operation, endpoint, stream),
+                    )
+                yield response
+        except BaseException as e:
+            # a consumer that stops reading early is not a failure
+            if not isinstance(e, GeneratorExit):
+                error = e
+            raise
+        finally:
+            self._instrumentation.finish(trace, error)
+
+    def work_context(self, priority=None, timeout=None):
+        """Context manager giving the client calls made inside it a
+        priority ('interactive', 'normal' or 'background') and a deadline
+        `timeout` seconds from now."""
+        return work_context(priority=priority, timeout=timeout)
+
+    def work_stats(self):
+        return self._work.stats()
+
+    def add_event_hook(self, hook):
+        """Call `hook` with an `OperationEvent` after every operation, e.g.
+        an `ipfs_client.instrumentation.PrometheusExporter`."""
+        self._instrumentation.add_hook(hook)
+
+    def remove_event_hook(self, hook):
+        self._instrumentation.remove_hook(hook)
+
+    def operation_stats(self):
+        return self._instrumentation.stats()
+
+    def pool_stats(self):
+        """Connection pool utilization of the node and service clients."""
+        clients = {'ipfs': getattr(self, '_client', None)}
+        if self._pool:
+            for node in self._pool.nodes[1:]:
+                clients[node.url] = node.client
+        clients.update(self._services.clients())
+        return {
+            name: pool_snapshot(client)
+            for name, client in clients.items()
+            if client is not None
+        }
+
+    async def _post_write(self, operation, cid=None, guarded=True, **request_kwargs):
+        # every request that writes to the node passes the write rate limiter,
+        # retries are opt-in through resilience.retry.retry_writes; requests
+        # that are not `guarded` bypass the circuit breaker of the node
+        async def attempt():
+            await self._write_limiter.acquire()
+            r = await self._client.post(**request_kwargs)
+            self._write_limiter.feedback(r.status_code)
+            return r
+
+        return await self._call(
+            operation, str(self._client.base_url) if guarded else None, attempt,
+            idempotent=False, cid=cid,
+        )
+
+    async def _read(self, operation, fn, cid=None):
+        # reads go through the reader pool when several endpoints are set up,
+        # the pool fails over between nodes and every node has its own breaker
+        if self._pool:
+            return await self._call(
+                operation,
+                None,
+                lambda: self._pool.run(
+                    lambda client: self._resilience.guard(
+                        str(client.base_url), lambda: fn(client),
+                    ),
+                ),
+                cid=cid,
+            )
+        return await self._call(
+            operation, str(self._client.base_url), lambda: fn(self._client), cid=cid,
+        )
+
+    def resilience_stats(self):
+        return self._resilience.stats()
+
+    def inflight_stats(self):
+        return self._inflight.stats()
+
+    def reader_pool_stats(self):
+        if not self._pool:
+            return None
+        return self._pool.stats()
+
+    def write_rate_limit_stats(self):
+        return self._write_limiter.stats()
+
     async def add_str(self, string, **kwargs):
         try: 
             string_data = string.encode('utf-8')
@@ -135,65 +536,324 @@ class AsyncIPFSClient:
         return cid
     
     async def add_bytes(self, data: bytes, **kwargs):
+        params = _add_params(kwargs)
+        known_cid = await self._known_cid(data, params)
+        if known_cid:
+            return known_cid
         files = {'': data}
-        r = await self._client.post(
-            url='/add?cid-version=1',
+        r = await self._post_write(
+            'add',
+            url='/add',
+            params=params,
             files=files,
         )
         if r.status_code != 200:
             raise IPFSAsyncClientError(
                 f'IPFS client error: add_bytes operation, response:{r}',
+                status_code=r.status_code,
             )
 
         try:
-            resp = json.loads(r.text)
+            resp = self._json.loads(r.content)
         except json.JSONDecodeError:
             return r.text
         else:
             generated_cid = resp['Hash']
 
-        if self._settings.remote_pinning.enabled:
-            # curl -X POST "http://127.0.0.1:5001/api/v0/pin/remote/add?arg=<ipfs-path>&service=<value>&name=<value>&background=false"
-            # pin to remote pinning service
-            r = await self._client.post(
-                url=f'/pin/remote/add?arg={generated_cid}&service={self._settings.remote_pinning.service_name}&background={self._settings.remote_pinning.background_pinning}',
+        if self._dedup:
+            self._dedup.add(generated_cid)
+        await self._after_add([generated_cid])
+        return generated_cid
+
+    async def _known_cid(self, data, params):
+        # the CID of content already on the node, without uploading it again
+        if not self._dedup:
+            return None
+        dedup_settings = self._settings.dedup
+        cid = None
+        if len(data) <= dedup_settings.local_hash_max_bytes:
+            cid = local_cid(data, params)
+        if cid is None and dedup_settings.only_hash:
+            cid = await self._only_hash(data, params)
+        if self._dedup.lookup(cid, len(data)):
+            if debug_enabled():
+                self._logger.debug('Skipping upload of known CID {}', cid)
+            return cid
+        return None
+
+    async def _only_hash(self, data, params):
+        # the node computes the CID without storing the content
+        r = await self._call(
+            'add_only_hash',
+            str(self._client.base_url),
+            lambda: self._client.post(
+                url='/add', params=dict(params, **{'only-hash': 'true'}),
+                files={'': data},
+            ),
+        )
+        if r.status_code != 200:
+            return None
+        try:
+            return self._json.loads(r.content)['Hash']
+        except (json.JSONDecodeError, KeyError):
+            return None
+
+    def dedup_stats(self):
+        if not self._dedup:
+            return None
+        return self._dedup.stats()
+
+    async def add_many(self, items, **kwargs):
+        bulk_settings = self._settings.bulk_add
+        known = {}
+        if self._dedup:
+            items = list(items)
+            params = _add_params(kwargs)
+            for idx, data in enumerate(items):
+                known_cid = await self._known_cid(data, params)
+                if known_cid:
+                    known[idx] = known_cid
+        pending = [data for idx, data in enumerate(items) if idx not in known]
+        batches = _split_batches(
+            pending,
+            kwargs.get('max_batch_items', bulk_settings.max_items),
+            kwargs.get('max_batch_bytes', bulk_settings.max_bytes),
+        )
+        semaphore = asyncio.Semaphore(bulk_settings.concurrency)
+
+        async def add_batch(batch):
+            async with semaphore:
+                return await self._add_batch(batch, kwargs)
+
+        results = await asyncio.gather(*(add_batch(batch) for batch in batches))
+        added = [cid for batch_cids in results for cid in batch_cids]
+        if self._dedup:
+            for cid in added:
+                self._dedup.add(cid)
+        await self._after_add(added)
+        if not known:
+            return added
+        added_iter = iter(added)
+        return [
+            known[idx] if idx in known else next(added_iter)
+            for idx in range(len(items))
+        ]
+
+    async def add_json_many(self, json_objs, **kwargs):
+        return await self.add_many(
+            [canonical_dumps(json_obj) for json_obj in json_objs],
+            **kwargs,
+        )
+
+    async def _add_batch(self, batch, kwargs):
+        # each part is named after its position in the batch, the node echoes
+        # the name back in the newline delimited JSON response
+        files = [
+            ('file', (str(idx), data, 'application/octet-stream'))
+            for idx, data in enumerate(batch)
+        ]
+        r = await self._post_write(
+            'add_many',
+            url='/add',
+            params=_add_params(kwargs),
+            files=files,
+        )
+        if r.status_code != 200:
+            raise IPFSAsyncClientError(
+                f'IPFS client error: add_many operation, response:{r}',
+                status_code=r.status_code,
             )
-            if r.status_code != 200:
-                self._logger.error(
-                    f'IPFS client error: remote pinning add operation, response:{r}',
+        cids = [None] * len(batch)
+        for line in r.content.splitlines():
+            if not line.strip():
+                continue
+            try:
+                resp = self._json.loads(line)
+                cids[int(resp['Name'])] = resp['Hash']
+            except (json.JSONDecodeError, KeyError, ValueError, IndexError):
+                raise IPFSAsyncClientError(
+                    f'IPFS client error: add_many operation, unexpected response line:{line}',
                 )
+        if None in cids:
+            raise IPFSAsyncClientError(
+                f'IPFS client error: add_many operation, node returned {len(batch) - cids.count(None)} of {len(batch)} CIDs',
+            )
+        return cids
 
-        unpin_delay = 12  # 7 days
-        await self.schedule_archive_and_unpin(generated_cid, files, unpin_delay)
+    async def add_file(self, path, **kwargs):
+        chunks = multipart_util.iter_file(
+            path, kwargs.get('read_chunk_size', 256 * 1024),
+        )
+        return await self._add_streaming(
+            chunks, filename=os.path.basename(path), **kwargs,
+        )
+
+    async def add_stream(self, chunks, **kwargs):
+        if not hasattr(chunks, '__aiter__'):
+            chunks = multipart_util.iter_sync(chunks)
+        return await self._add_streaming(chunks, **kwargs)
+
+    async def _add_streaming(self, chunks, filename='', **kwargs):
+        # the multipart body is produced chunk by chunk and sent with chunked
+        # transfer encoding, memory use is independent of the payload size
+        progress = kwargs.get('progress')
+        params = _add_params(kwargs)
+        if progress is not None:
+            params['progress'] = 'true'
+        boundary = multipart_util.new_boundary()
+        generated_cid = None
+        started = time.monotonic()
+        await self._write_limiter.acquire()
+        # the body is consumed by the first attempt, so streamed adds are
+        # never retried and only pass the circuit breaker
+        async with self._stream(
+            'add_stream',
+            str(self._client.base_url),
+            self._client.stream(
+                method='POST',
+                url='/add',
+                params=params,
+                content=multipart_util.encode_stream(chunks, boundary, filename),
+                headers={'Content-Type': multipart_util.content_type(boundary)},
+            ),
+        ) as r:
+            self._write_limiter.feedback(r.status_code)
+            if r.status_code != 200:
+                await r.aread()
+                raise IPFSAsyncClientError(
+                    f'IPFS client error: add_stream operation, response:{r}',
+                    status_code=r.status_code,
+                )
+            async for line in r.aiter_lines():
+                if not line.strip():
+                    continue
+                try:
+                    resp = self._json.loads(line)
+                except json.JSONDecodeError:
+                    raise IPFSAsyncClientError(
+                        f'IPFS client error: add_stream operation, unexpected response line:{line}',
+                    )
+                if 'Hash' in resp:
+                    generated_cid = resp['Hash']
+                elif progress is not None and 'Bytes' in resp:
+                    progress(AddProgress(resp['Bytes'], time.monotonic() - started))
+        if generated_cid is None:
+            raise IPFSAsyncClientError(
+                'IPFS client error: add_stream operation, node did not return a CID',
+            )
+        if debug_enabled():
+            self._logger.debug(
+                'Streamed add of {} completed in {:.3f}s', generated_cid,
+                time.monotonic() - started,
+            )
+        await self._after_add([generated_cid])
         return generated_cid
 
+    async def _after_add(self, cids):
+        if self._settings.remote_pinning.enabled:
+            await self._remote_pin_many(cids)
+        if self._lifecycle:
+            for cid in cids:
+                self._lifecycle.schedule(cid)
+
+    async def _remote_pin_many(self, cids):
+        # pin/remote/add accepts a single path per request, a batch is pinned
+        # with concurrent requests instead of one after the other
+        semaphore = asyncio.Semaphore(
+            self._settings.remote_pinning.max_concurrency,
+        )
+
+        async def remote_pin(cid):
+            async with semaphore:
+                # curl -X POST "http://127.0.0.1:5001/api/v0/pin/remote/add?arg=<ipfs-path>&service=<value>&name=<value>&background=false"
+                # pin to remote pinning service
+                r = await self._post_write(
+                    'pin_remote_add',
+                    url=f'/pin/remote/add?arg={cid}&service={self._settings.remote_pinning.service_name}&background={self._settings.remote_pinning.background_pinning}',
+                )
+                if r.status_code != 200:
+                    self._logger.error(
+                        'IPFS client error: remote pinning add operation, response:{}', r,
+                    )
+                    if self._remote_pins:
+                        self._remote_pins.failed.add(cid)
+                elif self._remote_pins:
+                    # background pins complete later, their state is polled
+                    self._remote_pins.track([cid])
+
+        await asyncio.gather(*(remote_pin(cid) for cid in cids))
+
     async def add_json(self, json_obj, **kwargs):
-        try:
-            json_data = json.dumps(json_obj).encode('utf-8')
-        except Exception as e:
-            raise e
+        # encoded straight to bytes with one encoder for every backend, the
+        # codec only decodes; pydantic models are accepted as well
+        json_data = canonical_dumps(json_obj)
 
         cid = await self.add_bytes(json_data, **kwargs)
         return cid
 
     async def cat(self, cid, **kwargs):
         bytes_mode = kwargs.get('bytes_mode', False)
+        max_bytes = kwargs.get('max_bytes', None)
+        offset = kwargs.get('offset')
+        length = kwargs.get('length')
+        if self._cache:
+            cached = await self._cache.get(cid)
+            if cached is not None:
+                _check_offset(cid, len(cached), offset)
+                cached = _slice_range(cached, offset, length)
+                if not cached:
+                    raise IPFSAsyncClientError(
+                        f'IPFS client error: cat on CID {cid}, response body empty',
+                    )
+                _check_max_bytes(cid, len(cached), max_bytes)
+                if not bytes_mode:
+                    return str(cached, 'utf-8', errors='replace')
+                return bytes(cached)
+        # concurrent reads of the same content share one request, the
+        # result is read-only from here on
+        response_body = await self._inflight.do(
+            ('cat', cid, offset, length, max_bytes),
+            lambda: self._fetch_cat(cid, offset, length, max_bytes),
+        )
         if not bytes_mode:
-            response_body = ''
-        else:
-            response_body = b''
+            return response_body.decode('utf-8', errors='replace')
+        return bytes(response_body)
+
+    async def _fetch_cat(self, cid, offset, length, max_bytes):
+        response_body = await self._read(
+            'cat',
+            lambda client: self._cat_from(client, cid, offset, length, max_bytes),
+            cid=cid,
+        )
+        if self._cache and not offset and length is None:
+            response_body = bytes(response_body)
+            self._cache.put(cid, response_body)
+        return response_body
+
+    async def _cat_from(self, client, cid, offset, length, max_bytes):
         last_response_code = None
-        async with self._client.stream(method='POST', url=f'/cat?arg={cid}') as response:
+        async with client.stream(
+            method='POST',
+            url='/cat',
+            params=_cat_params(cid, offset, length),
+        ) as response:
             if response.status_code != 200:
                 raise IPFSAsyncClientError(
                     f'IPFS client error: cat on CID {cid}, response status code error: {response.status_code}',
+                    status_code=response.status_code,
                 )
-            if not bytes_mode:
-                async for chunk in response.aiter_text():
-                    response_body += chunk
-            else:
-                async for chunk in response.aiter_bytes():
-                    response_body += chunk
+            expected_size = _response_content_length(response, length)
+            _check_max_bytes(cid, expected_size, max_bytes)
+            # preallocate when the node announces the size, slice assignment
+            # copies every chunk in place and grows the buffer only on overflow
+            response_body = bytearray(expected_size or 0)
+            received = 0
+            async for chunk in response.aiter_bytes():
+                end = received + len(chunk)
+                _check_max_bytes(cid, end, max_bytes)
+                response_body[received:end] = chunk
+                received = end
+            del response_body[received:]
             last_response_code = response.status_code
         if not response_body:
             raise IPFSAsyncClientError(
@@ -201,84 +861,390 @@ class AsyncIPFSClient:
             )
         return response_body
 
-    async def get_json(self, cid, **kwargs):
-        json_data = await self.cat(cid)
+    async def cat_stream(
+            self,
+            cid,
+            chunk_size=65536,
+            offset=None,
+            length=None,
+            max_bytes=None,
+    ):
+        cached = await self._cache.get(cid) if self._cache else None
+        if cached is not None:
+            _check_offset(cid, len(cached), offset)
+            cached = memoryview(_slice_range(cached, offset, length))
+            _check_max_bytes(cid, len(cached), max_bytes)
+            for start in range(0, len(cached), chunk_size):
+                yield bytes(cached[start:start + chunk_size])
+            return
+        # streams are not hedged, they go to the best node of the pool
+        client = self._pool.ranked()[0].client if self._pool else self._client
+        async with self._stream(
+            'cat_stream',
+            str(client.base_url),
+            client.stream(
+                method='POST',
+                url='/cat',
+                params=_cat_params(cid, offset, length),
+            ),
+            cid=cid,
+        ) as response:
+            if response.status_code != 200:
+                raise IPFSAsyncClientError(
+                    f'IPFS client error: cat on CID {cid}, response status code error: {response.status_code}',
+                    status_code=response.status_code,
+                )
+            _check_max_bytes(
+                cid, _response_content_length(response, length), max_bytes,
+            )
+            received = 0
+            async for chunk in response.aiter_bytes(chunk_size):
+                received += len(chunk)
+                _check_max_bytes(cid, received, max_bytes)
+                yield chunk
+
+    async def export_car(self, root_cid, chunk_size=65536):
+        """Stream the DAG below `root_cid` as a CAR v1 file, see
+        `ipfs_client.car.aiter_blocks` for iterating over its blocks."""
+        client = self._pool.ranked()[0].client if self._pool else self._client
+        async with self._stream(
+            'export_car',
+            str(client.base_url),
+            client.stream(method='POST', url='/dag/export', params={'arg': root_cid}),
+            cid=root_cid,
+        ) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise IPFSAsyncClientError(
+                    f'IPFS client error: export_car on CID {root_cid}, response:{response}',
+                    status_code=response.status_code,
+                )
+            async for chunk in response.aiter_bytes(chunk_size):
+                yield chunk
+
+    async def export_car_to_file(self, root_cid, path):
+        # written next to `path` and renamed once complete
+        part_path = f'{path}.part'
+        written = 0
+        loop = asyncio.get_running_loop()
+        with open(part_path, 'wb') as f:
+            async for chunk in self.export_car(root_cid):
+                await loop.run_in_executor(None, f.write, chunk)
+                written += len(chunk)
+        os.replace(part_path, path)
+        return written
+
+    async def import_car(self, car, pin_roots=True):
+        """Import a CAR v1/v2 file into the node and return its root CIDs.
+
+        `car` is a path, a binary file object or an (async) iterable of
+        bytes; it is streamed to the node without being buffered.
+        """
+        if isinstance(car, (str, os.PathLike)):
+            chunks = multipart_util.iter_file(car)
+        elif hasattr(car, 'read'):
+            chunks = multipart_util.iter_sync(iter(lambda: car.read(256 * 1024), b''))
+        elif hasattr(car, '__aiter__'):
+            chunks = car
+        else:
+            chunks = multipart_util.iter_sync(car)
+        boundary = multipart_util.new_boundary()
+        await self._write_limiter.acquire()
+        # like streamed adds, an import consumes its body and is not retried
+        async with self._stream(
+            'import_car',
+            str(self._client.base_url),
+            self._client.stream(
+                method='POST',
+                url='/dag/import',
+                params={'pin-roots': str(pin_roots).lower()},
+                content=multipart_util.encode_stream(chunks, boundary, 'import.car'),
+                headers={'Content-Type': multipart_util.content_type(boundary)},
+            ),
+        ) as r:
+            self._write_limiter.feedback(r.status_code)
+            if r.status_code != 200:
+                await r.aread()
+                raise IPFSAsyncClientError(
+                    f'IPFS client error: import_car operation, response:{r}',
+                    status_code=r.status_code,
+                )
+            roots = []
+            async for line in r.aiter_lines():
+                if not line.strip():
+                    continue
+                try:
+                    resp = self._json.loads(line)
+                except json.JSONDecodeError:
+                    raise IPFSAsyncClientError(
+                        f'IPFS client error: import_car operation, unexpected response line:{line}',
+                    )
+                root = resp.get('Root')
+                if not root:
+                    continue
+                if root.get('PinErrorMsg'):
+                    raise IPFSAsyncClientError(
+                        f'IPFS client error: import_car could not pin root {root["Cid"]["/"]}: {root["PinErrorMsg"]}',
+                    )
+                roots.append(root['Cid']['/'])
+        return roots
+
+    async def get_json(self, cid, model=None, **kwargs):
+        # decoded straight from the response bytes, into an instance of
+        # `model` (a pydantic model or msgspec Struct type) when given
+        json_data = await self.cat(cid, bytes_mode=True)
         try:
-            return json.loads(json_data)
+            return self._json.decode(json_data, model)
         except json.JSONDecodeError:
-            return json_data
+            if model is not None:
+                raise
+            return json_data.decode('utf-8', errors='replace')
 
-    # Unpin the data using cid
-    async def unpin(self, cid: str):
-        print("Unpinning from IPFS ....")
-        r = await self._client.post(
-        url=f'/pin/rm?arg={cid}',
+    # Unpin the data using cid, failures are logged unless `raise_on_error`
+    # is set; with it, a CID that is not pinned anymore counts as unpinned
+    async def unpin(self, cid: str, raise_on_error=False):
+        if debug_enabled():
+            self._logger.debug('Unpinning {} from IPFS', cid)
+        r = await self._post_write(
+            'unpin',
+            cid=cid,
+            url=f'/pin/rm?arg={cid}',
         )
         if r.status_code != 200:
-            self._logger.error(
-                f'IPFS client error: remote remove pin operation, response:{r}',
-            )
+            if not raise_on_error:
+                self._logger.error(
+                    'IPFS client error: remote remove pin operation, response:{}', r,
+                )
+            elif r.status_code == 500 and 'not pinned' in self._error_message(r):
+                self._logger.info('{} was not pinned anymore', cid)
+            else:
+                raise IPFSAsyncClientError(
+                    f'IPFS client error: unpin operation on CID {cid}, response:{r}',
+                    status_code=r.status_code,
+                )
         else:
-            self._logger.info(f"Successfully unpinned {cid}")
+            self._logger.info('Successfully unpinned {}', cid)
+            if self._dedup:
+                self._dedup.discard(cid)
 
-    # Archive the data to Filecoin via Lighthouse PoDSI, make take up to two days for getting a deal
-    async def archive(self, file: dict[str, bytes]):
-        print("Archiving to Filecoin started ....")
-        url = "https://node.lighthouse.storage/api/v0/add"
-        headers = {'Authorization': f'Bearer YOUR_API_KEY'}
-        files = file
-        async with httpx.AsyncClient() as client:
-            r = await client.post(url, headers=headers, files=files)
+    async def pin_many(self, cids, recursive=True):
+        return await self._pin_batches(
+            'pin_add', '/pin/add', cids, {'recursive': str(recursive).lower()},
+        )
+
+    async def unpin_many(self, cids, recursive=True):
+        result = await self._pin_batches(
+            'unpin', '/pin/rm', cids, {'recursive': str(recursive).lower()},
+        )
+        if self._dedup:
+            for cid in result.succeeded:
+                self._dedup.discard(cid)
+        return result
+
+    async def _pin_batches(self, operation, url, cids, params):
+        # each request carries up to batch_size arg= values; the node rejects
+        # a whole batch for one bad CID, so a rejected batch is split in
+        # halves until the CIDs it refuses are isolated. The halves bypass the
+        # circuit breaker: the node has just answered, and the errors they
+        # run into must not fail the other writes fast
+        cids = list(dict.fromkeys(cids))
+        pin_settings = self._settings.pins
+        semaphore = asyncio.Semaphore(pin_settings.concurrency)
+        succeeded = set()
+        failed = {}
+
+        async def run(batch, guarded=True):
+            r = await self._post_write(
+                operation,
+                guarded=guarded,
+                url=url,
+                params=[*params.items(), *(('arg', cid) for cid in batch)],
+            )
+            if r.status_code == 200:
+                succeeded.update(batch)
+            elif r.status_code != 500:
+                raise IPFSAsyncClientError(
+                    f'IPFS client error: {operation} operation, response:{r}',
+                    status_code=r.status_code,
+                )
+            elif len(batch) == 1:
+                failed[batch[0]] = self._error_message(r)
+            else:
+                middle = len(batch) // 2
+                await run(batch[:middle], guarded=False)
+                await run(batch[middle:], guarded=False)
+
+        async def run_batch(batch):
+            async with semaphore:
+                await run(batch)
+
+        await asyncio.gather(
+            *(
+                run_batch(cids[start:start + pin_settings.batch_size])
+                for start in range(0, len(cids), pin_settings.batch_size)
+            ),
+        )
+        if failed:
+            self._logger.warning(
+                '{} operation failed for {} of {} CIDs', operation, len(failed), len(cids),
+            )
+        return PinBatchResult([cid for cid in cids if cid in succeeded], failed)
+
+    def _error_message(self, response):
+        try:
+            return self._json.loads(response.content)['Message']
+        except (json.JSONDecodeError, KeyError, TypeError):
+            return response.text
+
+    async def pin_ls(self, type='recursive'):
+        """Stream the pins of the node as `PinInfo` tuples."""
+        async with self._stream(
+            'pin_ls',
+            str(self._client.base_url),
+            self._client.stream(
+                method='POST', url='/pin/ls', params={'type': type, 'stream': 'true'},
+            ),
+        ) as r:
+            if r.status_code != 200:
+                await r.aread()
+                raise IPFSAsyncClientError(
+                    f'IPFS client error: pin_ls operation, response:{r}',
+                    status_code=r.status_code,
+                )
+            async for line in r.aiter_lines():
+                if not line.strip():
+                    continue
+                resp = self._json.loads(line)
+                yield PinInfo(resp['Cid'], resp['Type'])
+
+    async def remote_pin_status(self, cids=None, status=REMOTE_PIN_STATES):
+        """Remote pin state of `cids` (all pins when None) on the configured
+        service, as a dict of CID to queued/pinning/pinned/failed."""
+        params = [('service', self._settings.remote_pinning.service_name)]
+        params += [('status', state) for state in status]
+        params += [('cid', cid) for cid in cids or ()]
+        r = await self._call(
+            'pin_remote_ls',
+            str(self._client.base_url),
+            lambda: self._client.post(url='/pin/remote/ls', params=params),
+        )
         if r.status_code != 200:
-            self._logger.error(
-                f'Lighthouse upload error, response:{r}',
+            raise IPFSAsyncClientError(
+                f'IPFS client error: pin_remote_ls operation, response:{r}',
+                status_code=r.status_code,
+            )
+        statuses = {}
+        for line in r.content.splitlines():
+            if line.strip():
+                resp = self._json.loads(line)
+                statuses[resp['Cid']] = resp['Status']
+        return statuses
+
+    def remote_pin_stats(self):
+        if not self._remote_pins:
+            return None
+        return self._remote_pins.stats()
+
+    # Archive the data to Filecoin via Lighthouse PoDSI, make take up to two days for getting a deal
+    async def archive(self, file: dict[str, bytes], raise_on_error=False):
+        self._logger.debug('Archiving to Filecoin started')
+        if not self._settings.lighthouse.upload.auth:
+            raise IPFSAsyncClientError(
+                'Lighthouse upload error: IPFSConfig.lighthouse.upload.auth is not set',
             )
+        lighthouse_upload = self._services.get(LIGHTHOUSE_UPLOAD)
+        r = await self._call(
+            'archive',
+            str(lighthouse_upload.base_url),
+            lambda: lighthouse_upload.post('/api/v0/add', files=file),
+            idempotent=False,
+        )
+        if r.status_code != 200:
+            if raise_on_error:
+                raise IPFSAsyncClientError(
+                    f'Lighthouse upload error, response:{r}', status_code=r.status_code,
+                )
+            self._logger.error('Lighthouse upload error, response:{}', r)
         try:
-            resp = r.json()
+            resp = self._json.loads(r.content)
         except json.JSONDecodeError:
             return r.text
         else:
             archived_cid = resp['Hash']
-            self._logger.info(f'Archived CID: {archived_cid}')
+            self._logger.info('Archived CID: {}', archived_cid)
             return archived_cid
 
-    # Retrieve the data using Filecoin's native Lassie
-    # Port number: 36711 might change as per your lassie daemon
-    async def retrieve(self, cid, outputfname):
-        url = f'http://127.0.0.1:36711/ipfs/{cid}?filename={outputfname}'
-        async with httpx.AsyncClient() as client:
-            r = await client.get(url)
-            if r.status_code != 200:
-                self._logger.error(
-                    f'Lassie retrieve error, response:{r}',
-                )
-            with open(outputfname, 'wb') as f:
-                f.write(r.content)
-        self._logger.info(f"Successfully retrieved and saved file {outputfname}")
-    
-    async def schedule_archive_and_unpin(self, cid, file, delay):
-        await asyncio.sleep(delay)
-        #await self.archive(file)
-        await self.unpin(cid)
+    # Retrieve the data using Filecoin's native Lassie, the CAR is streamed to
+    # disk and renamed into place once complete
+    async def retrieve(self, cid, outputfname, progress=None):
+        with self._instrumentation.operation('retrieve', cid):
+            return await self._retriever.retrieve(cid, outputfname, progress)
+
+    async def retrieve_many(self, requests, progress=None):
+        # failures are returned in place of the stats of the failed transfer
+        return await asyncio.gather(
+            *(
+                self.retrieve(cid, output_path, progress)
+                for cid, output_path in requests
+            ),
+            return_exceptions=True,
+        )
+
+    # Queue the CID for background archival (lifecycle.archive unless
+    # `archive` is given) and unpinning, the call returns immediately and the
+    # job is executed by the lifecycle scheduler; the archived content is
+    # read back from the node when the job runs
+    async def schedule_archive_and_unpin(self, cid, delay=None, archive=None):
+        if not self._lifecycle:
+            raise IPFSAsyncClientError(
+                'IPFS client error: lifecycle scheduling requires a write mode client with lifecycle enabled',
+            )
+        self._lifecycle.schedule(cid, delay=delay, archive=archive)
+
+    def cache_stats(self):
+        if not self._cache:
+            return None
+        return self._cache.stats()
+
+    def lifecycle_stats(self):
+        if not self._lifecycle:
+            return None
+        return self._lifecycle.stats()
 
     # Get prrof that you file was actually uploaded to the Filecoin network (PoDSI)
     async def get_proof(self, cid):
-        url = f'https://api.lighthouse.storage/api/lighthouse/get_proof?cid={cid}&network=testnet'
-        async with httpx.AsyncClient() as client:
-            r = await client.get(url)
+        lighthouse_api = self._services.get(LIGHTHOUSE_API)
+        r = await self._call(
+            'get_proof',
+            str(lighthouse_api.base_url),
+            lambda: lighthouse_api.get(
+                '/api/lighthouse/get_proof',
+                params={'cid': cid, 'network': self._settings.lighthouse.network},
+            ),
+            cid=cid,
+        )
         if r.status_code != 200:
-            self._logger.error(
-                f'Proof retrieve error, response:{r}',
-            )
+            self._logger.error('Proof retrieve error, response:{}', r)
         else:
-            return r.json()
+            return self._json.loads(r.content)
+
+
 class AsyncIPFSClientSingleton:
-    def __init__(self, settings: IPFSConfig):
+    def __init__(self, settings: IPFSConfig, transport=None):
+        # both clients serve the same immutable content, so they share a cache
+        cache = None
+        if settings.cache.enabled:
+            cache = CIDCache(settings.cache, settings.local_cache_path)
+        self._services = _init_service_registry(settings, transport)
+        retriever = LassieRetriever(settings.lassie, self._services)
         self._ipfs_write_client = AsyncIPFSClient(
-            addr=settings.url, settings=settings, write_mode=True,
+            addr=settings.url, settings=settings, write_mode=True, cache=cache,
+            services=self._services, retriever=retriever, transport=transport,
         )
         self._ipfs_read_client = AsyncIPFSClient(
             addr=settings.reader_url, settings=settings, write_mode=False,
+            cache=cache, services=self._services, retriever=retriever,
+            transport=transport,
         )
         self._initialized = False
 
@@ -288,3 +1254,227 @@ class AsyncIPFSClientSingleton:
         await self._ipfs_write_client.init_session()
         await self._ipfs_read_client.init_session()
         self._initialized = True
+
+    async def aclose(self):
+        await self._ipfs_write_client.aclose()
+        await self._ipfs_read_client.aclose()
+        await self._services.aclose()
+        self._initialized = False
+
+
+class _SharedTransport:
+    def __init__(self, transport):
+        self.transport = transport
+        self.refs = 0
+        self.warmed = False
+
+
+class _TransportRef(AsyncBaseTransport):
+    # a client's reference to a shared transport, closing the client
+    # releases the reference instead of closing the transport
+    def __init__(self, factory, key, shared: _SharedTransport):
+        self._factory = factory
+        self._key = key
+        self._shared = shared
+        self._closed = False
+
+    @property
+    def _pool(self):
+        # connection pool of the shared transport, read by pool_stats()
+        return getattr(self._shared.transport, '_pool', None)
+
+    async def handle_async_request(self, request):
+        return await self._shared.transport.handle_async_request(request)
+
+    async def aclose(self):
+        # closed once per node client of a reader pool
+        if self._closed:
+            return
+        self._closed = True
+        await self._factory._release(self._key)
+
+
+class _LocalState:
+    # the cache, dedup index and lifecycle scheduler of the factory clients
+    # keeping their state files under one local_cache_path
+    def __init__(self):
+        self.cache = None
+        self.dedup = None
+        self.lifecycle = None
+        # the client the lifecycle jobs run on
+        self.lifecycle_client = None
+        # (base_url, uds) of the node the dedup index and the lifecycle
+        # jobs refer to
+        self.writer = None
+        self.clients = []
+
+
+class AsyncIPFSClientFactory:
+    """Creates clients that share one transport, and so one connection
+    pool, per (endpoints, auth, connection limits, protocol).
+
+    Services creating clients per tenant or request get warm keepalive
+    connections instead of a new pool for every client. `aclose()` of a
+    client releases its reference, the transport is closed with the last
+    one. Clients on the same `local_cache_path` also share one cache, dedup
+    index and lifecycle scheduler, the first client's settings apply to
+    them; write clients on one path must write to the same node.
+    Transports are bound to the event loop they were first used on, use a
+    factory from a single loop. A `transport` given here replaces the
+    network transport, e.g. an `httpx.ASGITransport` in front of a mock node.
+    """
+
+    def __init__(self, transport=None):
+        self._transport = transport
+        self._shared: Dict[tuple, _SharedTransport] = {}
+        self._local: Dict[str, _LocalState] = {}
+
+    def _key(self, addr, settings: IPFSConfig, write_mode, api_base):
+        endpoints = [_parse_addr(addr, api_base)[::2]]
+        if not write_mode:
+            endpoints += [_parse_addr(url, api_base)[::2] for url in settings.reader_urls]
+        if len(endpoints) > 1 and any(uds for _, uds in endpoints):
+            raise ValueError(
+                'Reader pools with Unix socket endpoints cannot share a transport',
+            )
+        transport, auth = _side_settings(settings, write_mode)
+        limits = _connection_limits(settings, write_mode)
+        return (
+            tuple(endpoints),
+            (auth.apiKey, auth.apiSecret) if auth else None,
+            (limits.max_connections, limits.max_keepalive_connections, limits.keepalive_expiry),
+            transport.http2,
+        )
+
+    async def client(
+            self,
+            addr,
+            settings: IPFSConfig,
+            write_mode=False,
+            api_base='api/v0',
+            warm_up=0,
+            **kwargs,
+    ) -> AsyncIPFSClient:
+        """Return an initialized client on `addr`. `warm_up` pre-opens that
+        many keepalive connections when the transport is created; other
+        keyword arguments are passed to `AsyncIPFSClient`."""
+        key = self._key(addr, settings, write_mode, api_base)
+        path = os.path.abspath(settings.local_cache_path)
+        local = self._local.get(path) or _LocalState()
+        writer = key[0][0]
+        keeps_write_state = write_mode and (settings.dedup.enabled or settings.lifecycle.enabled)
+        if keeps_write_state and local.writer not in (None, writer):
+            raise ValueError(
+                f'local_cache_path {path} holds the dedup index and lifecycle jobs of {local.writer[0]}, '
+                f'use another path for {writer[0]}',
+            )
+        self._local[path] = local
+        self._share_local_state(local, settings, write_mode, kwargs)
+        shared = self._shared.get(key)
+        if shared is None:
+            _, uds = key[0][0]
+            shared = _SharedTransport(
+                self._transport or _http_transport(settings, write_mode, uds),
+            )
+            self._shared[key] = shared
+        shared.refs += 1
+        transport = _TransportRef(self, key, shared)
+        # the shared transport carries node requests only, Lighthouse and
+        # Lassie clients keep their own transports built from their configs
+        owns_services = 'services' not in kwargs
+        if owns_services:
+            kwargs['services'] = _init_service_registry(settings, self._transport)
+        try:
+            client = AsyncIPFSClient(
+                addr, settings, api_base=api_base, write_mode=write_mode,
+                transport=transport, **kwargs,
+            )
+        except BaseException:
+            await transport.aclose()
+            if not local.clients:
+                del self._local[path]
+            raise
+        client._owns_services = owns_services
+        local.clients.append(client)
+        if client._lifecycle and local.lifecycle is None:
+            local.lifecycle = client._lifecycle
+            local.lifecycle_client = client
+        if keeps_write_state:
+            local.writer = writer
+        client._release_local_state = functools.partial(self._release_local_state, path)
+        try:
+            await client.init_session()
+            if warm_up and not shared.warmed:
+                shared.warmed = True
+                await client.warm_up(warm_up)
+        except BaseException:
+            await client.aclose()
+            await transport.aclose()
+            raise
+        return client
+
+    def _share_local_state(self, local: _LocalState, settings: IPFSConfig, write_mode, kwargs):
+        # created by the first client that enables them, given to the others
+        if settings.cache.enabled and 'cache' not in kwargs:
+            if local.cache is None:
+                local.cache = CIDCache(settings.cache, settings.local_cache_path)
+            kwargs['cache'] = local.cache
+        if not write_mode:
+            return
+        if settings.dedup.enabled and 'dedup' not in kwargs:
+            if local.dedup is None:
+                local.dedup = DedupIndex(settings.dedup, settings.local_cache_path)
+            kwargs['dedup'] = local.dedup
+        if settings.lifecycle.enabled and local.lifecycle and 'lifecycle' not in kwargs:
+            kwargs['lifecycle'] = local.lifecycle
+
+    async def _release_local_state(self, path, client):
+        local = self._local[path]
+        local.clients.remove(client)
+        if local.lifecycle and local.lifecycle_client is client:
+            # the jobs move to another client sharing the scheduler, the last
+            # one shuts it down and its jobs stay in the state file
+            writers = [c for c in local.clients if c._lifecycle is local.lifecycle]
+            if writers:
+                local.lifecycle_client = writers[0]
+                local.lifecycle.bind(writers[0])
+            else:
+                await local.lifecycle.shutdown()
+                local.lifecycle = local.lifecycle_client = None
+        if local.clients:
+            return
+        del self._local[path]
+        if local.dedup:
+            local.dedup.close()
+        if local.cache:
+            await local.cache.flush()
+
+    async def _release(self, key):
+        shared = self._shared[key]
+        shared.refs -= 1
+        if shared.refs == 0:
+            del self._shared[key]
+            # a transport given to the factory belongs to the caller
+            if self._transport is None:
+                await shared.transport.aclose()
+
+    def stats(self):
+        """Endpoints and number of open clients of every shared transport."""
+        return [
+            {
+                'endpoints': [base_url for base_url, _ in key[0]],
+                'clients': shared.refs,
+            }
+            for key, shared in self._shared.items()
+        ]
+
+
+_client_factory = None
+
+
+def get_client_factory() -> AsyncIPFSClientFactory:
+    """The process-wide `AsyncIPFSClientFactory`."""
+    global _client_factory
+    if _client_factory is None:
+        _client_factory = AsyncIPFSClientFactory()
+    return _client_factory
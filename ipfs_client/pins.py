@@ -0,0 +1,105 @@
+import asyncio
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+
+from ipfs_client.default_logger import logger
+from ipfs_client.settings.data_models import PinManagementConfig
+
+
+REMOTE_PIN_STATES = ('queued', 'pinning', 'pinned', 'failed')
+
+
+class PinInfo(NamedTuple):
+    cid: str
+    type: str
+
+
+class PinBatchResult(NamedTuple):
+    succeeded: List[str]
+    # CID -> error message of the node
+    failed: Dict[str, str]
+
+
+class RemotePinTracker:
+    """Follows the state of remote pins in bulk.
+
+    Tracked CIDs are polled with `pin/remote/ls` every
+    `remote_poll_interval` seconds, `batch_size` CIDs per request. Pinned
+    CIDs stop being tracked, failed ones are logged and kept in `failed`
+    until `pop_failed()` is called.
+    """
+
+    def __init__(self, client, settings: PinManagementConfig):
+        self._client = client
+        self._settings = settings
+        self._states: Dict[str, str] = {}
+        self.failed = set()
+        self.pinned = 0
+        self._task: Optional[asyncio.Task] = None
+        self._logger = logger.bind(module='IPFSRemotePinTracker')
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._poll_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def track(self, cids):
+        for cid in cids:
+            self._states.setdefault(cid, 'queued')
+
+    def state(self, cid) -> Optional[str]:
+        if cid in self.failed:
+            return 'failed'
+        return self._states.get(cid)
+
+    def pop_failed(self) -> List[str]:
+        failed, self.failed = self.failed, set()
+        return list(failed)
+
+    async def poll(self):
+        cids = list(self._states)
+        batch_size = self._settings.batch_size
+        for start in range(0, len(cids), batch_size):
+            batch = cids[start:start + batch_size]
+            statuses = await self._client.remote_pin_status(batch)
+            for cid in batch:
+                status = statuses.get(cid)
+                if status is None or cid not in self._states:
+                    continue
+                if status == 'pinned':
+                    del self._states[cid]
+                    self.pinned += 1
+                elif status == 'failed':
+                    del self._states[cid]
+                    self.failed.add(cid)
+                    self._logger.error('Remote pin of {} failed', cid)
+                else:
+                    self._states[cid] = status
+
+    async def _poll_loop(self):
+        while True:
+            await asyncio.sleep(self._settings.remote_poll_interval)
+            if not self._states:
+                continue
+            try:
+                await self.poll()
+            except Exception as e:
+                self._logger.warning('Remote pin status poll failed: {}', e)
+
+    def stats(self):
+        counts = {state: 0 for state in REMOTE_PIN_STATES}
+        for state in self._states.values():
+            counts[state] = counts.get(state, 0) + 1
+        counts['pinned'] = self.pinned
+        counts['failed'] = len(self.failed)
+        return counts
@@ -0,0 +1,109 @@
+import asyncio
+import time
+from typing import Optional
+
+from ipfs_client.dag import IPFSRateLimitError
+from ipfs_client.default_logger import logger
+from ipfs_client.settings.data_models import IPFSWriterRateLimit
+
+
+class AsyncTokenBucket:
+    """Token bucket limiter for coroutines.
+
+    Implemented as a virtual scheduler (GCRA): every `acquire()` reserves the
+    next free slot synchronously, so callers are served strictly in arrival
+    order and a burst of `burst` requests passes without waiting. In adaptive
+    mode the rate is halved on 429/5xx responses and recovers additively on
+    successful ones. A caller cancelled while waiting for the last reserved
+    slot gives it back.
+    """
+
+    def __init__(
+            self,
+            req_per_sec: float,
+            burst: int,
+            adaptive: bool = False,
+            min_req_per_sec: float = 1,
+            max_wait: Optional[float] = None,
+    ):
+        if req_per_sec <= 0:
+            raise ValueError(f'req_per_sec must be positive, got {req_per_sec}')
+        self._max_rate = float(req_per_sec)
+        self._min_rate = min(float(min_req_per_sec), self._max_rate)
+        self._rate = self._max_rate
+        self._burst = max(burst, 1)
+        self._adaptive = adaptive
+        self._max_wait = max_wait
+        # theoretical arrival time of the next request
+        self._tat = 0.0
+        self._logger = logger.bind(module='IPFSRateLimiter')
+        self.acquired = 0
+        self.delayed = 0
+        self.rejections = 0
+        self.total_wait = 0.0
+        self.max_observed_wait = 0.0
+
+    @classmethod
+    def from_config(cls, settings: IPFSWriterRateLimit):
+        return cls(
+            req_per_sec=settings.req_per_sec,
+            burst=settings.burst,
+            adaptive=settings.adaptive,
+            min_req_per_sec=settings.min_req_per_sec,
+            max_wait=settings.max_wait,
+        )
+
+    @property
+    def rate(self):
+        return self._rate
+
+    async def acquire(self):
+        now = time.monotonic()
+        interval = 1 / self._rate
+        tat = max(self._tat, now)
+        wait = tat - (self._burst - 1) * interval - now
+        if wait > 0 and self._max_wait is not None and wait > self._max_wait:
+            self.rejections += 1
+            raise IPFSRateLimitError(
+                f'IPFS client error: write rate limit exceeded, required wait of {wait:.3f}s is over max_wait {self._max_wait}s',
+            )
+        self._tat = tat + interval
+        self.acquired += 1
+        if wait > 0:
+            self.delayed += 1
+            self.total_wait += wait
+            self.max_observed_wait = max(self.max_observed_wait, wait)
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                # the request is never sent; only the last slot can be given
+                # back, the callers queued behind keep theirs
+                if self._tat == tat + interval:
+                    self._tat = tat
+                self.acquired -= 1
+                raise
+
+    def feedback(self, status_code: int):
+        if not self._adaptive:
+            return
+        if status_code == 429 or status_code >= 500:
+            rate = max(self._rate / 2, self._min_rate)
+            if rate != self._rate:
+                self._logger.warning(
+                    'Writer node returned {}, backing off write rate to {:.2f} req/s',
+                    status_code, rate,
+                )
+            self._rate = rate
+        elif self._rate < self._max_rate:
+            self._rate = min(self._rate + self._max_rate / 20, self._max_rate)
+
+    def stats(self):
+        return {
+            'rate': self._rate,
+            'acquired': self.acquired,
+            'delayed': self.delayed,
+            'rejections': self.rejections,
+            'total_wait': self.total_wait,
+            'avg_wait': self.total_wait / self.delayed if self.delayed else 0.0,
+            'max_wait': self.max_observed_wait,
+        }
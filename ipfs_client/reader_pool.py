@@ -0,0 +1,238 @@
+import asyncio
+import time
+from collections import deque
+from typing import List
+from typing import Optional
+
+from httpx import AsyncClient
+from httpx import TransportError
+
+from ipfs_client.dag import IPFSAsyncClientError
+from ipfs_client.dag import IPFSCircuitOpenError
+from ipfs_client.dag import IPFSContentTooLargeError
+from ipfs_client.default_logger import logger
+from ipfs_client.settings.data_models import ReaderPoolConfig
+
+
+# statuses of a node that is down or overloaded; other errors, such as the
+# 500 kubo answers for a missing block, come from a healthy node
+NODE_FAILURE_STATUSES = (502, 503, 504)
+
+
+def _is_node_failure(error):
+    if isinstance(error, TransportError):
+        return True
+    return isinstance(error, IPFSAsyncClientError) and error.status_code in NODE_FAILURE_STATUSES
+
+
+class ReaderNode:
+    def __init__(self, url: str, client: AsyncClient, settings: ReaderPoolConfig):
+        self.url = url
+        self.client = client
+        self._alpha = settings.ewma_alpha
+        self.ewma_latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.latencies: deque = deque(maxlen=settings.latency_window)
+        self.healthy = True
+        self.inflight = 0
+        self.consecutive_failures = 0
+        self.consecutive_successes = 0
+
+    def record(self, latency: float, ok: bool):
+        if ok:
+            self.latencies.append(latency)
+            if self.ewma_latency is None:
+                self.ewma_latency = latency
+            else:
+                self.ewma_latency += self._alpha * (latency - self.ewma_latency)
+        self.error_rate += self._alpha * ((0.0 if ok else 1.0) - self.error_rate)
+
+    def p95(self) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+
+    def score(self):
+        # unmeasured nodes score best so that every node gets sampled
+        latency = self.ewma_latency or 0.0
+        return latency * (1 + self.inflight) / max(1.0 - self.error_rate, 0.01)
+
+    def stats(self):
+        return {
+            'url': self.url,
+            'healthy': self.healthy,
+            'ewma_latency': self.ewma_latency,
+            'p95_latency': self.p95(),
+            'error_rate': self.error_rate,
+            'inflight': self.inflight,
+        }
+
+
+class ReaderPool:
+    """Routes reads across several IPFS nodes.
+
+    Requests go to the healthy node with the lowest EWMA latency, weighted by
+    its error rate and in-flight requests, and fail over to the next node on
+    transport or node errors. A background probe ejects nodes that keep
+    failing and readmits them once they answer again. With `hedge` enabled a
+    second request is sent to the next best node when the first one has not
+    completed within the p95 latency of its node.
+    """
+
+    def __init__(self, nodes: List[ReaderNode], settings: ReaderPoolConfig):
+        self._nodes = nodes
+        self._settings = settings
+        self._probe_task: Optional[asyncio.Task] = None
+        self._logger = logger.bind(module='IPFSReaderPool')
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    @property
+    def nodes(self):
+        return self._nodes
+
+    def start(self):
+        if self._probe_task is None and self._settings.health_check_interval > 0:
+            self._probe_task = asyncio.get_running_loop().create_task(
+                self._probe_loop(),
+            )
+
+    async def aclose(self):
+        if self._probe_task:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+        for node in self._nodes:
+            await node.client.aclose()
+
+    def ranked(self) -> List[ReaderNode]:
+        healthy = [node for node in self._nodes if node.healthy]
+        # with every node ejected reads are still attempted rather than
+        # failing outright
+        return sorted(healthy or self._nodes, key=ReaderNode.score)
+
+    async def run(self, fn):
+        """Run `fn(client)` on the best node, failing over and hedging as
+        configured."""
+        candidates = self.ranked()
+        last_error = None
+        while candidates:
+            node = candidates.pop(0)
+            try:
+                if self._settings.hedge and candidates:
+                    return await self._run_hedged(fn, node, candidates)
+                return await self._run_on(fn, node)
+            except IPFSContentTooLargeError:
+                raise
+            except (TransportError, IPFSAsyncClientError) as e:
+                last_error = e
+                if candidates:
+                    self.failovers += 1
+                    self._logger.debug(
+                        'Read on {} failed, failing over: {}', node.url, e,
+                    )
+        raise last_error
+
+    async def _run_on(self, fn, node: ReaderNode):
+        node.inflight += 1
+        started = time.monotonic()
+        ok = False
+        try:
+            result = await fn(node.client)
+            ok = True
+            return result
+        except (asyncio.CancelledError, IPFSCircuitOpenError):
+            # a cancelled hedge or a request the breaker did not let through
+            # says nothing about the node
+            ok = None
+            raise
+        except Exception as e:
+            ok = not _is_node_failure(e)
+            raise
+        finally:
+            node.inflight -= 1
+            if ok is not None:
+                node.record(time.monotonic() - started, ok)
+                self._update_health(node, ok)
+
+    async def _run_hedged(self, fn, node: ReaderNode, candidates: List[ReaderNode]):
+        primary = asyncio.ensure_future(self._run_on(fn, node))
+        delay = max(node.p95() or self._settings.hedge_min_delay, self._settings.hedge_min_delay)
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+        hedge_node = candidates.pop(0)
+        self.hedged += 1
+        hedge = asyncio.ensure_future(self._run_on(fn, hedge_node))
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                        return task.result()
+            # both failed, surface the primary error
+            return primary.result()
+        finally:
+            losers = [task for task in (primary, hedge) if not task.done()]
+            for task in losers:
+                task.cancel()
+            if losers:
+                await asyncio.wait(losers)
+            for task in (primary, hedge):
+                if not task.cancelled():
+                    # read so that the failure of the losing request is not
+                    # reported as never retrieved
+                    task.exception()
+
+    def _update_health(self, node: ReaderNode, ok: bool):
+        if ok:
+            node.consecutive_failures = 0
+            node.consecutive_successes += 1
+            if not node.healthy and node.consecutive_successes >= self._settings.readmit_after_successes:
+                node.healthy = True
+                self._logger.info('Reader node {} readmitted', node.url)
+        else:
+            node.consecutive_successes = 0
+            node.consecutive_failures += 1
+            if node.healthy and node.consecutive_failures >= self._settings.eject_after_failures:
+                node.healthy = False
+                self._logger.warning('Reader node {} ejected', node.url)
+
+    async def _probe(self, node: ReaderNode):
+        started = time.monotonic()
+        try:
+            r = await node.client.post(
+                '/version', timeout=self._settings.health_check_timeout,
+            )
+            ok = r.status_code == 200
+        except TransportError:
+            ok = False
+        if ok:
+            node.record(time.monotonic() - started, ok)
+        self._update_health(node, ok)
+
+    async def _probe_loop(self):
+        while True:
+            await asyncio.sleep(self._settings.health_check_interval)
+            await asyncio.gather(
+                *(self._probe(node) for node in self._nodes),
+                return_exceptions=True,
+            )
+
+    def stats(self):
+        return {
+            'nodes': [node.stats() for node in self._nodes],
+            'hedged': self.hedged,
+            'hedge_wins': self.hedge_wins,
+            'failovers': self.failovers,
+        }
@@ -0,0 +1,254 @@
+import asyncio
+import random
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Dict
+from typing import Optional
+
+from httpx import Response
+from httpx import TransportError
+
+from ipfs_client.dag import IPFSAsyncClientError
+from ipfs_client.dag import IPFSCircuitOpenError
+from ipfs_client.default_logger import logger
+from ipfs_client.settings.data_models import CircuitBreakerConfig
+from ipfs_client.settings.data_models import ResilienceConfig
+
+
+class RetryBudget:
+    """Caps retries to a fraction of the request volume.
+
+    Every request deposits `ratio` tokens up to `max_tokens`, every retry
+    withdraws one. While a node is down this keeps retries from multiplying
+    the load on it.
+    """
+
+    def __init__(self, ratio: float, min_tokens: int):
+        self._ratio = ratio
+        self._max_tokens = float(max(min_tokens, 1))
+        self._tokens = self._max_tokens
+
+    def deposit(self):
+        self._tokens = min(self._tokens + self._ratio, self._max_tokens)
+
+    def withdraw(self):
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, endpoint: str, settings: CircuitBreakerConfig):
+        self.endpoint = endpoint
+        self._settings = settings
+        self.state = self.CLOSED
+        self.trips = 0
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_inflight = False
+        self._logger = logger.bind(module='IPFSCircuitBreaker')
+
+    def before_call(self):
+        if not self._settings.enabled or self.state == self.CLOSED:
+            return
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self._settings.reset_timeout:
+                raise IPFSCircuitOpenError(
+                    f'IPFS client error: circuit open for {self.endpoint}, failing fast',
+                )
+            self.state = self.HALF_OPEN
+            self._trial_inflight = False
+        # a single trial request is let through while half open
+        if self._trial_inflight:
+            raise IPFSCircuitOpenError(
+                f'IPFS client error: circuit half open for {self.endpoint}, trial request in flight',
+            )
+        self._trial_inflight = True
+
+    def cancel_trial(self):
+        self._trial_inflight = False
+
+    def record_success(self):
+        self._failures = 0
+        if self.state != self.CLOSED:
+            self._logger.info('Circuit for {} closed', self.endpoint)
+        self.state = self.CLOSED
+        self._trial_inflight = False
+
+    def record_failure(self):
+        self._failures += 1
+        if self.state == self.HALF_OPEN or (
+            self.state == self.CLOSED and self._failures >= self._settings.failure_threshold
+        ):
+            self.state = self.OPEN
+            self.trips += 1
+            self._opened_at = time.monotonic()
+            self._trial_inflight = False
+            self._logger.warning(
+                'Circuit for {} opened after {} consecutive failures',
+                self.endpoint, self._failures,
+            )
+
+    def stats(self):
+        return {'state': self.state, 'trips': self.trips}
+
+
+class ResiliencePolicy:
+    """Retries with exponential backoff and full jitter, a shared retry
+    budget and one circuit breaker per endpoint.
+
+    Reads are retried by default, writes only when `retry_writes` is set.
+    A failure is a transport error, an `IPFSAsyncClientError` carrying one of
+    `retry_on_status` (429 and the 502/503/504 gateway statuses by default)
+    or a response with such a status; any other outcome, a kubo command
+    error included, counts as a success for the circuit breaker.
+    """
+
+    def __init__(self, settings: ResilienceConfig):
+        self._settings = settings
+        self._retry = settings.retry
+        self._budget = RetryBudget(
+            self._retry.budget_ratio, self._retry.budget_min_tokens,
+        )
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {'calls': 0, 'retries': 0, 'failures': 0, 'rejected': 0},
+        )
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            breaker = CircuitBreaker(endpoint, self._settings.circuit_breaker)
+            self._breakers[endpoint] = breaker
+        return breaker
+
+    def _is_failure(self, outcome):
+        if isinstance(outcome, TransportError):
+            return True
+        if isinstance(outcome, IPFSCircuitOpenError):
+            return False
+        if isinstance(outcome, IPFSAsyncClientError):
+            return outcome.status_code in self._retry.retry_on_status
+        if isinstance(outcome, Response):
+            return outcome.status_code in self._retry.retry_on_status
+        return False
+
+    def _backoff(self, attempt: int):
+        delay = min(self._retry.base_delay * 2 ** (attempt - 1), self._retry.max_delay)
+        return random.uniform(0, delay) if self._retry.jitter else delay
+
+    async def call(
+            self,
+            operation: str,
+            endpoint: Optional[str],
+            fn,
+            idempotent: bool = True,
+    ):
+        """Run `fn()` under the policy. A response with a retryable status is
+        retried like an error, the last one is returned to the caller."""
+        stats = self._stats[operation]
+        stats['calls'] += 1
+        self._budget.deposit()
+        breaker = self.breaker(endpoint) if endpoint else None
+        retryable = idempotent or self._retry.retry_writes
+        attempt = 0
+        while True:
+            attempt += 1
+            if breaker:
+                try:
+                    breaker.before_call()
+                except IPFSCircuitOpenError:
+                    stats['rejected'] += 1
+                    raise
+            error = None
+            try:
+                outcome = await fn()
+            except asyncio.CancelledError:
+                if breaker:
+                    breaker.cancel_trial()
+                raise
+            except Exception as e:
+                outcome = error = e
+            failed = self._is_failure(outcome)
+            if breaker:
+                if failed:
+                    breaker.record_failure()
+                elif not isinstance(outcome, IPFSCircuitOpenError):
+                    breaker.record_success()
+            if failed and retryable and attempt < self._retry.max_attempts and self._budget.withdraw():
+                stats['retries'] += 1
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            if failed:
+                stats['failures'] += 1
+            if error is not None:
+                raise error
+            return outcome
+
+    async def guard(self, endpoint: str, fn):
+        """Run `fn()` once behind the circuit breaker of `endpoint`."""
+        breaker = self.breaker(endpoint)
+        breaker.before_call()
+        try:
+            outcome = await fn()
+        except asyncio.CancelledError:
+            breaker.cancel_trial()
+            raise
+        except Exception as e:
+            if self._is_failure(e):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            raise
+        if self._is_failure(outcome):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return outcome
+
+    @asynccontextmanager
+    async def guard_stream(self, operation: str, endpoint: str, stream):
+        """Enter the `stream` context once behind the circuit breaker of
+        `endpoint`. The outcome is recorded when the response headers arrive,
+        a stream is never retried since its body may be partly consumed."""
+        stats = self._stats[operation]
+        stats['calls'] += 1
+        breaker = self.breaker(endpoint)
+        try:
+            breaker.before_call()
+        except IPFSCircuitOpenError:
+            stats['rejected'] += 1
+            raise
+        recorded = False
+        try:
+            async with stream as response:
+                recorded = True
+                if self._is_failure(response):
+                    stats['failures'] += 1
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                yield response
+        except TransportError:
+            if not recorded:
+                stats['failures'] += 1
+                breaker.record_failure()
+            raise
+        finally:
+            if not recorded:
+                breaker.cancel_trial()
+
+    def stats(self):
+        return {
+            'operations': {operation: dict(stats) for operation, stats in self._stats.items()},
+            'breakers': {
+                endpoint: breaker.stats()
+                for endpoint, breaker in self._breakers.items()
+            },
+        }
@@ -0,0 +1,150 @@
+import asyncio
+import hashlib
+import os
+import time
+from typing import NamedTuple
+from typing import Optional
+
+from httpx import TransportError
+
+from ipfs_client.dag import IPFSAsyncClientError
+from ipfs_client.default_logger import logger
+from ipfs_client.services import LASSIE
+from ipfs_client.services import ServiceClientRegistry
+from ipfs_client.settings.data_models import LassieConfig
+
+
+def _range_total(content_range):
+    # total size of a `Content-Range: bytes */<size>` header, None when absent
+    # or unknown
+    if not content_range or '/' not in content_range:
+        return None
+    total = content_range.rsplit('/', 1)[1].strip()
+    return int(total) if total.isdigit() else None
+
+
+class RetrievalStats(NamedTuple):
+    cid: str
+    path: str
+    bytes: int
+    elapsed: float
+    attempts: int
+    resumed_bytes: int
+
+    @property
+    def throughput(self):
+        return self.bytes / self.elapsed if self.elapsed else 0.0
+
+
+class LassieRetriever:
+    """Streams CAR files from a Lassie daemon to disk.
+
+    The body is written to a `.part` file next to `path` as it arrives and renamed once
+    complete. A failed transfer is retried, resuming with a Range request from
+    the bytes already on disk when the daemon honours it. A range the daemon
+    cannot satisfy either completes the transfer, when the partial file already
+    holds the whole CAR, or discards the partial file and starts over. Concurrent
+    retrievals share the pooled `lassie` client of the service registry and
+    are bounded by `max_concurrency`.
+    """
+
+    def __init__(self, settings: LassieConfig, services: ServiceClientRegistry):
+        self._settings = settings
+        self._services = services
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._logger = logger.bind(module='LassieRetriever')
+
+    async def retrieve(self, cid, output_path, progress=None):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._settings.max_concurrency)
+        async with self._semaphore:
+            return await self._retrieve(cid, output_path, progress)
+
+    async def _retrieve(self, cid, output_path, progress):
+        # the partial file is keyed by CID so that a leftover transfer of other
+        # content to the same path is never resumed
+        cid_digest = hashlib.sha1(cid.encode('utf-8')).hexdigest()[:16]
+        part_path = f'{output_path}.{cid_digest}.part'
+        started = time.monotonic()
+        last_error = None
+        for attempt in range(1, self._settings.max_attempts + 1):
+            try:
+                offset = os.path.getsize(part_path)
+            except OSError:
+                offset = 0
+            try:
+                written, resumed_bytes = await self._fetch(
+                    cid, output_path, part_path, offset, progress, started,
+                )
+            except (TransportError, IPFSAsyncClientError) as e:
+                last_error = e
+                self._logger.warning(
+                    'Lassie retrieve of {} failed on attempt {}/{}: {}',
+                    cid, attempt, self._settings.max_attempts, e,
+                )
+                if attempt < self._settings.max_attempts:
+                    await asyncio.sleep(min(2 ** (attempt - 1), 30))
+                continue
+            os.replace(part_path, output_path)
+            stats = RetrievalStats(
+                cid=cid,
+                path=output_path,
+                bytes=written,
+                elapsed=time.monotonic() - started,
+                attempts=attempt,
+                resumed_bytes=resumed_bytes,
+            )
+            self._logger.info(
+                'Retrieved {} to {}: {} bytes in {:.3f}s ({:.2f} MB/s)',
+                cid, output_path, stats.bytes, stats.elapsed,
+                stats.throughput / 1e6,
+            )
+            return stats
+        raise IPFSAsyncClientError(
+            f'Lassie retrieve error: CID {cid} failed after {self._settings.max_attempts} attempts: {last_error}',
+        )
+
+    async def _fetch(self, cid, output_path, part_path, offset, progress, started):
+        headers = {'Accept': 'application/vnd.ipld.car'}
+        if offset:
+            headers['Range'] = f'bytes={offset}-'
+        loop = asyncio.get_running_loop()
+        async with self._services.get(LASSIE).stream(
+            method='GET',
+            url=f'/ipfs/{cid}',
+            params={'filename': os.path.basename(output_path)},
+            headers=headers,
+        ) as r:
+            if r.status_code == 206:
+                mode = 'ab'
+            elif r.status_code == 200:
+                # the daemon ignored the range, start over
+                mode = 'wb'
+                offset = 0
+            elif r.status_code == 416 and offset:
+                total = _range_total(r.headers.get('Content-Range'))
+                if total == offset:
+                    # the partial file already holds the whole CAR
+                    return offset, offset
+                # the partial file is stale or longer than the content,
+                # it is dropped and the transfer starts over
+                self._logger.warning(
+                    'Discarding partial Lassie retrieve of {} at {} bytes, range not satisfiable',
+                    cid, offset,
+                )
+                os.remove(part_path)
+                mode = None
+            else:
+                raise IPFSAsyncClientError(
+                    f'Lassie retrieve error, response:{r}',
+                )
+            if mode is None:
+                return await self._fetch(cid, output_path, part_path, 0, progress, started)
+            resumed_bytes = written = offset
+            with open(part_path, mode) as f:
+                async for chunk in r.aiter_bytes():
+                    await loop.run_in_executor(None, f.write, chunk)
+                    written += len(chunk)
+                    if progress is not None:
+                        progress(cid, written, time.monotonic() - started)
+        return written, resumed_bytes
@@ -0,0 +1,94 @@
+import importlib.util
+from typing import Dict
+
+from httpx import AsyncClient
+from httpx import Limits
+from httpx import Timeout
+
+from ipfs_client.default_logger import logger
+from ipfs_client.settings.data_models import ExternalServiceConfig
+
+
+LIGHTHOUSE_UPLOAD = 'lighthouse_upload'
+LIGHTHOUSE_API = 'lighthouse_api'
+LASSIE = 'lassie'
+
+
+def http2_available():
+    # HTTP/2 support in httpx depends on the optional `h2` package
+    return importlib.util.find_spec('h2') is not None
+
+
+def resolve_http2(requested: bool, service: str):
+    if requested and not http2_available():
+        logger.bind(module='ServiceClientRegistry').warning(
+            'HTTP/2 requested for {} but the h2 package is not installed, falling back to HTTP/1.1',
+            service,
+        )
+        return False
+    return requested
+
+
+def service_auth(config: ExternalServiceConfig):
+    if not config.auth:
+        return {}
+    if config.auth_scheme == 'bearer':
+        return {'headers': {'Authorization': f'Bearer {config.auth.apiKey}'}}
+    return {'auth': (config.auth.apiKey, config.auth.apiSecret)}
+
+
+class ServiceClientRegistry:
+    """Long-lived pooled HTTP clients for the external services used by the
+    IPFS client (Lighthouse, Lassie).
+
+    Clients are created on first use from their `ExternalServiceConfig` and
+    kept until `aclose()`, so connections and TLS sessions are reused across
+    calls. A `transport` given here replaces the network transport of every
+    client, e.g. an `httpx.ASGITransport` serving a mock of the services.
+    """
+
+    def __init__(self, transport=None, event_hooks=None):
+        self._transport = transport
+        self._event_hooks = event_hooks
+        self._configs: Dict[str, ExternalServiceConfig] = {}
+        self._clients: Dict[str, AsyncClient] = {}
+        self._logger = logger.bind(module='ServiceClientRegistry')
+
+    def register(self, name: str, config: ExternalServiceConfig):
+        if name in self._clients:
+            raise ValueError(f'Service client {name} is already in use')
+        self._configs[name] = config
+
+    def config(self, name: str) -> ExternalServiceConfig:
+        return self._configs[name]
+
+    def get(self, name: str) -> AsyncClient:
+        client = self._clients.get(name)
+        if client is None:
+            config = self._configs[name]
+            limits = config.connection_limits
+            client = AsyncClient(
+                base_url=config.url,
+                timeout=Timeout(config.timeout),
+                limits=Limits(
+                    max_connections=limits.max_connections,
+                    max_keepalive_connections=limits.max_keepalive_connections,
+                    keepalive_expiry=limits.keepalive_expiry,
+                ),
+                http2=resolve_http2(config.http2, name),
+                follow_redirects=False,
+                transport=self._transport,
+                event_hooks=self._event_hooks,
+                **service_auth(config),
+            )
+            self._clients[name] = client
+            self._logger.debug('Opened pooled client for {} on {}', name, config.url)
+        return client
+
+    def clients(self) -> Dict[str, AsyncClient]:
+        return dict(self._clients)
+
+    async def aclose(self):
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
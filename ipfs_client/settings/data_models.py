@@ -1,6 +1,10 @@
+from typing import Dict
+from typing import List
+from typing import Literal
 from typing import Optional
 
 from pydantic import BaseModel
+from pydantic import Field
 
 
 class ConnectionLimits(BaseModel):
@@ -10,8 +14,13 @@ class ConnectionLimits(BaseModel):
 
 
 class IPFSWriterRateLimit(BaseModel):
-    req_per_sec: int
+    req_per_sec: int = Field(..., gt=0)
     burst: int
+    # back off on 429/5xx responses from the writer node and recover gradually
+    adaptive: bool = False
+    min_req_per_sec: float = 1
+    # reject writes that would have to wait longer than this many seconds
+    max_wait: Optional[float] = None
 
 
 class ExternalAPIAuth(BaseModel):
@@ -20,12 +29,179 @@ class ExternalAPIAuth(BaseModel):
     apiSecret: str = ''
 
 
+class ExternalServiceConfig(BaseModel):
+    url: str
+    http2: bool = False
+    timeout: int = 60
+    connection_limits: ConnectionLimits = ConnectionLimits()
+    auth: Optional[ExternalAPIAuth] = None
+    # 'basic' sends apiKey/apiSecret as basic auth, 'bearer' sends apiKey as a bearer token
+    auth_scheme: Literal['basic', 'bearer'] = 'basic'
+
+
+class LighthouseConfig(BaseModel):
+    upload: ExternalServiceConfig = ExternalServiceConfig(
+        url='https://node.lighthouse.storage', http2=True, timeout=300,
+        auth_scheme='bearer',
+    )
+    api: ExternalServiceConfig = ExternalServiceConfig(
+        url='https://api.lighthouse.storage', http2=True, auth_scheme='bearer',
+    )
+    network: str = 'testnet'
+
+
 class RemotePinningConfig(BaseModel):
     enabled: bool
     service_name: Optional[str] = ""
     service_endpoint: Optional[str] = ""
     service_token: Optional[str] = ""
     background_pinning: Optional[bool] = False
+    # upper bound on concurrent pin/remote/add requests issued for a batch
+    max_concurrency: int = 8
+
+
+class LassieConfig(ExternalServiceConfig):
+    # Port number: 36711 might change as per your lassie daemon
+    url: str = 'http://127.0.0.1:36711'
+    timeout: int = 300
+    max_concurrency: int = 4
+    max_attempts: int = 3
+
+
+class LifecycleConfig(BaseModel):
+    enabled: bool = True
+    # seconds between a successful add and the unpin of its CID
+    unpin_delay: int = 12  # 7 days (604800) on production deployments
+    archive: bool = False
+    # jobs due within the same window are executed as a single batch
+    batch_window: int = 5
+    max_concurrency: int = 8
+    # seconds before a failed job is run again, jobs stay pending until
+    # they succeed
+    retry_delay: int = 60
+    state_file: str = 'lifecycle_jobs.json'
+
+
+class BulkAddConfig(BaseModel):
+    # limits for a single multipart /add request issued by add_many
+    max_items: int = 256
+    max_bytes: int = 32 * 1024 * 1024
+    concurrency: int = 4
+
+
+class CacheConfig(BaseModel):
+    enabled: bool = True
+    memory_bytes: int = 64 * 1024 * 1024
+    disk_bytes: int = 1024 * 1024 * 1024
+    # disk hits up to this size are copied into the memory tier
+    promote_max_bytes: int = 1024 * 1024
+
+
+class ReaderPoolConfig(BaseModel):
+    # seconds between background health probes, 0 disables probing
+    health_check_interval: float = 10
+    health_check_timeout: float = 2
+    eject_after_failures: int = 3
+    readmit_after_successes: int = 2
+    ewma_alpha: float = 0.3
+    # number of recent latencies per node used for the p95 estimate
+    latency_window: int = 256
+    # send a second request to another node once the p95 latency is exceeded
+    hedge: bool = False
+    hedge_min_delay: float = 0.05
+
+
+class RetryConfig(BaseModel):
+    max_attempts: int = 3
+    base_delay: float = 0.1
+    max_delay: float = 5
+    jitter: bool = True
+    # reads are always retried, writes only when this is set
+    retry_writes: bool = False
+    # kubo answers command errors such as a missing block or pin with 500,
+    # those are answers of a healthy node and are neither retried nor
+    # counted by the circuit breakers
+    retry_on_status: List[int] = [429, 502, 503, 504]
+    # every request earns budget_ratio retries, at most budget_min_tokens are banked
+    budget_ratio: float = 0.2
+    budget_min_tokens: int = 10
+
+
+class CircuitBreakerConfig(BaseModel):
+    enabled: bool = True
+    failure_threshold: int = 5
+    # seconds an open circuit fails fast before a trial request is let through
+    reset_timeout: float = 30
+
+
+class ResilienceConfig(BaseModel):
+    retry: RetryConfig = RetryConfig()
+    circuit_breaker: CircuitBreakerConfig = CircuitBreakerConfig()
+
+
+class WorkSchedulerConfig(BaseModel):
+    enabled: bool = True
+    # concurrent requests per operation class, 0 or a missing class for no
+    # limit; keep the sum of a client's classes below its connection pool
+    limits: Dict[str, int] = {
+        'cat': 64,
+        'dag': 32,
+        'add': 16,
+        'pin': 8,
+        'archive': 4,
+    }
+    # samples kept per class for the queue and service time percentiles
+    metrics_window: int = 1024
+
+
+class InstrumentationConfig(BaseModel):
+    # per-operation events and histograms, see AsyncIPFSClient.add_event_hook
+    enabled: bool = True
+    # pool wait, connect and time to first byte of every request, through
+    # the httpcore trace extension
+    phase_timings: bool = True
+
+
+class PinManagementConfig(BaseModel):
+    # CIDs sent per pin/add, pin/rm and pin/remote/ls request
+    batch_size: int = 500
+    # batches in flight at once
+    concurrency: int = 4
+    # seconds between pin/remote/ls polls for remote pins still in progress
+    remote_poll_interval: int = 30
+
+
+class DedupConfig(BaseModel):
+    # skip uploads of content whose CID is already known to be on the node;
+    # only safe when the content is not unpinned or garbage collected
+    # behind the client's back
+    enabled: bool = False
+    # CIDs kept in memory, older ones are evicted and uploaded again
+    max_entries: int = 100000
+    # payloads up to this size get their CID computed locally, capped by the
+    # chunk size of the add
+    local_hash_max_bytes: int = 262144
+    # larger payloads are hashed by the node with only-hash=true first, which
+    # sends them twice when they turn out to be new
+    only_hash: bool = False
+    # append-only log of known CIDs, relative to local_cache_path
+    state_file: str = 'known_cids.log'
+
+
+class TransportTimeouts(BaseModel):
+    # per-phase timeouts in seconds, unset phases fall back to IPFSConfig.timeout
+    connect: Optional[float] = None
+    read: Optional[float] = None
+    write: Optional[float] = None
+    pool: Optional[float] = None
+
+
+class TransportConfig(BaseModel):
+    # unset limits fall back to IPFSConfig.connection_limits
+    connection_limits: Optional[ConnectionLimits] = None
+    # requires the optional h2 package, falls back to HTTP/1.1 without it
+    http2: bool = False
+    timeouts: TransportTimeouts = TransportTimeouts()
 
 
 class IPFSConfig(BaseModel):
@@ -33,8 +209,29 @@ class IPFSConfig(BaseModel):
     url_auth: Optional[ExternalAPIAuth] = None
     reader_url: str
     reader_url_auth: Optional[ExternalAPIAuth] = None
+    # additional reader endpoints, reads are balanced across reader_url and these
+    reader_urls: List[str] = []
+    reader_pool: ReaderPoolConfig = ReaderPoolConfig()
     write_rate_limit: IPFSWriterRateLimit
     timeout: int
     local_cache_path: str
     connection_limits: ConnectionLimits
     remote_pinning: RemotePinningConfig
+    lifecycle: LifecycleConfig = LifecycleConfig()
+    cache: CacheConfig = CacheConfig()
+    bulk_add: BulkAddConfig = BulkAddConfig()
+    dedup: DedupConfig = DedupConfig()
+    pins: PinManagementConfig = PinManagementConfig()
+    work_scheduler: WorkSchedulerConfig = WorkSchedulerConfig()
+    instrumentation: InstrumentationConfig = InstrumentationConfig()
+    lassie: LassieConfig = LassieConfig()
+    lighthouse: LighthouseConfig = LighthouseConfig()
+    resilience: ResilienceConfig = ResilienceConfig()
+    # JSON backend for decoding get_json, DAG blocks and node responses:
+    # 'auto' uses orjson or msgspec when installed and the stdlib otherwise;
+    # add_json always encodes like json.dumps so CIDs do not depend on it
+    json_codec: Literal['auto', 'orjson', 'msgspec', 'json'] = 'auto'
+    # transport of the client on `url` (authenticated with url_auth) and of
+    # the clients on `reader_url`/`reader_urls` (authenticated with reader_url_auth)
+    writer_transport: TransportConfig = TransportConfig()
+    reader_transport: TransportConfig = TransportConfig()
@@ -0,0 +1,65 @@
+import asyncio
+from typing import Any
+from typing import Dict
+from typing import Hashable
+
+
+class _Call:
+    __slots__ = ('task', 'waiters')
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into a single execution.
+
+    The first caller for a key starts `fn()` as a task and later callers wait
+    on the same task, receiving its result or exception. A waiter that is
+    cancelled only stops waiting; the shared task is cancelled once no
+    waiters are left.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self.calls = 0
+        self.deduplicated = 0
+
+    async def do(self, key: Hashable, fn) -> Any:
+        self.calls += 1
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(
+                lambda task: self._finish(key, call),
+            )
+        else:
+            self.deduplicated += 1
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if not call.waiters and not call.task.done():
+                # later callers must not join a task that is being cancelled
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def _finish(self, key, call):
+        self._forget(key, call)
+        # the exception was delivered to the waiters, if any were left
+        if not call.task.cancelled():
+            call.task.exception()
+
+    def stats(self):
+        return {
+            'calls': self.calls,
+            'deduplicated': self.deduplicated,
+            'inflight': len(self._calls),
+        }
@@ -47,7 +47,8 @@ async def test_archive_and_unpin():
     )
     await ipfs_client.init_sessions()
     cid = await ipfs_client._ipfs_write_client.add_json({'test': 'archive and unpin'})
-    delay = 12
+    # the unpin runs in the background, in the batch that follows the configured delay
+    delay = ipfs_client_settings.lifecycle.unpin_delay + ipfs_client_settings.lifecycle.batch_window
     await asyncio.sleep(delay + 5) # This much delay might not me sufficient, as it can sometimes take hours to generate the proof
     pinned_cids = await ipfs_client._ipfs_write_client._client.post('/pin/ls')
     pinned_cids = pinned_cids.json()['Keys']
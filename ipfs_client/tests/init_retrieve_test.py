@@ -10,7 +10,8 @@ from ipfs_client.settings.data_models import RemotePinningConfig
 
 # run this test as:
 # IPFS_URL=https://ipfs.infura.io:5001 IPFS_AUTH_API_KEY=your_api_key
-# IPFS_AUTH_API_SECRET=your_api_secret poetry run python -m
+# IPFS_AUTH_API_SECRET=your_api_secret LIGHTHOUSE_API_KEY=your_lighthouse_key
+# poetry run python -m
 # ipfs_client.tests.init_retrieve_test
 
 async def test_retrieve():
@@ -47,6 +48,12 @@ async def test_retrieve():
             apiSecret=ipfs_auth_api_secret,
         )
 
+    lighthouse_api_key = os.getenv('LIGHTHOUSE_API_KEY', None)
+    if lighthouse_api_key:
+        ipfs_client_settings.lighthouse.upload.auth = ExternalAPIAuth(
+            apiKey=lighthouse_api_key,
+        )
+
     ipfs_client = AsyncIPFSClientSingleton(
         settings=ipfs_client_settings,
     )
@@ -1,5 +1,9 @@
 from . import addr
+from . import cid
+from . import multipart
 
 __all__ = [
     'addr',
+    'cid',
+    'multipart',
 ]
@@ -1,23 +1,32 @@
+import functools
+import ipaddress
+import re
 import socket
 import urllib.parse
 
-import multiaddr.exceptions
-import validators
-from multiaddr.protocols import P_HTTP
-from multiaddr.protocols import P_HTTPS
-from multiaddr.protocols import P_IP4
-from multiaddr.protocols import P_IP6
-from multiaddr.protocols import P_TCP
 
-from ipfs_client.exceptions import AddressError
+AF_UNIX = getattr(socket, 'AF_UNIX', NotImplemented)
 
+# multiaddr protocol codes, multiaddr and validators are only imported for
+# addresses the plain URL fast path does not cover
+P_IP4 = 0x04
+P_TCP = 0x06
+P_IP6 = 0x29
+P_UNIX = 0x0190
+P_HTTP = 0x01e0
+P_HTTPS = 0x01bb
 
-AF_UNIX = getattr(socket, 'AF_UNIX', NotImplemented)
+_LABEL = re.compile(r'(?!-)[a-z0-9-]{1,63}(?<!-)', re.IGNORECASE)
+_TLD = re.compile(r'[a-z]{2,63}', re.IGNORECASE)
 
 
 def multiaddr_to_url_data(
         addr, base: str,  # type: ignore[no-any-unimported]
 ):
+    import multiaddr.exceptions
+
+    from ipfs_client.exceptions import AddressError
+
     try:
         multi_addr = multiaddr.Multiaddr(addr)
     except multiaddr.exceptions.ParseError as error:
@@ -30,6 +39,13 @@ def multiaddr_to_url_data(
         proto, host = next(addr_iter)
         host_numeric = proto.code in (P_IP4, P_IP6)
 
+        if proto.code == P_UNIX:
+            # the socket itself is passed to the transport, see
+            # `unix_socket_path`, the URL only names the HTTP host
+            if AF_UNIX is NotImplemented:
+                raise AddressError(addr)
+            return _base_url('localhost', base, secure=False), False
+
         # Read port value for IP-based transports
         proto, port = next(addr_iter)
         if proto.code != P_TCP:
@@ -60,12 +76,16 @@ def multiaddr_to_url_data(
     except StopIteration:
         raise AddressError(addr) from None
 
+    return _base_url(netloc, base, secure), host_numeric
+
+
+def _base_url(netloc, base, secure):
     if not base.endswith('/'):
         base += '/'
 
     # Convert the parsed `addr` values to a URL base and parameters for the
     # HTTP library
-    base_url = urllib.parse.SplitResult(
+    return urllib.parse.SplitResult(
         scheme='http' if not secure else 'https',
         netloc=netloc,
         path=base,
@@ -73,8 +93,57 @@ def multiaddr_to_url_data(
         fragment='',
     ).geturl()
 
-    return base_url, host_numeric
+
+def unix_socket_path(addr):
+    """Return the socket path of a `/unix/...` multiaddr, None for any other
+    address."""
+    import multiaddr.exceptions
+
+    try:
+        proto, path = next(iter(multiaddr.Multiaddr(addr).items()))
+    except (multiaddr.exceptions.Error, StopIteration):
+        return None
+    return path if proto.code == P_UNIX else None
+
+
+def _plain_host(host):
+    # hosts validators.url accepts that are cheap to recognise, anything
+    # else is left to it
+    if host == 'localhost':
+        return True
+    labels = host.split('.')
+    return (
+        len(labels) > 1
+        and all(_LABEL.fullmatch(label) for label in labels)
+        and bool(_TLD.fullmatch(labels[-1]))
+    )
+
+
+@functools.lru_cache(maxsize=256)
+def url_to_url_data(addr, base):
+    """Return the base URL and whether the host is numeric for a plain
+    `http(s)://host[:port]` URL, None for multiaddrs and any URL that needs
+    the full validation of `is_valid_url`."""
+    if not isinstance(addr, str) or not addr.startswith(('http://', 'https://')):
+        return None
+    parts = urllib.parse.urlsplit(addr)
+    if '@' in parts.netloc or not parts.hostname or any(c.isspace() for c in addr):
+        return None
+    try:
+        parts.port
+    except ValueError:
+        return None
+    try:
+        ipaddress.ip_address(parts.hostname)
+        host_numeric = True
+    except ValueError:
+        if not _plain_host(parts.hostname):
+            return None
+        host_numeric = False
+    return urllib.parse.urljoin(addr, base), host_numeric
 
 
 def is_valid_url(url):
+    import validators
+
     return validators.url(url)
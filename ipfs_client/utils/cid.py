@@ -0,0 +1,111 @@
+import base64
+
+# multicodec codes
+RAW = 0x55
+DAG_PB = 0x70
+DAG_CBOR = 0x71
+DAG_JSON = 0x0129
+SHA2_256 = 0x12
+
+CODECS = {
+    'raw': RAW,
+    'dag-pb': DAG_PB,
+    'dag-cbor': DAG_CBOR,
+    'dag-json': DAG_JSON,
+}
+
+_B58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+_B58_INDEX = {char: idx for idx, char in enumerate(_B58_ALPHABET)}
+
+
+def encode_varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def decode_varint(data, offset=0):
+    """Return the unsigned varint at `offset` and the offset after it."""
+    value = 0
+    shift = 0
+    while True:
+        if offset >= len(data):
+            raise ValueError('Truncated varint')
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+        if shift > 63:
+            raise ValueError('Varint too long')
+
+
+def b58decode(text: str) -> bytes:
+    value = 0
+    for char in text:
+        value = value * 58 + _B58_INDEX[char]
+    body = value.to_bytes((value.bit_length() + 7) // 8, 'big')
+    leading = len(text) - len(text.lstrip('1'))
+    return b'\x00' * leading + body
+
+
+def b58encode(data: bytes) -> str:
+    value = int.from_bytes(data, 'big')
+    out = []
+    while value:
+        value, rem = divmod(value, 58)
+        out.append(_B58_ALPHABET[rem])
+    leading = len(data) - len(data.lstrip(b'\x00'))
+    return '1' * leading + ''.join(reversed(out))
+
+
+def _b32decode(text: str) -> bytes:
+    text = text.upper()
+    return base64.b32decode(text + '=' * (-len(text) % 8))
+
+
+def cid_to_bytes(cid: str) -> bytes:
+    """Binary form of a CID string (CIDv0 or a base32/base58btc/base16 CIDv1)."""
+    if len(cid) == 46 and cid.startswith('Qm'):
+        return b58decode(cid)
+    prefix, body = cid[0], cid[1:]
+    if prefix == 'b':
+        return _b32decode(body)
+    if prefix == 'z':
+        return b58decode(body)
+    if prefix == 'f':
+        return bytes.fromhex(body)
+    raise ValueError(f'Unsupported CID multibase: {cid}')
+
+
+def cid_from_bytes(data: bytes) -> str:
+    """CID string of a binary CID: base58btc for CIDv0, base32 for CIDv1."""
+    if len(data) == 34 and data[0] == SHA2_256 and data[1] == 0x20:
+        return b58encode(data)
+    return 'b' + base64.b32encode(data).decode('ascii').lower().rstrip('=')
+
+
+def cid_length(data, offset=0):
+    """Length of the binary CID starting at `offset`."""
+    if data[offset] == SHA2_256 and data[offset + 1] == 0x20:
+        return 34
+    _, end = decode_varint(data, offset)  # version
+    _, end = decode_varint(data, end)  # codec
+    _, end = decode_varint(data, end)  # multihash code
+    digest_size, end = decode_varint(data, end)
+    return end + digest_size - offset
+
+
+def make_cid(codec: int, digest: bytes, hash_code: int = SHA2_256) -> str:
+    """CIDv1 string for a content digest."""
+    return cid_from_bytes(
+        encode_varint(1) + encode_varint(codec) + encode_varint(hash_code)
+        + encode_varint(len(digest)) + digest,
+    )
@@ -0,0 +1,60 @@
+import asyncio
+import os
+import re
+
+
+# the HTML5 form encoding httpx applies to names and filenames: quotes,
+# backslashes and control characters but ESC are escaped, so that a name
+# cannot end the header value or inject a header line
+_FORM_REPLACEMENTS = {'"': '%22', '\\': '\\\\'}
+_FORM_REPLACEMENTS.update(
+    {chr(c): '%{:02X}'.format(c) for c in range(0x20) if c != 0x1B},
+)
+_FORM_RE = re.compile('|'.join(re.escape(c) for c in _FORM_REPLACEMENTS))
+
+
+def new_boundary():
+    return os.urandom(16).hex()
+
+
+def quote_form_param(value: str) -> str:
+    return _FORM_RE.sub(lambda match: _FORM_REPLACEMENTS[match.group(0)], value)
+
+
+def content_type(boundary: str):
+    return f'multipart/form-data; boundary={boundary}'
+
+
+async def encode_stream(chunks, boundary: str, filename: str = ''):
+    """Wrap an async iterable of byte chunks into a single-part
+    multipart/form-data body without buffering it."""
+    yield (
+        f'--{boundary}\r\n'
+        f'Content-Disposition: form-data; name="file"; filename="{quote_form_param(filename)}"\r\n'
+        'Content-Type: application/octet-stream\r\n\r\n'
+    ).encode('utf-8')
+    async for chunk in chunks:
+        if chunk:
+            yield chunk
+    yield f'\r\n--{boundary}--\r\n'.encode('utf-8')
+
+
+async def iter_file(path, chunk_size: int = 256 * 1024):
+    """Yield the contents of `path` in chunks, so that memory use does not
+    depend on the file size. Reads run in the default executor, a cold
+    file does not block the event loop."""
+    loop = asyncio.get_running_loop()
+    f = await loop.run_in_executor(None, open, path, 'rb')
+    try:
+        while True:
+            chunk = await loop.run_in_executor(None, f.read, chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    finally:
+        f.close()
+
+
+async def iter_sync(chunks):
+    for chunk in chunks:
+        yield chunk
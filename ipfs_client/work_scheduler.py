@@ -0,0 +1,219 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict
+from typing import Optional
+
+from ipfs_client.dag import IPFSDeadlineExceededError
+from ipfs_client.settings.data_models import WorkSchedulerConfig
+
+
+PRIORITIES = {'interactive': 0, 'normal': 1, 'background': 2}
+
+# operation names used by the client mapped to the class whose limit they share
+OPERATION_CLASSES = {
+    'cat': 'cat',
+    'cat_stream': 'cat',
+    'export_car': 'cat',
+    'add': 'add',
+    'add_many': 'add',
+    'add_stream': 'add',
+    'add_only_hash': 'add',
+    'import_car': 'add',
+    'dag_get': 'dag',
+    'dag_put': 'dag',
+    'block_get': 'dag',
+    'block_put': 'dag',
+    'pin_add': 'pin',
+    'unpin': 'pin',
+    'pin_ls': 'pin',
+    'pin_remote_add': 'pin',
+    'pin_remote_ls': 'pin',
+    'archive': 'archive',
+    'get_proof': 'archive',
+}
+
+_priority: ContextVar[int] = ContextVar('ipfs_work_priority', default=PRIORITIES['normal'])
+_deadline: ContextVar[Optional[float]] = ContextVar('ipfs_work_deadline', default=None)
+
+
+@contextmanager
+def work_context(priority: Optional[str] = None, timeout: Optional[float] = None):
+    """Run the client calls made inside the block with `priority` and
+    within `timeout` seconds from now.
+
+    The context is inherited by tasks created inside the block. A nested
+    timeout can only shorten the deadline of an enclosing one.
+    """
+    tokens = []
+    if priority is not None:
+        tokens.append((_priority, _priority.set(PRIORITIES[priority])))
+    if timeout is not None:
+        deadline = time.monotonic() + timeout
+        current = _deadline.get()
+        if current is not None:
+            deadline = min(deadline, current)
+        tokens.append((_deadline, _deadline.set(deadline)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+class _PrioritySlots:
+    """A semaphore that wakes waiters in priority order, FIFO within a
+    priority."""
+
+    def __init__(self, limit: int):
+        self._limit = limit
+        self._active = 0
+        self._waiters = []
+        self.waiting = 0
+        self._seq = itertools.count()
+
+    async def acquire(self, priority: int, timeout: Optional[float]):
+        if self._active < self._limit and not self.waiting:
+            self._active += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), waiter))
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # the slot was handed over as the wait was abandoned
+                self.release()
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            self.waiting -= 1
+
+    def release(self):
+        # the slot passes straight to the next live waiter
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+
+def _percentile(ordered, q):
+    if not ordered:
+        return None
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+class _ClassStats:
+    def __init__(self, window: int):
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.expired = 0
+        self.queue_times: deque = deque(maxlen=window)
+        self.service_times: deque = deque(maxlen=window)
+
+    def snapshot(self, slots: Optional[_PrioritySlots]):
+        queue_times = sorted(self.queue_times)
+        service_times = sorted(self.service_times)
+        return {
+            'queued': slots.waiting if slots else 0,
+            'running': self.running,
+            'completed': self.completed,
+            'failed': self.failed,
+            'expired': self.expired,
+            'queue_time_p50': _percentile(queue_times, 0.50),
+            'queue_time_p95': _percentile(queue_times, 0.95),
+            'service_time_p50': _percentile(service_times, 0.50),
+            'service_time_p95': _percentile(service_times, 0.95),
+        }
+
+
+class WorkScheduler:
+    """Bounds the concurrent requests of each operation class and orders
+    the waiting ones by priority.
+
+    Requests queue in the client instead of failing with a pool timeout
+    once a class is at its limit, and higher priority ones (see
+    `work_context`) are let through first. A request whose deadline passes
+    while queued or in service fails with `IPFSDeadlineExceededError`.
+    Queue time and service time are recorded per class.
+    """
+
+    def __init__(self, settings: WorkSchedulerConfig):
+        self._settings = settings
+        self._slots: Dict[str, _PrioritySlots] = {
+            op_class: _PrioritySlots(limit)
+            for op_class, limit in settings.limits.items()
+            if limit > 0
+        }
+        self._stats: Dict[str, _ClassStats] = {}
+
+    def _class_stats(self, op_class):
+        stats = self._stats.get(op_class)
+        if stats is None:
+            stats = self._stats[op_class] = _ClassStats(self._settings.metrics_window)
+        return stats
+
+    @asynccontextmanager
+    async def slot(self, operation: str):
+        """Hold a slot of the class of `operation`, yields the seconds left
+        until the deadline of the current `work_context`, if any."""
+        op_class = OPERATION_CLASSES.get(operation, operation)
+        stats = self._class_stats(op_class)
+        slots = self._slots.get(op_class) if self._settings.enabled else None
+        deadline = _deadline.get()
+        queued_at = time.monotonic()
+        if slots:
+            timeout = None if deadline is None else max(deadline - queued_at, 0)
+            try:
+                await slots.acquire(_priority.get(), timeout)
+            except asyncio.TimeoutError:
+                stats.expired += 1
+                raise IPFSDeadlineExceededError(
+                    f'IPFS client error: {operation} deadline exceeded while queued',
+                )
+        started = time.monotonic()
+        stats.queue_times.append(started - queued_at)
+        stats.running += 1
+        ok = False
+        try:
+            yield None if deadline is None else deadline - started
+            ok = True
+        finally:
+            stats.running -= 1
+            stats.service_times.append(time.monotonic() - started)
+            if ok:
+                stats.completed += 1
+            else:
+                stats.failed += 1
+            if slots:
+                slots.release()
+
+    async def run(self, operation: str, fn):
+        """Run `fn()` in a slot of `operation`, cancelling it when the
+        deadline passes."""
+        async with self.slot(operation) as remaining:
+            if remaining is None:
+                return await fn()
+            try:
+                return await asyncio.wait_for(fn(), max(remaining, 0))
+            except asyncio.TimeoutError:
+                self._class_stats(OPERATION_CLASSES.get(operation, operation)).expired += 1
+                raise IPFSDeadlineExceededError(
+                    f'IPFS client error: {operation} deadline exceeded',
+                )
+
+    def stats(self):
+        return {
+            op_class: stats.snapshot(self._slots.get(op_class))
+            for op_class, stats in self._stats.items()
+        }
@@ -0,0 +1,55 @@
+import contextlib
+
+import httpx
+import pytest
+
+from ipfs_client.benchmarks.mock_server import MockServices
+from ipfs_client.main import AsyncIPFSClient
+from ipfs_client.settings.data_models import ConnectionLimits
+from ipfs_client.settings.data_models import IPFSConfig
+from ipfs_client.settings.data_models import IPFSWriterRateLimit
+from ipfs_client.settings.data_models import RemotePinningConfig
+
+
+# The tests run the client against MockServices through an ASGI transport,
+# no daemon or network is needed. Run them with `poetry run pytest`.
+
+MOCK_URL = 'http://ipfs.mock:5001'
+
+
+@pytest.fixture
+def mock():
+    return MockServices()
+
+
+@pytest.fixture
+def settings(tmp_path):
+    settings = IPFSConfig(
+        url=MOCK_URL,
+        reader_url=MOCK_URL,
+        write_rate_limit=IPFSWriterRateLimit(req_per_sec=10000, burst=10000),
+        timeout=10,
+        local_cache_path=str(tmp_path),
+        connection_limits=ConnectionLimits(),
+        remote_pinning=RemotePinningConfig(enabled=False),
+    )
+    settings.lifecycle.enabled = False
+    return settings
+
+
+@pytest.fixture
+def open_client(mock, settings):
+    """`async with open_client() as client:` yields an initialized client on
+    the mock, a write mode one unless `write_mode=False` is given."""
+    @contextlib.asynccontextmanager
+    async def open_client(write_mode=True):
+        client = AsyncIPFSClient(
+            addr=MOCK_URL, settings=settings, write_mode=write_mode,
+            transport=httpx.ASGITransport(app=mock.app),
+        )
+        await client.init_session()
+        try:
+            yield client
+        finally:
+            await client.aclose()
+    return open_client
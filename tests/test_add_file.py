@@ -0,0 +1,36 @@
+import asyncio
+import hashlib
+
+from ipfs_client.utils import cid as cid_util
+from ipfs_client.utils import multipart
+
+
+def test_add_file_in_chunks(open_client, mock, tmp_path):
+    content = bytes(range(256)) * 4099
+    path = tmp_path / 'payload.bin'
+    path.write_bytes(content)
+
+    async def run():
+        async with open_client() as client:
+            cid = await client.add_file(str(path), read_chunk_size=4096)
+            assert mock.blocks[cid] == content
+            assert cid == cid_util.make_cid(cid_util.RAW, hashlib.sha256(content).digest())
+            empty = tmp_path / 'empty.bin'
+            empty.write_bytes(b'')
+            assert mock.blocks[await client.add_file(str(empty))] == b''
+    asyncio.run(run())
+
+
+def test_streamed_filename_is_quoted():
+    async def run():
+        chunks = multipart.encode_stream(
+            multipart.iter_sync([b'data']), 'boundary', 'a"b\r\nX-Injected: 1.bin',
+        )
+        return b''.join([chunk async for chunk in chunks])
+
+    lines = asyncio.run(run()).split(b'\r\n')
+    assert lines[1] == (
+        b'Content-Disposition: form-data; name="file"; '
+        b'filename="a%22b%0D%0AX-Injected: 1.bin"'
+    )
+    assert lines[4] == b'data'
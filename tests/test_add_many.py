@@ -0,0 +1,14 @@
+import asyncio
+
+
+def test_add_many_keeps_order_across_batches(open_client, settings, mock):
+    settings.bulk_add.max_items = 3
+    items = [f'item {idx}'.encode() for idx in range(10)]
+
+    async def run():
+        async with open_client() as client:
+            cids = await client.add_many(items)
+            assert [mock.blocks[cid] for cid in cids] == items
+            # 10 items in batches of at most 3
+            assert mock.requests['/api/v0/add'] == 4
+    asyncio.run(run())
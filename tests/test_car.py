@@ -0,0 +1,107 @@
+import asyncio
+import hashlib
+import io
+
+import pytest
+
+from ipfs_client.car import CARDecoder
+from ipfs_client.car import CARFormatError
+from ipfs_client.car import CARWriter
+from ipfs_client.car import aiter_blocks
+from ipfs_client.utils import cid as cid_util
+
+
+def _blocks(count):
+    blocks = []
+    for i in range(count):
+        data = f'block {i}'.encode() * (i + 1)
+        blocks.append((cid_util.make_cid(cid_util.RAW, hashlib.sha256(data).digest()), data))
+    return blocks
+
+
+def _car_v1(blocks):
+    f = io.BytesIO()
+    writer = CARWriter(f, [blocks[0][0]])
+    for cid, data in blocks:
+        writer.write_block(cid, data)
+    return f.getvalue()
+
+
+def _car_v2(payload, index=b'index bytes'):
+    pragma = bytes.fromhex('0aa16776657273696f6e02')
+    data_offset = len(pragma) + 40 + 5
+    header = (
+        bytes(16)
+        + data_offset.to_bytes(8, 'little')
+        + len(payload).to_bytes(8, 'little')
+        + (data_offset + len(payload)).to_bytes(8, 'little')
+    )
+    return pragma + header + bytes(5) + payload + index
+
+
+def _decode(data, chunk_size, verify=True):
+    decoder = CARDecoder(verify)
+    blocks = []
+    for i in range(0, len(data), chunk_size):
+        blocks += decoder.feed(data[i:i + chunk_size])
+    decoder.close()
+    return decoder, blocks
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 1 << 20])
+def test_v1_round_trip_in_chunks(chunk_size):
+    blocks = _blocks(5)
+    decoder, decoded = _decode(_car_v1(blocks), chunk_size)
+
+    assert decoder.version == 1
+    assert decoder.roots == [blocks[0][0]]
+    assert [tuple(block) for block in decoded] == blocks
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 1 << 20])
+def test_v2_payload_is_decoded_and_index_skipped(chunk_size):
+    blocks = _blocks(3)
+    decoder, decoded = _decode(_car_v2(_car_v1(blocks)), chunk_size)
+
+    assert decoder.version == 2
+    assert decoder.roots == [blocks[0][0]]
+    assert [tuple(block) for block in decoded] == blocks
+
+
+def test_malformed_car_is_rejected():
+    data = _car_v1(_blocks(2))
+
+    with pytest.raises(CARFormatError):
+        _decode(data[:-3], 1 << 20)
+    with pytest.raises(CARFormatError):
+        _decode(data[:-1] + b'!', 1 << 20)
+    with pytest.raises(CARFormatError):
+        _decode(b'\x03\xa0\xa0\xa0', 1 << 20)
+
+
+def test_export_and_import_round_trip(mock, open_client, settings):
+    settings.cache.enabled = False
+
+    async def run():
+        async with open_client() as client:
+            leaf = (await client.dag.put({'leaf': True}))['Cid']['/']
+            root = (await client.dag.put({'child': {'/': leaf}}))['Cid']['/']
+            car = [chunk async for chunk in client.export_car(root)]
+            exported = [block async for block in aiter_blocks(_iter(car), verify=True)]
+            mock.blocks.clear()
+            mock.pins.clear()
+            roots = await client.import_car(_iter(car))
+            node = await client.dag.get(root)
+            return root, leaf, exported, roots, node
+    root, leaf, exported, roots, node = asyncio.run(run())
+
+    # the mock exports the root block only
+    assert [block.cid for block in exported] == [root]
+    assert roots == [root]
+    assert root in mock.pins
+    assert node.links() == [leaf]
+
+
+async def _iter(chunks):
+    for chunk in chunks:
+        yield chunk
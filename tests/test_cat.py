@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from ipfs_client.dag import IPFSAsyncClientError
+
+
+CONTENT = bytes(range(256)) * 40
+
+
+async def _collect(chunks):
+    return b''.join([chunk async for chunk in chunks])
+
+
+@pytest.mark.parametrize('cached', [False, True])
+def test_range_reads(open_client, settings, cached):
+    settings.cache.enabled = cached
+
+    async def run():
+        async with open_client() as client:
+            cid = await client.add_bytes(CONTENT)
+            # a full read fills the cache, ranges are then served from it
+            assert await client.cat(cid, bytes_mode=True) == CONTENT
+            for offset, length in ((0, 10), (100, 1000), (10000, None), (10230, 50)):
+                expected = CONTENT[offset:offset + length if length else None]
+                assert await client.cat(
+                    cid, bytes_mode=True, offset=offset, length=length,
+                ) == expected
+                assert await _collect(
+                    client.cat_stream(cid, chunk_size=333, offset=offset, length=length),
+                ) == expected
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize('cached', [False, True])
+def test_offset_past_the_end_raises(open_client, settings, cached):
+    settings.cache.enabled = cached
+
+    async def run():
+        async with open_client() as client:
+            cid = await client.add_bytes(CONTENT)
+            await client.cat(cid, bytes_mode=True)
+            with pytest.raises(IPFSAsyncClientError):
+                await client.cat(cid, bytes_mode=True, offset=len(CONTENT) + 1)
+            with pytest.raises(IPFSAsyncClientError):
+                await _collect(client.cat_stream(cid, offset=len(CONTENT) + 1))
+    asyncio.run(run())
+
+
+def test_cat_stream_chunks(open_client, settings):
+    settings.cache.enabled = False
+
+    async def run():
+        async with open_client() as client:
+            cid = await client.add_bytes(CONTENT)
+            chunks = [chunk async for chunk in client.cat_stream(cid, chunk_size=4096)]
+            assert b''.join(chunks) == CONTENT
+            assert all(len(chunk) <= 4096 for chunk in chunks)
+    asyncio.run(run())
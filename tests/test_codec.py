@@ -0,0 +1,32 @@
+import asyncio
+import json
+
+import pytest
+
+from ipfs_client.codec import canonical_dumps
+
+
+DOCUMENT = {'name': 'café', 'values': [1, 2.5, 1e16, None, True], 'nested': {'a': 'b'}}
+
+
+def test_canonical_dumps_matches_json_dumps():
+    assert canonical_dumps(DOCUMENT) == json.dumps(DOCUMENT).encode()
+
+
+def test_canonical_dumps_rejects_nan():
+    with pytest.raises(ValueError):
+        canonical_dumps({'value': float('nan')})
+
+
+def test_add_json_cid_is_the_cid_of_json_dumps(open_client):
+    async def run():
+        async with open_client() as client:
+            return (
+                await client.add_json(DOCUMENT),
+                await client.add_json_many([DOCUMENT]),
+                await client.add_bytes(json.dumps(DOCUMENT).encode()),
+            )
+    json_cid, json_many_cids, bytes_cid = asyncio.run(run())
+
+    assert json_cid == bytes_cid
+    assert json_many_cids == [bytes_cid]
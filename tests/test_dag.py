@@ -0,0 +1,53 @@
+import asyncio
+import json
+
+from ipfs_client.dag import DAGBlock
+
+
+class _CountingCodec:
+    def __init__(self):
+        self.loads_calls = 0
+
+    def loads(self, data):
+        self.loads_calls += 1
+        return json.loads(data)
+
+
+def test_block_is_parsed_once_and_links_keep_document_order():
+    codec = _CountingCodec()
+    block = DAGBlock(
+        b'{"b": {"/": "cid-1"}, "a": [{"/": "cid-2"}, {"x": {"/": "cid-3"}}], "c": {"/": 1}}',
+        codec,
+    )
+
+    assert codec.loads_calls == 0
+    assert block.links() == ['cid-1', 'cid-2', 'cid-3']
+    assert block.as_json() is block.as_json()
+    assert codec.loads_calls == 1
+
+
+def test_walk_fetches_each_block_once(mock, open_client, settings):
+    settings.cache.enabled = False
+
+    async def run():
+        async with open_client() as client:
+            async def put(obj):
+                return (await client.dag.put(obj))['Cid']['/']
+
+            leaf1 = await put({'leaf': 1})
+            leaf2 = await put({'leaf': 2})
+            mid = await put({'links': [{'/': leaf1}, {'/': leaf2}]})
+            root = await put({'mid': {'/': mid}, 'leaf': {'/': leaf1}})
+            fetches_before = mock.requests['/api/v0/dag/get']
+            nodes = [node async for node in client.dag.walk(root)]
+            fetches = mock.requests['/api/v0/dag/get'] - fetches_before
+            shallow = [node async for node in client.dag.walk(root, max_depth=0)]
+            return (root, mid, leaf1, leaf2), nodes, fetches, shallow
+    (root, mid, leaf1, leaf2), nodes, fetches, shallow = asyncio.run(run())
+
+    depths = {node.cid: node.depth for node in nodes}
+    assert depths == {root: 0, mid: 1, leaf1: 1, leaf2: 2}
+    assert len(nodes) == 4
+    assert fetches == 4
+    assert nodes[0].block.as_json()['mid'] == {'/': mid}
+    assert [node.cid for node in shallow] == [root]
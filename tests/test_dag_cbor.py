@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from ipfs_client import dag_cbor
+
+
+# CID of the empty dag-cbor map as computed by kubo and the IPLD libraries
+EMPTY_MAP_CID = 'bafyreigbtj4x7ip5legnfznufuopl4sg4knzc2cof6duas4b3q2fy6swua'
+HELLO_WORLD_CID = 'bafkreifzjut3te2nhyekklss27nh3k72ysco7y32koao5eei66wof36n5e'
+
+
+def test_encoding_is_canonical():
+    assert dag_cbor.encode({}) == b'\xa0'
+    assert dag_cbor.encode(1000) == b'\x19\x03\xe8'
+    assert dag_cbor.encode(-1000) == b'\x39\x03\xe7'
+    assert dag_cbor.encode(1.5) == b'\xfb\x3f\xf8' + b'\x00' * 6
+    # keys sorted by length first, then bytewise
+    assert dag_cbor.encode({'bb': 1, 'c': 2, 'a': 3}) == b'\xa3aa\x03ac\x02bbb\x01'
+
+
+def test_round_trip_keeps_links():
+    obj = {
+        'name': 'node',
+        'size': 2 ** 40,
+        'ratio': -0.25,
+        'data': b'\x00\x01',
+        'flags': [True, False, None],
+        'link': {'/': HELLO_WORLD_CID},
+    }
+    encoded = dag_cbor.encode(obj)
+
+    assert b'\xd8\x2a' in encoded
+    assert dag_cbor.decode(encoded) == obj
+
+
+@pytest.mark.parametrize('data', [b'\xa0\x00', b'\x9f\xff', b'\xa1'])
+def test_malformed_input_is_rejected(data):
+    with pytest.raises((ValueError, IndexError)):
+        dag_cbor.decode(data)
+
+
+def test_nan_is_rejected():
+    with pytest.raises(ValueError):
+        dag_cbor.encode({'value': float('nan')})
+
+
+def test_dag_and_block_put_get(mock, open_client):
+    async def run():
+        async with open_client() as client:
+            dag_cid = (await client.dag.put({}))['Cid']['/']
+            block_cid = await client.block.put(b'hello world')
+            return dag_cid, block_cid, await client.block.get(block_cid)
+    dag_cid, block_cid, data = asyncio.run(run())
+
+    assert dag_cid == EMPTY_MAP_CID
+    assert block_cid == HELLO_WORLD_CID
+    assert data == b'hello world'
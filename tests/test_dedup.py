@@ -0,0 +1,44 @@
+import asyncio
+
+from ipfs_client.dedup import local_cid
+
+
+def test_local_cid_matches_the_node():
+    # `ipfs add --cid-version 1` of the 11 bytes
+    assert local_cid(b'hello world', {'cid-version': 1}) == (
+        'bafkreifzjut3te2nhyekklss27nh3k72ysco7y32koao5eei66wof36n5e'
+    )
+    # CIDv0 wraps the content in dag-pb, chunks larger than the content are
+    # needed for a single raw block
+    assert local_cid(b'hello world', {'cid-version': 0}) is None
+    assert local_cid(b'hello world', {'cid-version': 1, 'chunker': 'size-4'}) is None
+
+
+def test_add_many_dedup_skips_known_content(open_client, settings, mock):
+    settings.dedup.enabled = True
+    items = [b'first', b'second', b'first']
+
+    async def run():
+        async with open_client() as client:
+            cids = await client.add_many(items)
+            assert cids[0] == cids[2] != cids[1]
+            assert mock.requests['/api/v0/add'] == 1
+            again = await client.add_many([b'second', b'third'])
+            assert again[0] == cids[1]
+            assert mock.blocks[again[1]] == b'third'
+            assert mock.requests['/api/v0/add'] == 2
+    asyncio.run(run())
+
+
+def test_unpinned_content_is_uploaded_again(open_client, settings, mock):
+    settings.dedup.enabled = True
+
+    async def run():
+        async with open_client() as client:
+            cid = await client.add_bytes(b'content')
+            assert await client.add_bytes(b'content') == cid
+            assert mock.requests['/api/v0/add'] == 1
+            await client.unpin(cid)
+            assert await client.add_bytes(b'content') == cid
+            assert mock.requests['/api/v0/add'] == 2
+    asyncio.run(run())
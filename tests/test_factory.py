@@ -0,0 +1,74 @@
+import asyncio
+import json
+import os
+
+import httpx
+import pytest
+
+from ipfs_client.main import AsyncIPFSClientFactory
+from tests.conftest import MOCK_URL
+
+
+@pytest.fixture
+def factory(mock):
+    return AsyncIPFSClientFactory(transport=httpx.ASGITransport(app=mock.app))
+
+
+def test_clients_share_the_node_transport(factory, settings):
+    async def run():
+        first = await factory.client(MOCK_URL, settings)
+        second = await factory.client(MOCK_URL, settings)
+        writer = await factory.client(MOCK_URL, settings, write_mode=True)
+        cid = await writer.add_bytes(b'shared')
+        assert await first.cat(cid) == await second.cat(cid) == 'shared'
+        # service clients are not part of the shared transport
+        assert first._services is not second._services
+        assert first._cache is second._cache is writer._cache
+        clients = sorted(entry['clients'] for entry in factory.stats())
+        await first.aclose()
+        remaining = factory.stats()
+        await second.aclose()
+        await writer.aclose()
+        return clients, remaining
+    clients, remaining = asyncio.run(run())
+
+    # writer and readers have the same auth and limits here
+    assert clients == [3]
+    assert [entry['clients'] for entry in remaining] == [2]
+    assert factory.stats() == []
+
+
+def test_lifecycle_jobs_of_all_clients_are_kept(factory, settings):
+    settings.lifecycle.enabled = True
+    settings.lifecycle.unpin_delay = 3600
+
+    async def run():
+        tenants = [
+            await factory.client(MOCK_URL, settings, write_mode=True)
+            for _ in range(2)
+        ]
+        assert tenants[0]._lifecycle is tenants[1]._lifecycle
+        cids = [
+            await tenant.add_bytes(f'tenant {idx}'.encode())
+            for idx, tenant in enumerate(tenants)
+        ]
+        for tenant in tenants:
+            await tenant.aclose()
+        return cids
+    cids = asyncio.run(run())
+
+    with open(os.path.join(settings.local_cache_path, settings.lifecycle.state_file)) as f:
+        assert sorted(job['cid'] for job in json.load(f)) == sorted(cids)
+
+
+def test_write_clients_of_other_nodes_need_their_own_path(factory, settings):
+    settings.lifecycle.enabled = True
+
+    async def run():
+        client = await factory.client(MOCK_URL, settings, write_mode=True)
+        try:
+            with pytest.raises(ValueError):
+                await factory.client('http://other.mock:5001', settings, write_mode=True)
+        finally:
+            await client.aclose()
+    asyncio.run(run())
@@ -0,0 +1,74 @@
+import asyncio
+
+import httpx
+import pytest
+
+from ipfs_client.dag import IPFSAsyncClientError
+from ipfs_client.instrumentation import Histogram
+from ipfs_client.instrumentation import pool_snapshot
+
+
+# raw block CID of b'missing', never stored on the mock
+MISSING_CID = 'bafkreih7uy2yhx5gobvypuuexbvq22j2cypeqqfk2lc46225e7b3syq7pu'
+
+
+def test_hooks_receive_one_event_per_operation(mock, open_client, settings):
+    settings.cache.enabled = False
+    events = []
+
+    def failing_hook(event):
+        raise RuntimeError('hooks must not break operations')
+
+    async def run():
+        async with open_client() as client:
+            client.add_event_hook(failing_hook)
+            client.add_event_hook(events.append)
+            cid = await client.add_bytes(b'instrumented')
+            await client.cat(cid)
+            with pytest.raises(IPFSAsyncClientError):
+                await client.block.get(MISSING_CID)
+            return cid, client.operation_stats()
+    cid, stats = asyncio.run(run())
+
+    assert [(event.operation, event.status) for event in events] == [
+        ('add', 'ok'), ('cat', 'ok'), ('block_get', 'error'),
+    ]
+    assert events[1].cid == cid
+    assert events[1].bytes_in == len(b'instrumented')
+    assert events[2].status_code == 500
+    assert stats['cat']['calls'] == 1
+    assert stats['cat']['total']['count'] == 1
+    assert stats['block_get']['errors'] == 1
+
+
+def test_histogram_percentiles_use_bucket_bounds():
+    histogram = Histogram(buckets=(0.1, 0.2, 0.4))
+    for value in (0.05, 0.05, 0.15, 0.3, 0.9):
+        histogram.observe(value)
+
+    assert histogram.percentile(0.4) == 0.1
+    assert histogram.percentile(0.6) == 0.2
+    assert histogram.percentile(0.99) == 0.9
+    snapshot = histogram.snapshot()
+    assert snapshot['count'] == 5
+    assert snapshot['max'] == 0.9
+    assert Histogram().snapshot()['p50'] is None
+
+
+def test_pool_stats(open_client):
+    async def run():
+        client = httpx.AsyncClient(limits=httpx.Limits(max_connections=7))
+        try:
+            snapshot = pool_snapshot(client)
+        finally:
+            await client.aclose()
+        async with open_client() as ipfs:
+            return snapshot, ipfs.pool_stats()
+    snapshot, stats = asyncio.run(run())
+
+    assert snapshot == {
+        'max_connections': 7, 'connections': 0, 'active': 0, 'idle': 0,
+        'queued': 0, 'utilization': 0.0,
+    }
+    # the ASGI test transport has no connection pool
+    assert stats['ipfs'] is None
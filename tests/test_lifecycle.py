@@ -0,0 +1,47 @@
+import asyncio
+import time
+
+import pytest
+
+
+async def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('condition not met in time')
+        await asyncio.sleep(0.05)
+
+
+@pytest.fixture
+def lifecycle_settings(settings):
+    settings.lifecycle.enabled = True
+    settings.lifecycle.unpin_delay = 0
+    settings.lifecycle.batch_window = 1
+    settings.lifecycle.retry_delay = 0
+    return settings
+
+
+def test_failed_unpin_stays_pending(mock, open_client, lifecycle_settings):
+    async def run():
+        async with open_client() as client:
+            cid = await client.add_bytes(b'unpinned later')
+            # the first attempt fails, the job is retried in a later bucket
+            mock.error_rate = 1.0
+            await _wait_for(lambda: client.lifecycle_stats()['failed'] >= 1)
+            assert cid in mock.pins
+            assert client.lifecycle_stats()['queue_depth'] + client.lifecycle_stats()['inflight'] == 1
+            mock.error_rate = 0
+            await _wait_for(lambda: client.lifecycle_stats()['completed'] == 1)
+            assert cid not in mock.pins
+            assert client.lifecycle_stats()['queue_depth'] == 0
+    asyncio.run(run())
+
+
+def test_job_of_an_unpinned_cid_completes(mock, open_client, lifecycle_settings):
+    async def run():
+        async with open_client() as client:
+            cid = await client.add_bytes(b'unpinned by hand')
+            mock.pins.discard(cid)
+            await _wait_for(lambda: client.lifecycle_stats()['completed'] == 1)
+            return client.lifecycle_stats()
+    assert asyncio.run(run())['failed'] == 0
@@ -0,0 +1,31 @@
+import subprocess
+import sys
+
+
+SCRIPT = '''
+import sys
+from loguru import logger
+from ipfs_client.default_logger import configure_logging
+
+configure_logging(level='INFO', sink=sys.stdout, enqueue={enqueue})
+logger.info('application record')
+# logged from a module of the package, like the client's own records
+exec("logger.info('client record')", {{'__name__': 'ipfs_client.probe', 'logger': logger}})
+'''
+
+
+def _run(enqueue):
+    result = subprocess.run(
+        [sys.executable, '-c', SCRIPT.format(enqueue=enqueue)],
+        capture_output=True, text=True, check=True,
+    )
+    return result.stdout, result.stderr
+
+
+def test_client_records_skip_the_default_sink():
+    for enqueue in (False, True):
+        stdout, stderr = _run(enqueue)
+        assert stdout.count('client record') == 1
+        assert 'application record' not in stdout
+        assert stderr.count('application record') == 1
+        assert 'client record' not in stderr
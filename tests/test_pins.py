@@ -0,0 +1,50 @@
+import asyncio
+
+from ipfs_client.dag import IPFSCircuitOpenError
+
+
+def _payloads(count):
+    return [f'pinned content {idx}'.encode() for idx in range(count)]
+
+
+def test_pin_many_sends_batches(mock, open_client, settings):
+    settings.pins.batch_size = 10
+
+    async def run():
+        async with open_client() as client:
+            cids = await client.add_many(_payloads(25))
+            mock.pins.clear()
+            result = await client.pin_many(cids + cids[:5])
+            pins = [pin async for pin in client.pin_ls()]
+            return cids, result, pins
+    cids, result, pins = asyncio.run(run())
+
+    # duplicates are sent once
+    assert mock.requests['/api/v0/pin/add'] == 3
+    assert result.succeeded == cids
+    assert result.failed == {}
+    assert sorted(pin.cid for pin in pins) == sorted(cids)
+
+
+def test_unpin_many_isolates_a_stale_cid(mock, open_client, settings):
+    # even when 500 counts as a failure, bisecting a batch does not feed the
+    # breaker
+    settings.resilience.retry.retry_on_status = [429, 500, 502, 503, 504]
+
+    async def run():
+        async with open_client() as client:
+            cids = await client.add_many(_payloads(65))
+            mock.pins.discard(cids[0])
+            result = await client.unpin_many(cids)
+            try:
+                await client.add_bytes(b'written after the unpin')
+            except IPFSCircuitOpenError:
+                raise AssertionError('the writer breaker was opened by the bisection')
+            return cids, result, client.resilience_stats()
+    cids, result, stats = asyncio.run(run())
+
+    assert list(result.failed) == [cids[0]]
+    assert 'not pinned' in result.failed[cids[0]]
+    assert result.succeeded == cids[1:]
+    assert mock.pins.isdisjoint(cids)
+    assert all(breaker['trips'] == 0 for breaker in stats['breakers'].values())
@@ -0,0 +1,57 @@
+import asyncio
+
+import pydantic
+import pytest
+
+from ipfs_client.rate_limit import AsyncTokenBucket
+from ipfs_client.settings.data_models import IPFSWriterRateLimit
+
+
+def test_zero_rate_is_rejected():
+    with pytest.raises(pydantic.ValidationError):
+        IPFSWriterRateLimit(req_per_sec=0, burst=1)
+    with pytest.raises(ValueError):
+        AsyncTokenBucket(req_per_sec=0, burst=1)
+
+
+def test_cancelled_waiter_gives_its_slot_back():
+    async def run():
+        bucket = AsyncTokenBucket(req_per_sec=10, burst=1)
+        await bucket.acquire()
+        waiter = asyncio.create_task(bucket.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await bucket.acquire()
+        return loop.time() - started, bucket.stats()['acquired']
+
+    waited, acquired = asyncio.run(run())
+    # the freed slot is the one right after the first acquire, not a second
+    # interval later
+    assert waited < 0.15
+    assert acquired == 2
+
+
+def test_cancelled_waiter_ahead_of_others_keeps_the_queue():
+    async def run():
+        bucket = AsyncTokenBucket(req_per_sec=10, burst=1)
+        await bucket.acquire()
+        cancelled = asyncio.create_task(bucket.acquire())
+        queued = asyncio.create_task(bucket.acquire())
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await bucket.acquire()
+        waited = loop.time() - started
+        await queued
+        return waited
+
+    # the slot after the queued caller's, not the cancelled one's which
+    # would put two requests into one interval
+    assert asyncio.run(run()) > 0.25
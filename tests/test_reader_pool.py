@@ -0,0 +1,119 @@
+import asyncio
+import gc
+
+import httpx
+import pytest
+
+from ipfs_client.benchmarks.mock_server import MockServices
+from ipfs_client.dag import IPFSAsyncClientError
+from ipfs_client.main import AsyncIPFSClient
+from tests.conftest import MOCK_URL
+
+
+READER_URL = 'http://reader.mock:5001'
+MISSING_CID = 'bafkreigh2akiscaildcqabsyg3dfr6chu3fgpregiymsck7e7aqa4s52zy'
+
+
+class HostTransport(httpx.AsyncBaseTransport):
+    # one mock node per host name
+    def __init__(self, apps):
+        self._transports = {host: httpx.ASGITransport(app=app) for host, app in apps.items()}
+
+    async def handle_async_request(self, request):
+        return await self._transports[request.url.host].handle_async_request(request)
+
+
+@pytest.fixture
+def reader(mock):
+    return MockServices()
+
+
+@pytest.fixture
+def pool_client(mock, reader, settings):
+    settings.reader_urls = [READER_URL]
+    settings.reader_pool.health_check_interval = 0
+    settings.resilience.retry.base_delay = 0
+    settings.cache.enabled = False
+
+    def pool_client():
+        return AsyncIPFSClient(
+            addr=MOCK_URL, settings=settings,
+            transport=HostTransport({'ipfs.mock': mock.app, 'reader.mock': reader.app}),
+        )
+    return pool_client
+
+
+def test_reads_fail_over_to_the_node_with_the_content(mock, reader, pool_client):
+    async def run():
+        client = pool_client()
+        await client.init_session()
+        try:
+            cid = await client.add_bytes(b'on the reader only')
+            reader.blocks = dict(mock.blocks)
+            mock.blocks.clear()
+            return await client.cat(cid)
+        finally:
+            await client.aclose()
+    assert asyncio.run(run()) == 'on the reader only'
+
+
+def test_missing_content_does_not_eject_nodes(pool_client):
+    async def run():
+        client = pool_client()
+        await client.init_session()
+        try:
+            for _ in range(10):
+                with pytest.raises(IPFSAsyncClientError):
+                    await client.cat(MISSING_CID)
+            return client.reader_pool_stats()
+        finally:
+            await client.aclose()
+    stats = asyncio.run(run())
+
+    assert all(node['healthy'] for node in stats['nodes'])
+
+
+def test_gateway_errors_eject_a_node(mock, pool_client, settings):
+    settings.resilience.circuit_breaker.enabled = False
+    mock.error_rate = 1.0
+
+    async def run():
+        client = pool_client()
+        await client.init_session()
+        try:
+            for _ in range(5):
+                with pytest.raises(IPFSAsyncClientError):
+                    await client.cat(MISSING_CID)
+            return client.reader_pool_stats()
+        finally:
+            await client.aclose()
+    stats = asyncio.run(run())
+
+    assert [node['healthy'] for node in stats['nodes']] == [False, True]
+
+
+def test_failed_hedge_is_retrieved(mock, reader, pool_client, settings):
+    settings.reader_pool.hedge = True
+    settings.reader_pool.hedge_min_delay = 0.01
+    settings.resilience.retry.max_attempts = 1
+    mock.latency = reader.latency = 0.03
+    mock.error_rate = reader.error_rate = 1.0
+    unhandled = []
+
+    async def run():
+        asyncio.get_running_loop().set_exception_handler(
+            lambda loop, context: unhandled.append(context),
+        )
+        client = pool_client()
+        await client.init_session()
+        try:
+            with pytest.raises(IPFSAsyncClientError):
+                await client.cat(MISSING_CID)
+        finally:
+            await client.aclose()
+        gc.collect()
+        await asyncio.sleep(0)
+    asyncio.run(run())
+
+    assert mock.requests['/api/v0/cat'] == reader.requests['/api/v0/cat'] == 1
+    assert unhandled == []
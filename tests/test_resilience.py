@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from ipfs_client.dag import IPFSAsyncClientError
+from ipfs_client.dag import IPFSCircuitOpenError
+from ipfs_client.resilience import RetryBudget
+
+
+MISSING_CID = 'bafkreigh2akiscaildcqabsyg3dfr6chu3fgpregiymsck7e7aqa4s52zy'
+
+
+def test_retry_budget_is_refilled_by_requests():
+    budget = RetryBudget(ratio=0.5, min_tokens=2)
+    assert budget.withdraw()
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw()
+    assert not budget.withdraw()
+
+
+def test_command_errors_are_not_failures(mock, open_client):
+    async def run():
+        async with open_client(write_mode=False) as client:
+            cid = await client.add_bytes(b'present')
+            for _ in range(6):
+                with pytest.raises(IPFSAsyncClientError) as e:
+                    await client.cat(MISSING_CID)
+                assert e.value.status_code == 500
+            assert await client.cat(cid) == 'present'
+            return client.resilience_stats()
+    stats = asyncio.run(run())
+
+    # neither retried nor counted by the breaker
+    assert mock.requests['/api/v0/cat'] == 7
+    assert stats['operations']['cat']['retries'] == 0
+    assert stats['breakers'] == {'http://ipfs.mock:5001/api/v0/': {'state': 'closed', 'trips': 0}}
+
+
+def test_gateway_errors_are_retried_and_open_the_breaker(mock, open_client, settings):
+    settings.resilience.retry.base_delay = 0
+    mock.error_rate = 1.0
+
+    async def run():
+        async with open_client(write_mode=False) as client:
+            with pytest.raises(IPFSAsyncClientError) as e:
+                await client.cat(MISSING_CID)
+            assert e.value.status_code == 503
+            # the breaker opens on the fifth failure, the retry after it
+            # fails fast
+            with pytest.raises(IPFSCircuitOpenError):
+                await client.cat(MISSING_CID)
+            with pytest.raises(IPFSCircuitOpenError):
+                await client.cat(MISSING_CID)
+    asyncio.run(run())
+
+    assert mock.requests['/api/v0/cat'] == 5
@@ -0,0 +1,76 @@
+import asyncio
+import hashlib
+
+import httpx
+
+from ipfs_client.retrieval import LassieRetriever
+from ipfs_client.services import LASSIE
+from ipfs_client.services import ServiceClientRegistry
+from ipfs_client.settings.data_models import LassieConfig
+from tests.conftest import MOCK_URL
+
+
+def _retrieve(mock, cid, output_path):
+    async def run():
+        services = ServiceClientRegistry(transport=httpx.ASGITransport(app=mock.app))
+        services.register(LASSIE, LassieConfig(url=MOCK_URL, max_attempts=1))
+        try:
+            return await LassieRetriever(services.config(LASSIE), services).retrieve(cid, output_path)
+        finally:
+            await services.aclose()
+    return asyncio.run(run())
+
+
+def _part_path(output_path, cid):
+    return f'{output_path}.{hashlib.sha1(cid.encode("utf-8")).hexdigest()[:16]}.part'
+
+
+def _added(mock, open_client):
+    async def run():
+        async with open_client() as client:
+            return await client.add_bytes(b'retrieved content')
+    return asyncio.run(run())
+
+
+def test_resume_from_a_partial_file(mock, open_client, tmp_path):
+    cid = _added(mock, open_client)
+    car = mock._car(cid)
+    output_path = str(tmp_path / 'out.car')
+    with open(_part_path(output_path, cid), 'wb') as f:
+        f.write(car[:10])
+
+    stats = _retrieve(mock, cid, output_path)
+
+    assert stats.resumed_bytes == 10
+    with open(output_path, 'rb') as f:
+        assert f.read() == car
+
+
+def test_complete_partial_file_is_finished(mock, open_client, tmp_path):
+    cid = _added(mock, open_client)
+    car = mock._car(cid)
+    output_path = str(tmp_path / 'out.car')
+    with open(_part_path(output_path, cid), 'wb') as f:
+        f.write(car)
+
+    stats = _retrieve(mock, cid, output_path)
+
+    assert stats.attempts == 1
+    assert stats.bytes == len(car)
+    with open(output_path, 'rb') as f:
+        assert f.read() == car
+
+
+def test_stale_partial_file_restarts_from_zero(mock, open_client, tmp_path):
+    cid = _added(mock, open_client)
+    car = mock._car(cid)
+    output_path = str(tmp_path / 'out.car')
+    with open(_part_path(output_path, cid), 'wb') as f:
+        f.write(b'x' * (len(car) + 50))
+
+    stats = _retrieve(mock, cid, output_path)
+
+    assert stats.attempts == 1
+    assert stats.resumed_bytes == 0
+    with open(output_path, 'rb') as f:
+        assert f.read() == car
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from ipfs_client.singleflight import SingleFlight
+
+
+def test_concurrent_reads_share_one_request(mock, open_client, settings):
+    settings.cache.enabled = False
+    mock.latency = 0.02
+
+    async def run():
+        async with open_client() as client:
+            cid = await client.add_bytes(b'read by everyone')
+            results = await asyncio.gather(*(client.cat(cid) for _ in range(10)))
+            return results, client.inflight_stats()
+    results, stats = asyncio.run(run())
+
+    assert results == ['read by everyone'] * 10
+    assert mock.requests['/api/v0/cat'] == 1
+    assert stats == {'calls': 10, 'deduplicated': 9, 'inflight': 0}
+
+
+def test_shared_call_outlives_a_cancelled_waiter():
+    started = 0
+
+    async def fetch():
+        nonlocal started
+        started += 1
+        await asyncio.sleep(0.02)
+        return 'result'
+
+    async def run():
+        flight = SingleFlight()
+        first = asyncio.create_task(flight.do('key', fetch))
+        second = asyncio.create_task(flight.do('key', fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second, flight.stats()
+    result, stats = asyncio.run(run())
+
+    assert result == 'result'
+    assert started == 1
+    assert stats['inflight'] == 0
+
+
+def test_call_is_cancelled_with_its_last_waiter():
+    async def run():
+        flag = asyncio.Event()
+
+        async def fetch():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                flag.set()
+                raise
+
+        flight = SingleFlight()
+        waiter = asyncio.create_task(flight.do('key', fetch))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.wait_for(flag.wait(), 1)
+        return flight.stats()
+
+    assert asyncio.run(run())['inflight'] == 0
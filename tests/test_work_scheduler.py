@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from ipfs_client.dag import IPFSDeadlineExceededError
+from ipfs_client.settings.data_models import WorkSchedulerConfig
+from ipfs_client.work_scheduler import WorkScheduler
+from ipfs_client.work_scheduler import work_context
+
+
+def test_class_limit_and_priority_order():
+    scheduler = WorkScheduler(WorkSchedulerConfig(limits={'cat': 1}))
+    order = []
+    peak = 0
+
+    async def request(name, priority):
+        nonlocal peak
+        with work_context(priority=priority):
+            async with scheduler.slot('cat'):
+                peak = max(peak, scheduler.stats()['cat']['running'])
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+    async def run():
+        first = asyncio.create_task(request('first', 'normal'))
+        await asyncio.sleep(0)
+        queued = [
+            asyncio.create_task(request('background', 'background')),
+            asyncio.create_task(request('normal', 'normal')),
+            asyncio.create_task(request('interactive', 'interactive')),
+        ]
+        await asyncio.sleep(0)
+        assert scheduler.stats()['cat']['queued'] == 3
+        await asyncio.gather(first, *queued)
+    asyncio.run(run())
+
+    assert order == ['first', 'interactive', 'normal', 'background']
+    assert peak == 1
+    assert scheduler.stats()['cat']['completed'] == 4
+
+
+def test_classes_do_not_share_limits():
+    scheduler = WorkScheduler(WorkSchedulerConfig(limits={'cat': 1, 'pin': 1}))
+
+    async def run():
+        async with scheduler.slot('cat_stream'):
+            # 'cat_stream' holds the only cat slot, 'pin_add' is in the pin class
+            async with scheduler.slot('pin_add'):
+                return scheduler.stats()
+    stats = asyncio.run(asyncio.wait_for(run(), 1))
+
+    assert stats['cat']['running'] == 1
+    assert stats['pin']['running'] == 1
+
+
+def test_deadline_expires_while_queued():
+    scheduler = WorkScheduler(WorkSchedulerConfig(limits={'pin': 1}))
+
+    async def run():
+        async with scheduler.slot('pin_add'):
+            with work_context(timeout=0.01):
+                with pytest.raises(IPFSDeadlineExceededError):
+                    async with scheduler.slot('unpin'):
+                        pass
+        return scheduler.stats()['pin']
+    stats = asyncio.run(run())
+
+    assert stats['expired'] == 1
+    assert stats['queued'] == 0
+
+
+def test_deadline_cancels_a_slow_request(mock, open_client):
+    mock.latency = 0.2
+
+    async def run():
+        async with open_client() as client:
+            with client.work_context(priority='interactive', timeout=0.05):
+                with pytest.raises(IPFSDeadlineExceededError):
+                    await client.dag.put({'slow': True})
+            return client.work_stats()
+    stats = asyncio.run(run())
+
+    assert stats['dag']['expired'] == 1
+    assert stats['dag']['running'] == 0